@@ -0,0 +1,227 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from books.models import Book
+from library_service_api.replicas import use_primary
+
+
+DEFAULTS = {
+    "MAX_ENTRIES": 1_000_000,
+    "MAX_RESULTS": 10,
+    "REBUILD_INTERVAL": 300,
+}
+
+FIELDS = ("name", "author")
+
+
+def get_setting(name: str):
+    return getattr(settings, "BOOK_AUTOCOMPLETE", {}).get(name, DEFAULTS[name])
+
+
+def normalize(value: str) -> str:
+    return " ".join(value.casefold().split())
+
+
+def word_starts(value: str) -> list[str]:
+    """Every key a value is reachable by: the value from each word onwards."""
+    words = normalize(value).split()
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted array of ``(key, field, value)`` entries searched with bisect.
+
+    Each distinct book name and author is stored once per word start, so
+    "tolk" finds "J. R. R. Tolkien". The array is replaced rather than
+    mutated on writes, which lets readers search without locking.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries: list[tuple[str, str, str]] = []
+        self.refs: Counter = Counter()
+        self.truncated = False
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_books(cls, rows, max_entries: int) -> "PrefixIndex":
+        index = cls(max_entries)
+        for name, author in rows:
+            index.refs["name", name] += 1
+            index.refs["author", author] += 1
+
+        entries = []
+        for (field, value), _ in index.refs.most_common():
+            keys = word_starts(value)
+            if len(entries) + len(keys) > max_entries:
+                index.truncated = True
+                continue
+            entries.extend((key, field, value) for key in keys)
+        entries.sort()
+        index.entries = entries
+        return index
+
+    @classmethod
+    def from_database(cls) -> "PrefixIndex":
+        rows = Book.objects.order_by().values_list(*FIELDS)
+        return cls.from_books(
+            rows.iterator(chunk_size=10_000), get_setting("MAX_ENTRIES")
+        )
+
+    def search(self, prefix: str, limit: int) -> list[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        entries = self.entries
+        results, seen = [], set()
+        position = bisect.bisect_left(entries, (prefix,))
+        while position < len(entries) and len(results) < limit:
+            key, field, value = entries[position]
+            if not key.startswith(prefix):
+                break
+            if (field, value) not in seen:
+                seen.add((field, value))
+                results.append({"field": field, "value": value})
+            position += 1
+        return results
+
+    def replace(self, old: tuple | None, new: tuple | None) -> None:
+        """Patch the index after a book changed from ``old`` to ``new``."""
+        with self._lock:
+            entries = list(self.entries)
+            if old:
+                for field, value in zip(FIELDS, old):
+                    self._discard(entries, field, value)
+            if new:
+                for field, value in zip(FIELDS, new):
+                    self._add(entries, field, value)
+            self.entries = entries
+
+    def _add(self, entries: list, field: str, value: str) -> None:
+        self.refs[field, value] += 1
+        if self.refs[field, value] > 1:
+            return
+        keys = word_starts(value)
+        if len(entries) + len(keys) > self.max_entries:
+            self.truncated = True
+            return
+        for key in keys:
+            bisect.insort(entries, (key, field, value))
+
+    def _discard(self, entries: list, field: str, value: str) -> None:
+        self.refs[field, value] -= 1
+        if self.refs[field, value] > 0:
+            return
+        del self.refs[field, value]
+        for key in word_starts(value):
+            position = bisect.bisect_left(entries, (key, field, value))
+            if position < len(entries) and entries[position] == (key, field, value):
+                del entries[position]
+
+
+_index: PrefixIndex | None = None
+_rebuilding = threading.Lock()
+# The latest terms of the books changed while an index is built, by id,
+# applied to it before it replaces the current one.
+_pending: dict[int, tuple | None] | None = None
+_patching = threading.Lock()
+
+
+def get_index() -> PrefixIndex:
+    """
+    Return this worker's index, building it on first use.
+
+    Writes made in this process patch the index directly. Writes made by
+    other workers or by bulk queries are picked up by a background rebuild
+    once the index is older than ``REBUILD_INTERVAL`` seconds.
+    """
+    if _index is None:
+        with _rebuilding:
+            if _index is None:
+                _build()
+        return _index
+
+    interval = get_setting("REBUILD_INTERVAL")
+    if interval and time.monotonic() - _index.built_at > interval:
+        if _rebuilding.acquire(blocking=False):
+            threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return _index
+
+
+def _build() -> None:
+    """
+    Load a new index and bring the books changed meanwhile up to date.
+
+    The load and the lookup of the changed books read the same snapshot,
+    so each of them moves from its loaded terms to its latest ones exactly
+    once, whether its change committed before, during or after the load.
+    """
+    global _index, _pending
+    with _patching:
+        _pending = {}
+    try:
+        with use_primary(), _snapshot():
+            index = PrefixIndex.from_database()
+            with _patching:
+                loaded = _load_terms(_pending)
+                for pk, new in _pending.items():
+                    if loaded.get(pk) != new:
+                        index.replace(loaded.get(pk), new)
+                _index = index
+    finally:
+        with _patching:
+            _pending = None
+
+
+@contextmanager
+def _snapshot():
+    """
+    A transaction whose reads see one snapshot: PostgreSQL's REPEATABLE
+    READ. Inside an outer transaction the reads share that one instead.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.in_atomic_block:
+        yield
+        return
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def _load_terms(pks) -> dict[int, tuple]:
+    rows = Book.objects.filter(pk__in=pks).values_list("pk", *FIELDS)
+    return {pk: tuple(terms) for pk, *terms in rows}
+
+
+def _rebuild_in_background() -> None:
+    try:
+        _build()
+    finally:
+        connections.close_all()
+        _rebuilding.release()
+
+
+def book_changed(pk: int, old: tuple | None, new: tuple | None) -> None:
+    if old == new:
+        return
+    with _patching:
+        if _pending is not None:
+            _pending[pk] = new
+        if _index is not None:
+            _index.replace(old, new)
+
+
+def reset_index() -> None:
+    global _index, _pending
+    _index, _pending = None, None
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+
+from django.db import DatabaseError, transaction
+from rest_framework.exceptions import ValidationError
+
+from books.models import Book
+from books.serializers import BookBulkSerializer
+from library_service_api.versioning import bump_model_version
+
+
+UPDATE_FIELDS = ("name", "author", "cover", "inventory", "daily_fee")
+
+
+@dataclass
+class BulkResult:
+    created: int = 0
+    updated: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {"created": self.created, "updated": self.updated, "errors": self.errors}
+
+
+def upsert_books(rows: list, chunk_size: int = 1000) -> BulkResult:
+    """
+    Validate and write catalog rows in chunks, keyed by ISBN.
+
+    Rows are validated without touching the database, then each chunk is
+    written by a single ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` in its
+    own transaction. Invalid rows, ISBNs repeated within the upload and
+    chunks the database rejects are reported per row while the remaining
+    rows are still written.
+    """
+    result = BulkResult()
+    serializer = BookBulkSerializer()
+    seen = {}
+    for start in range(0, len(rows), chunk_size):
+        chunk = {}
+        for number, row in enumerate(rows[start:start + chunk_size], start=start):
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                result.errors.append({"row": number, "errors": exc.detail})
+                continue
+            if data["isbn"] in seen:
+                result.errors.append({
+                    "row": number,
+                    "errors": {"isbn": [f"Duplicate of row {seen[data['isbn']]}."]},
+                })
+                continue
+            seen[data["isbn"]] = number
+            chunk[number] = data
+        if chunk:
+            _write_chunk(chunk, result)
+
+    if result.created or result.updated:
+        bump_model_version(Book)
+    return result
+
+
+def _write_chunk(chunk: dict[int, dict], result: BulkResult) -> None:
+    try:
+        with transaction.atomic():
+            existing = set(
+                Book.objects
+                .filter(isbn__in=[data["isbn"] for data in chunk.values()])
+                .values_list("isbn", flat=True)
+            )
+            Book.objects.bulk_create(
+                [Book(**data) for data in chunk.values()],
+                update_conflicts=True,
+                unique_fields=["isbn"],
+                update_fields=UPDATE_FIELDS,
+            )
+    except DatabaseError as exc:
+        result.errors.extend(
+            {"row": number, "errors": [f"Database error: {exc}"]} for number in chunk
+        )
+        return
+    result.updated += len(existing)
+    result.created += len(chunk) - len(existing)
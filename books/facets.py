@@ -0,0 +1,148 @@
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import (
+    BooleanField,
+    Case,
+    CharField,
+    Count,
+    ExpressionWrapper,
+    Q,
+    Value,
+    When,
+)
+from rest_framework.exceptions import ValidationError
+
+from books.models import Book
+
+
+AUTHOR_LIMIT = 20
+
+# Label, lower bound (inclusive) and upper bound (exclusive) of each band.
+FEE_BANDS = (
+    ("0-1", None, Decimal("1.00")),
+    ("1-3", Decimal("1.00"), Decimal("3.00")),
+    ("3-5", Decimal("3.00"), Decimal("5.00")),
+    ("5-10", Decimal("5.00"), Decimal("10.00")),
+    ("10+", Decimal("10.00"), None),
+)
+
+FACET_COLUMNS = ("author", "cover", "fee_band", "in_stock")
+
+
+def fee_band_filter(lower: Decimal | None, upper: Decimal | None) -> Q:
+    condition = Q()
+    if lower is not None:
+        condition &= Q(daily_fee__gte=lower)
+    if upper is not None:
+        condition &= Q(daily_fee__lt=upper)
+    return condition
+
+
+def filter_books(queryset, params):
+    """Apply the catalog filters chosen in the browse UI."""
+    author = params.get("author")
+    if author:
+        queryset = queryset.filter(author=author)
+
+    cover = params.get("cover")
+    if cover:
+        choices = Book.CoverChoices.values
+        if cover.upper() not in choices:
+            raise ValidationError({"cover": f"Choose from {', '.join(choices)}."})
+        queryset = queryset.filter(cover=cover.upper())
+
+    in_stock = params.get("in_stock")
+    if in_stock:
+        if in_stock.lower() not in ("true", "false"):
+            raise ValidationError({"in_stock": "Choose from true, false."})
+        if in_stock.lower() == "true":
+            queryset = queryset.filter(inventory__gt=0)
+        else:
+            queryset = queryset.filter(inventory=0)
+
+    band = params.get("fee_band")
+    if band:
+        bounds = {label: (lower, upper) for label, lower, upper in FEE_BANDS}
+        if band not in bounds:
+            raise ValidationError({"fee_band": f"Choose from {', '.join(bounds)}."})
+        queryset = queryset.filter(fee_band_filter(*bounds[band]))
+    return queryset
+
+
+def get_facets(queryset) -> dict:
+    """
+    Book counts by author, cover, fee band and stock in one grouped query.
+
+    PostgreSQL computes all four groupings with ``GROUPING SETS``. Other
+    databases group by every combination of the columns and the counts are
+    rolled up here.
+    """
+    rows = queryset.order_by().annotate(
+        fee_band=Case(
+            *(
+                When(fee_band_filter(lower, upper), then=Value(label))
+                for label, lower, upper in FEE_BANDS
+            ),
+            output_field=CharField(),
+        ),
+        in_stock=ExpressionWrapper(Q(inventory__gt=0), output_field=BooleanField()),
+    ).values(*FACET_COLUMNS)
+
+    counts = {column: {} for column in FACET_COLUMNS}
+    if connections[queryset.db].vendor == "postgresql":
+        total = _count_grouping_sets(rows, counts)
+    else:
+        total = 0
+        for row in rows.annotate(count=Count("*")):
+            total += row["count"]
+            for column in FACET_COLUMNS:
+                value = row[column]
+                counts[column][value] = counts[column].get(value, 0) + row["count"]
+
+    authors = sorted(counts["author"].items(), key=lambda item: (-item[1], item[0]))
+    return {
+        "total": total,
+        "author": [
+            {"value": value, "count": count} for value, count in authors[:AUTHOR_LIMIT]
+        ],
+        "cover": [
+            {"value": value, "count": counts["cover"].get(value, 0)}
+            for value in Book.CoverChoices.values
+        ],
+        "daily_fee": [
+            {
+                "band": label,
+                "min": None if lower is None else str(lower),
+                "max": None if upper is None else str(upper),
+                "count": counts["fee_band"].get(label, 0),
+            }
+            for label, lower, upper in FEE_BANDS
+        ],
+        "stock": [
+            {"value": "in_stock", "count": counts["in_stock"].get(True, 0)},
+            {"value": "out_of_stock", "count": counts["in_stock"].get(False, 0)},
+        ],
+    }
+
+
+def _count_grouping_sets(rows, counts: dict) -> int:
+    sql, params = rows.query.get_compiler(rows.db).as_sql()
+    groupings = ", ".join(f"GROUPING({column})" for column in FACET_COLUMNS)
+    columns = ", ".join(FACET_COLUMNS)
+    sets = ", ".join(f"({column})" for column in FACET_COLUMNS)
+    total = 0
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(
+            f"SELECT {groupings}, {columns}, COUNT(*) FROM ({sql}) facets "
+            f"GROUP BY GROUPING SETS ({sets}, ())",
+            params,
+        )
+        for row in cursor.fetchall():
+            flags, values, count = row[:4], row[4:8], row[8]
+            if all(flags):
+                total = count
+                continue
+            column = FACET_COLUMNS[flags.index(0)]
+            counts[column][values[flags.index(0)]] = count
+    return total
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.bulk import upsert_books
+from books.models import Book
+from books.serializers import BookSerializer
+
+
+ISBN_PREFIX = "9799"
+
+
+def make_rows(count: int, offset: int = 0) -> list[dict]:
+    rng = random.Random(offset)
+    return [
+        {
+            "name": f"Benchmark book {number}",
+            "author": f"Author {rng.randint(1, 5000)}",
+            "isbn": f"{ISBN_PREFIX}{number:09d}",
+            "cover": rng.choice(Book.CoverChoices.values),
+            "inventory": str(rng.randint(0, 20)),
+            "daily_fee": f"{rng.randint(10, 500) / 100:.2f}",
+        }
+        for number in range(offset, offset + count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compares bulk catalog upserts with one serializer save per row"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20_000)
+        parser.add_argument(
+            "--per-row-rows",
+            type=int,
+            default=2_000,
+            help="Rows written through the per-row path, which is much slower.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            self.per_row(make_rows(options["per_row_rows"]))
+            rows = make_rows(options["rows"], offset=options["per_row_rows"])
+            self.bulk("bulk insert", rows, options["chunk_size"])
+            self.bulk("bulk update", rows, options["chunk_size"])
+        finally:
+            Book.objects.filter(isbn__startswith=ISBN_PREFIX).delete()
+
+    def per_row(self, rows: list[dict]) -> None:
+        started = time.perf_counter()
+        for row in rows:
+            with transaction.atomic():
+                serializer = BookSerializer(data=row)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+        self.report("per-row create", len(rows), time.perf_counter() - started)
+
+    def bulk(self, label: str, rows: list[dict], chunk_size: int) -> None:
+        started = time.perf_counter()
+        result = upsert_books(rows, chunk_size=chunk_size)
+        if result.errors:
+            self.stderr.write(f"{len(result.errors)} rows failed: {result.errors[:3]}")
+        self.report(label, len(rows), time.perf_counter() - started)
+
+    def report(self, label: str, count: int, elapsed: float) -> None:
+        self.stdout.write(
+            f"{label:<16} {count:>8} rows in {elapsed:7.2f}s "
+            f"= {count / elapsed:10.0f} rows/s"
+        )
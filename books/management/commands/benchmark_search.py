@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from books.models import Book
+from books.search import search_books
+
+
+SYLLABLES = (
+    "ka", "lo", "mi", "ren", "tor", "van", "el", "sha", "dun", "bri",
+    "gal", "or", "wen", "thi", "mar", "ros", "ly", "quin", "zo", "fa",
+)
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list[str]:
+    return sorted({
+        "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        for _ in range(size)
+    })
+
+
+def misspell(word: str) -> str:
+    position = len(word) // 2
+    return word[:position] + word[position + 1:]
+
+
+class Command(BaseCommand):
+    help = "Compares ranked book search with the icontains scan it replaces"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the generated books instead of rolling them back.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The search benchmark requires PostgreSQL.")
+
+        try:
+            with transaction.atomic():
+                self.seed(options["books"], options["batch_size"])
+                self.run(options["repeat"])
+                if not options["keep"]:
+                    raise _Rollback
+        except _Rollback:
+            self.stdout.write("Generated books rolled back.")
+
+    def seed(self, total: int, batch_size: int) -> None:
+        rng = random.Random(42)
+        words = make_vocabulary(rng, 20_000)
+        surnames = make_vocabulary(rng, 5_000)
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            Book.objects.bulk_create(
+                Book(
+                    name=" ".join(rng.sample(words, 3)).capitalize(),
+                    author=" ".join(rng.sample(surnames, 2)).title(),
+                    cover=rng.choice(Book.CoverChoices.values),
+                    inventory=rng.randint(0, 20),
+                    daily_fee=rng.randint(10, 500) / 100,
+                )
+                for _ in range(min(batch_size, total - offset))
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE books_book")
+        self.stdout.write(
+            f"Seeded {total} books in {time.perf_counter() - started:.1f}s"
+        )
+
+    def run(self, repeat: int) -> None:
+        queryset = Book.objects.all()
+        sample = queryset.order_by("?").first()
+        title_words = sample.name.lower().split()
+        queries = (
+            " ".join(title_words[:2]),
+            sample.author.split()[-1],
+            misspell(title_words[-1]),
+            misspell(sample.author.split()[0]),
+        )
+        strategies = {
+            "icontains": lambda query: queryset.filter(
+                Q(name__icontains=query) | Q(author__icontains=query)
+            ),
+            "ranked": lambda query: search_books(queryset, query),
+        }
+        for query in queries:
+            for name, build in strategies.items():
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    list(build(query)[:10])
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{query!r:<20} {name:<10} "
+                    f"p50={statistics.median(timings):8.2f}ms "
+                    f"p95={timings[int(len(timings) * 0.95) - 1]:8.2f}ms"
+                )
+
+
+class _Rollback(Exception):
+    pass
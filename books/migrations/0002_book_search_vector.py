@@ -0,0 +1,72 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce({row}name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}author, '')), 'B')"
+)
+NEW_ROW_VECTOR = SEARCH_VECTOR_SQL.format(row="NEW.")
+TABLE_VECTOR = SEARCH_VECTOR_SQL.format(row="")
+
+FORWARD_SQL = [
+    f"""
+    CREATE FUNCTION books_book_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {NEW_ROW_VECTOR};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER books_book_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, author ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_search_vector_update()
+    """,
+    f"UPDATE books_book SET search_vector = {TABLE_VECTOR}",
+    "CREATE INDEX books_book_search_vector_idx ON books_book USING gin (search_vector)",
+    "CREATE INDEX books_book_name_trgm_idx ON books_book USING gin (name gin_trgm_ops)",
+    "CREATE INDEX books_book_author_trgm_idx ON books_book USING gin (author gin_trgm_ops)",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS books_book_author_trgm_idx",
+    "DROP INDEX IF EXISTS books_book_name_trgm_idx",
+    "DROP INDEX IF EXISTS books_book_search_vector_idx",
+    "DROP TRIGGER IF EXISTS books_book_search_vector_trigger ON books_book",
+    "DROP FUNCTION IF EXISTS books_book_search_vector_update()",
+]
+
+
+def run_on_postgresql(statements):
+    """Search indexes and the trigger only exist on PostgreSQL."""
+
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="book",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(FORWARD_SQL), run_on_postgresql(BACKWARD_SQL)
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_book_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["name", "author", "id"], name="book_keyset_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="isbn",
+            field=models.CharField(blank=True, max_length=13, null=True, unique=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -8,15 +9,21 @@ class Book(models.Model):
 
     name = models.CharField(max_length=255)
     author = models.CharField(max_length=255)
+    isbn = models.CharField(max_length=13, unique=True, null=True, blank=True)
     cover = models.CharField(
         max_length=4,
         choices=CoverChoices.choices
     )
     inventory = models.PositiveIntegerField()
     daily_fee = models.DecimalField(max_digits=7, decimal_places=2)
+    # Filled by a database trigger on PostgreSQL (see migration 0002).
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["name", "author"]
+        indexes = [
+            models.Index(fields=["name", "author", "id"], name="book_keyset_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} - {self.author}"
@@ -0,0 +1,38 @@
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON, one object per line."""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        rows = []
+        for number, line in enumerate(codecs.getreader(encoding)(stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {number}: {exc}")
+        return rows
+
+
+class CSVParser(BaseParser):
+    """CSV with a header row naming the fields."""
+
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            return list(csv.DictReader(codecs.getreader(encoding)(stream)))
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError(f"CSV parse error: {exc}")
@@ -0,0 +1,54 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.db.models.functions import Greatest
+
+
+SEARCH_CONFIG = "english"
+
+
+def search_books(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Filter books by name or author, most relevant first.
+
+    On PostgreSQL the maintained search vector is matched with a web-search
+    style query and combined with trigram word similarity, so misspelled
+    terms still match. Other databases fall back to a plain
+    case-insensitive substring scan ordered by the model ordering.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+
+    if connections[queryset.db].vendor != "postgresql":
+        return _search_books_fallback(queryset, query)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset
+        .annotate(
+            rank=SearchRank(F("search_vector"), search_query),
+            similarity=Greatest(
+                TrigramWordSimilarity(query, "name"),
+                TrigramWordSimilarity(query, "author"),
+            ),
+        )
+        .filter(
+            Q(search_vector=search_query)
+            | Q(name__trigram_word_similar=query)
+            | Q(author__trigram_word_similar=query)
+        )
+        .order_by((F("rank") + F("similarity")).desc(), "name", "author", "id")
+    )
+
+
+def _search_books_fallback(queryset: QuerySet, query: str) -> QuerySet:
+    for term in query.split():
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(author__icontains=term)
+        )
+    return queryset
@@ -1,9 +1,41 @@
+import re
+
 from rest_framework import serializers
 
 from books.models import Book
+from library_service_api.fieldsets import SparseFieldsetSerializerMixin
+
 
+ISBN_PATTERN = re.compile(r"^(\d{9}[\dX]|\d{13})$")
 
-class BookSerializer(serializers.ModelSerializer):
+
+class BookSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = ("id", "name", "author", "cover", "inventory", "daily_fee")
+        fields = ("id", "name", "author", "isbn", "cover", "inventory", "daily_fee")
+        # Room for hyphens, which are stripped before saving.
+        extra_kwargs = {"isbn": {"max_length": 17}}
+
+    def validate_isbn(self, value):
+        if not value:
+            return None
+        value = re.sub(r"[\s-]", "", value).upper()
+        if not ISBN_PATTERN.match(value):
+            raise serializers.ValidationError("Enter a valid ISBN-10 or ISBN-13.")
+        return value
+
+
+class BookBulkSerializer(BookSerializer):
+    """Row of a bulk import, matched to existing books by ISBN."""
+
+    class Meta(BookSerializer.Meta):
+        fields = ("name", "author", "isbn", "cover", "inventory", "daily_fee")
+        extra_kwargs = {
+            "isbn": {"max_length": 17, "required": True, "validators": []},
+        }
+
+    def validate_isbn(self, value):
+        value = super().validate_isbn(value)
+        if value is None:
+            raise serializers.ValidationError("This field is required.")
+        return value
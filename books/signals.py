@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from books import autocomplete
+from books.models import Book
+from library_service_api.versioning import bump_model_version
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def bump_book_version(sender, **kwargs):
+    bump_model_version(Book)
+
+
+@receiver(post_init, sender=Book)
+def remember_autocomplete_terms(sender, instance, **kwargs):
+    # Deferred fields are missing from __dict__; reading them would query.
+    loaded = instance.__dict__
+    instance._autocomplete_terms = (
+        tuple(loaded[field] for field in autocomplete.FIELDS)
+        if all(field in loaded for field in autocomplete.FIELDS)
+        else None
+    )
+
+
+@receiver(post_save, sender=Book)
+def patch_autocomplete_on_save(sender, instance, created, update_fields=None, **kwargs):
+    old = None if created else instance._autocomplete_terms
+    if not created and old is None:
+        return
+    new = tuple(
+        getattr(instance, field) if update_fields is None or field in update_fields else value
+        for field, value in zip(autocomplete.FIELDS, old or (None, None))
+    )
+    instance._autocomplete_terms = new
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.book_changed(pk, old, new))
+
+
+@receiver(post_delete, sender=Book)
+def patch_autocomplete_on_delete(sender, instance, **kwargs):
+    pk, old = instance.pk, (instance.name, instance.author)
+    transaction.on_commit(lambda: autocomplete.book_changed(pk, old, None))
@@ -3,11 +3,23 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
-from django.test import TestCase
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from books.autocomplete import PrefixIndex, get_index, reset_index
 from books.models import Book
 from books.serializers import BookSerializer
+from books.views import BookViewSet
+from library_service_api.caching import get_or_compute
+from library_service_api.testing import QueryBudgetTestMixin
 
 
 BOOK_URL = reverse("books:book-list")
@@ -108,3 +120,724 @@ class AdminUserTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         for field in payload:
             self.assertEqual(getattr(book, field), payload[field])
+
+
+class BookSearchTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+        self.book_1 = create_book(name="The Hobbit", author="J. R. R. Tolkien")
+        self.book_2 = create_book(name="Dune", author="Frank Herbert")
+        self.book_3 = create_book(name="Children of Dune", author="Frank Herbert")
+
+    def search(self, query: str) -> list[int]:
+        response = self.client.get(BOOK_URL, {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_search_by_name(self) -> None:
+        self.assertEqual(self.search("hobbit"), [self.book_1.id])
+
+    def test_search_by_author(self) -> None:
+        self.assertCountEqual(
+            self.search("herbert"), [self.book_2.id, self.book_3.id]
+        )
+
+    def test_search_without_matches(self) -> None:
+        self.assertEqual(self.search("pratchett"), [])
+
+    def test_blank_query_lists_all_books(self) -> None:
+        self.assertEqual(len(self.search("  ")), 3)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL.")
+    def test_search_tolerates_typos(self) -> None:
+        self.assertEqual(self.search("hobit"), [self.book_1.id])
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL.")
+    def test_search_ranks_name_matches_first(self) -> None:
+        book = create_book(name="Herbert", author="Brian Herbert")
+        self.assertEqual(self.search("herbert")[0], book.id)
+
+
+AUTOCOMPLETE_URL = reverse("books:book-autocomplete")
+
+
+class PrefixIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.index = PrefixIndex.from_books(
+            [("The Hobbit", "J. R. R. Tolkien"), ("Dune", "Frank Herbert")],
+            max_entries=100,
+        )
+
+    def test_matches_any_word_start(self) -> None:
+        self.assertEqual(
+            self.index.search("TOLK", 10),
+            [{"field": "author", "value": "J. R. R. Tolkien"}]
+        )
+        self.assertEqual(
+            self.index.search("hob", 10),
+            [{"field": "name", "value": "The Hobbit"}]
+        )
+
+    def test_replace_patches_entries(self) -> None:
+        self.index.replace(("Dune", "Frank Herbert"), ("Dune Messiah", "Frank Herbert"))
+
+        self.assertEqual(
+            self.index.search("dune", 10),
+            [{"field": "name", "value": "Dune Messiah"}]
+        )
+        self.assertEqual(len(self.index.search("herbert", 10)), 1)
+
+    def test_max_entries_caps_index(self) -> None:
+        index = PrefixIndex.from_books([("Dune", "Frank Herbert")], max_entries=2)
+
+        self.assertTrue(index.truncated)
+        self.assertLessEqual(len(index.entries), 2)
+
+
+class BookAutocompleteTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        reset_index()
+        self.addCleanup(reset_index)
+
+        self.book = create_book(name="The Hobbit", author="J. R. R. Tolkien")
+        create_book(name="The Two Towers", author="J. R. R. Tolkien")
+
+    def test_autocomplete_without_queries(self) -> None:
+        self.client.get(AUTOCOMPLETE_URL, {"q": "t"})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(AUTOCOMPLETE_URL, {"q": "t", "limit": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"field": "name", "value": "The Hobbit"},
+                {"field": "name", "value": "The Two Towers"},
+            ]
+        )
+
+    def test_index_follows_book_writes(self) -> None:
+        self.client.get(AUTOCOMPLETE_URL, {"q": "t"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.name = "Unfinished Tales"
+            self.book.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_book(name="Silmarillion", author="J. R. R. Tolkien")
+
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": "unfin"})
+        self.assertEqual(
+            response.data["results"], [{"field": "name", "value": "Unfinished Tales"}]
+        )
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": "hob"})
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(AUTOCOMPLETE_URL, {"q": "sil"})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_saves_reuse_the_loaded_terms(self) -> None:
+        get_index()
+        book = Book.objects.get(pk=self.book.pk)
+        book.name = "Unfinished Tales"
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                book.save()
+
+        self.assertFalse([query for query in queries if query["sql"].startswith("SELECT")])
+        self.assertEqual(get_index().search("hob", 10), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL.")
+class BookAutocompleteBuildTest(TransactionTestCase):
+    def setUp(self) -> None:
+        reset_index()
+        self.addCleanup(reset_index)
+
+        self.books = [
+            create_book(name=name, author="J. R. R. Tolkien")
+            for name in ("The Hobbit", "The Two Towers", "The Silmarillion")
+        ]
+
+    @staticmethod
+    def rename(book: Book, name: str) -> None:
+        """Rename ``book`` on another connection, as a concurrent request would."""
+        def save() -> None:
+            book.name = name
+            book.save()
+            connections.close_all()
+
+        thread = threading.Thread(target=save)
+        thread.start()
+        thread.join()
+
+    def test_changes_committed_around_the_load_are_applied_once(self) -> None:
+        before, during, after = self.books
+        from_books = PrefixIndex.from_books
+
+        def rename_while_loading(rows):
+            # The query runs when the first row is fetched.
+            self.rename(before, "Beren and Luthien")
+            rows = iter(rows)
+            yield next(rows)
+            self.rename(during, "Unfinished Tales")
+            yield from rows
+            self.rename(after, "The Fall of Gondolin")
+
+        with mock.patch.object(
+            PrefixIndex,
+            "from_books",
+            lambda rows, max_entries: from_books(rename_while_loading(rows), max_entries),
+        ):
+            index = get_index()
+
+        self.assertEqual(
+            [index.search(prefix, 10)[0]["value"] for prefix in ("beren", "unfin", "fall")],
+            ["Beren and Luthien", "Unfinished Tales", "The Fall of Gondolin"],
+        )
+        for prefix in ("hob", "two", "silm"):
+            self.assertEqual(index.search(prefix, 10), [])
+        self.assertEqual([index.refs["name", book.name] for book in self.books], [1, 1, 1])
+        self.assertEqual(index.refs["author", "J. R. R. Tolkien"], 3)
+
+
+class BookCursorPaginationTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+        for name in ("b", "a", "c", "a", "d"):
+            create_book(name=name)
+        self.ordered_ids = list(
+            Book.objects.order_by("name", "author", "id").values_list("id", flat=True)
+        )
+
+    def test_cursor_pages_follow_keyset_ordering(self) -> None:
+        ids, url, params = [], BOOK_URL, {"cursor": "", "limit": 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [book["id"] for book in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(ids, self.ordered_ids)
+
+    def test_previous_link(self) -> None:
+        first = self.client.get(BOOK_URL, {"cursor": "", "limit": 2})
+        second = self.client.get(first.data["next"])
+        previous = self.client.get(second.data["previous"])
+
+        self.assertIsNone(first.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+
+    def test_limit_offset_still_supported(self) -> None:
+        response = self.client.get(BOOK_URL, {"limit": 2, "offset": 2})
+
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(BOOK_URL, {"cursor": "invalid"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookConditionalGetTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.book = create_book()
+
+    def test_not_modified_without_queries(self) -> None:
+        response = self.client.get(BOOK_URL)
+        etag = response.headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.headers["ETag"], etag)
+
+    def test_cached_page_served_without_queries(self) -> None:
+        first = self.client.get(BOOK_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(BOOK_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertIn("Last-Modified", second.headers)
+
+    def test_book_write_changes_etag(self) -> None:
+        etag = self.client.get(BOOK_URL).headers["ETag"]
+
+        self.book.inventory = 5
+        self.book.save()
+        response = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.data["results"][0]["inventory"], 5)
+
+    def test_write_in_the_same_second_is_not_hidden_by_if_modified_since(self) -> None:
+        last_modified = self.client.get(BOOK_URL).headers["Last-Modified"]
+
+        self.book.inventory = 5
+        self.book.save()
+        response = self.client.get(BOOK_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["inventory"], 5)
+
+    def test_etag_depends_on_query(self) -> None:
+        etag = self.client.get(BOOK_URL).headers["ETag"]
+
+        response = self.client.get(BOOK_URL, {"limit": 1}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_single_flight_computes_once(self) -> None:
+        calls = []
+
+        def compute() -> str:
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            values = list(executor.map(
+                lambda _: get_or_compute(f"test:{self.id()}", compute, 60), range(5)
+            ))
+
+        self.assertEqual(values, ["value"] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+ASYNC_BOOK_URL = reverse("books:book-list-async")
+
+
+def async_detail_url(book_id: int) -> str:
+    return reverse("books:book-detail-async", args=[book_id])
+
+
+class BookAsyncViewTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+        for name in ("b", "a", "c", "a", "d"):
+            create_book(name=name, author=f"Author {name}")
+        self.book = Book.objects.earliest("id")
+
+    def test_list_matches_sync_list(self) -> None:
+        for params in (
+            {},
+            {"limit": 2, "offset": 1},
+            {"author": "Author a"},
+            {"fields": "id,name"},
+            {"cursor": "", "limit": 3},
+        ):
+            with self.subTest(params=params):
+                expected = self.client.get(BOOK_URL, params)
+                response = self.client.get(ASYNC_BOOK_URL, params)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data["results"], expected.data["results"])
+                self.assertEqual(response.data.get("count"), expected.data.get("count"))
+
+    def test_cursor_pages_follow_keyset_ordering(self) -> None:
+        ids, url, params = [], ASYNC_BOOK_URL, {"cursor": "", "limit": 2}
+        while url:
+            response = self.client.get(url, params)
+            ids += [book["id"] for book in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(
+            ids, list(Book.objects.order_by("name", "author", "id").values_list("id", flat=True))
+        )
+
+    def test_retrieve_requires_staff(self) -> None:
+        response = self.client.get(async_detail_url(self.book.id))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_retrieve(self) -> None:
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="admin@user.com", password="test123user", is_staff=True
+            )
+        )
+
+        response = self.client.get(async_detail_url(self.book.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.client.get(detail_url(self.book.id)).data)
+        self.assertEqual(
+            self.client.get(async_detail_url(0)).status_code, status.HTTP_404_NOT_FOUND
+        )
+
+    def test_not_modified(self) -> None:
+        etag = self.client.get(ASYNC_BOOK_URL).headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ASYNC_BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_only_reads_are_allowed(self) -> None:
+        response = self.client.post(ASYNC_BOOK_URL, {})
+
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_served_through_asgi(self) -> None:
+        response = await self.async_client.get(ASYNC_BOOK_URL, {"cursor": ""})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 5)
+
+
+BULK_URL = reverse("books:book-bulk-upsert")
+
+
+class BookBulkUpsertTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@admin.com", password="test123user", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+        self.book = create_book(name="Dune", isbn="9780441172719", inventory=1)
+
+    def test_json_upsert_creates_and_updates(self) -> None:
+        payload = [
+            create_book(as_dict=True, name="Dune", isbn="978-0-441-17271-9", inventory=7),
+            create_book(as_dict=True, name="Emma", isbn="9780141439587"),
+        ]
+
+        response = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"created": 1, "updated": 1, "errors": []})
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 7)
+        self.assertTrue(Book.objects.filter(isbn="9780141439587").exists())
+
+    def test_invalid_rows_do_not_abort_upload(self) -> None:
+        payload = [
+            create_book(as_dict=True, isbn="9780141439587"),
+            create_book(as_dict=True, isbn="not-an-isbn"),
+            create_book(as_dict=True, isbn="9780141439587"),
+            create_book(as_dict=True, isbn="9780141439600", cover="PAPER"),
+        ]
+
+        response = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [1, 2, 3])
+        self.assertIn("isbn", response.data["errors"][0]["errors"])
+        self.assertIn("cover", response.data["errors"][2]["errors"])
+
+    def test_ndjson_upload(self) -> None:
+        body = "\n".join([
+            '{"name": "Emma", "author": "Jane Austen", "isbn": "9780141439587",'
+            ' "cover": "SOFT", "inventory": 3, "daily_fee": "1.50"}',
+            "",
+            '{"name": "Dune", "author": "Frank Herbert", "isbn": "9780441172719",'
+            ' "cover": "HARD", "inventory": 4, "daily_fee": "2.00"}',
+        ])
+
+        response = self.client.post(
+            BULK_URL, body, content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(response.data, {"created": 1, "updated": 1, "errors": []})
+
+    def test_csv_upload(self) -> None:
+        body = (
+            "name,author,isbn,cover,inventory,daily_fee\n"
+            "Emma,Jane Austen,9780141439587,SOFT,3,1.50\n"
+            '"Dune, Deluxe",Frank Herbert,9780441172719,HARD,4,2.00\n'
+        )
+
+        response = self.client.post(BULK_URL, body, content_type="text/csv")
+
+        self.assertEqual(response.data, {"created": 1, "updated": 1, "errors": []})
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.name, "Dune, Deluxe")
+
+    def test_bulk_requires_list(self) -> None:
+        response = self.client.post(BULK_URL, {"name": "Emma"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_is_staff_only(self) -> None:
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@user.com", password="test123user"
+            )
+        )
+
+        response = self.client.post(BULK_URL, [], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+EXPORT_URL = reverse("books:book-export")
+
+
+class BookExportTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+        self.book_1 = create_book(name="Dune, Deluxe", isbn="9780441172719")
+        self.book_2 = create_book(name="Emma", daily_fee="1.50")
+
+    def test_csv_export(self) -> None:
+        response = self.client.get(EXPORT_URL, {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="books.csv"', response["Content-Disposition"])
+        self.assertEqual(lines[0], "id,name,author,isbn,cover,inventory,daily_fee")
+        self.assertEqual(
+            lines[1:],
+            [
+                f'{self.book_1.id},"Dune, Deluxe",test_author,9780441172719,SOFT,10,10.00',
+                f"{self.book_2.id},Emma,test_author,,SOFT,10,1.50",
+            ],
+        )
+
+    def test_ndjson_export(self) -> None:
+        response = self.client.get(EXPORT_URL, HTTP_ACCEPT="application/x-ndjson")
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([row["id"] for row in rows], [self.book_1.id, self.book_2.id])
+        self.assertEqual(rows[1]["daily_fee"], "1.50")
+        self.assertIsNone(rows[1]["isbn"])
+
+    def test_export_streams_in_chunks(self) -> None:
+        response = self.client.get(EXPORT_URL, {"format": "csv"})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(next(iter(response.streaming_content)).decode().strip(),
+                         "id,name,author,isbn,cover,inventory,daily_fee")
+
+
+class BookSparseFieldsetTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.book = create_book(name="Dune", isbn="9780441172719")
+
+    def test_fields_trim_response_and_columns(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BOOK_URL, {"fields": "id,name,inventory"})
+
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.book.id, "name": "Dune", "inventory": 10}],
+        )
+        select = queries[-1]["sql"]
+        self.assertIn('"inventory"', select)
+        self.assertNotIn('"isbn"', select)
+        self.assertNotIn('"daily_fee"', select)
+
+    def test_exclude(self) -> None:
+        response = self.client.get(BOOK_URL, {"exclude": "isbn,daily_fee"})
+
+        self.assertEqual(
+            set(response.data["results"][0]),
+            {"id", "name", "author", "cover", "inventory"},
+        )
+
+    def test_unknown_field(self) -> None:
+        response = self.client.get(BOOK_URL, {"fields": "id,price"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pages_load_ordering_columns(self) -> None:
+        create_book(name="Emma")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                BOOK_URL, {"fields": "id", "cursor": "", "limit": 1}
+            )
+
+        self.assertEqual(response.data["results"], [{"id": self.book.id}])
+        self.assertIsNotNone(response.data["next"])
+
+
+FACETS_URL = reverse("books:book-facets")
+
+
+class BookFacetsTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+        create_book(author="Jane Austen", cover="HARD", daily_fee="0.50", inventory=0)
+        create_book(author="Jane Austen", cover="SOFT", daily_fee="2.00")
+        create_book(author="Frank Herbert", cover="SOFT", daily_fee="12.00")
+
+    def test_facet_counts(self) -> None:
+        response = self.client.get(FACETS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total"], 3)
+        self.assertEqual(
+            response.data["author"],
+            [
+                {"value": "Jane Austen", "count": 2},
+                {"value": "Frank Herbert", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            response.data["cover"],
+            [{"value": "HARD", "count": 1}, {"value": "SOFT", "count": 2}],
+        )
+        self.assertEqual(
+            [band["count"] for band in response.data["daily_fee"]], [1, 1, 0, 0, 1]
+        )
+        self.assertEqual(
+            response.data["stock"],
+            [{"value": "in_stock", "count": 2}, {"value": "out_of_stock", "count": 1}],
+        )
+
+    def test_facets_apply_filters(self) -> None:
+        response = self.client.get(FACETS_URL, {"cover": "soft", "in_stock": "true"})
+
+        self.assertEqual(response.data["total"], 2)
+        self.assertEqual(
+            response.data["cover"],
+            [{"value": "HARD", "count": 0}, {"value": "SOFT", "count": 2}],
+        )
+
+    def test_list_applies_filters(self) -> None:
+        response = self.client.get(BOOK_URL, {"fee_band": "10+"})
+
+        self.assertEqual(
+            [book["author"] for book in response.data["results"]], ["Frank Herbert"]
+        )
+
+    def test_invalid_filter(self) -> None:
+        for params in ({"fee_band": "cheap"}, {"in_stock": "1"}, {"in_stock": "yes"}):
+            with self.subTest(params=params):
+                response = self.client.get(FACETS_URL, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(BOOK_URL, {"in_stock": "False"})
+        self.assertEqual([book["author"] for book in response.data["results"]], ["Jane Austen"])
+
+    def test_facets_cached_until_book_write(self) -> None:
+        with self.assertNumQueries(1):
+            self.client.get(FACETS_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(FACETS_URL)
+        create_book(author="Frank Herbert")
+        response = self.client.get(FACETS_URL)
+
+        self.assertEqual(response.data["total"], 4)
+
+
+def make_isbn(number: int) -> str:
+    digits = f"978{number:09d}"
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return digits + str(-total % 10)
+
+
+class BookQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@admin.com", password="test123user", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.books = []
+
+    def create_books(self, count: int) -> None:
+        start = len(self.books)
+        self.books += [
+            create_book(name=f"Book {number}", author=f"Author {number % 7}")
+            for number in range(start, start + count)
+        ]
+
+    def test_every_action_has_a_budget(self) -> None:
+        self.assertQueryBudgetsCover(BookViewSet)
+
+    def test_reads(self) -> None:
+        reset_index()
+        for action, request in (
+            ("list", lambda: self.client.get(BOOK_URL)),
+            ("list", lambda: self.client.get(BOOK_URL, {"cursor": "", "author": "Author 1"})),
+            ("retrieve", lambda: self.client.get(detail_url(self.books[-1].id))),
+            ("facets", lambda: self.client.get(FACETS_URL, {"cover": "SOFT"})),
+            ("autocomplete", lambda: self.client.get(AUTOCOMPLETE_URL, {"q": "bo"})),
+            ("export", lambda: self.client.get(EXPORT_URL, {"format": "csv"})),
+        ):
+            with self.subTest(action=action):
+                Book.objects.all().delete()
+                self.books = []
+                self.assertWithinQueryBudget(BookViewSet, action, request, self.create_books)
+
+    def test_writes(self) -> None:
+        payload = create_book(as_dict=True)
+        for action, request in (
+            ("create", lambda: self.client.post(BOOK_URL, payload)),
+            ("update", lambda: self.client.put(detail_url(self.books[0].id), payload)),
+            ("partial_update", lambda: self.client.patch(detail_url(self.books[0].id), {"inventory": 3})),
+            ("destroy", lambda: self.client.delete(detail_url(self.books.pop().id))),
+        ):
+            with self.subTest(action=action):
+                self.assertWithinQueryBudget(BookViewSet, action, request, self.create_books)
+
+    def test_bulk_upsert(self) -> None:
+        rows = []
+
+        def add_rows(count: int) -> None:
+            rows.extend(
+                create_book(as_dict=True, name=f"Book {number}", isbn=make_isbn(number))
+                for number in range(len(rows), len(rows) + count)
+            )
+
+        self.assertWithinQueryBudget(
+            BookViewSet,
+            "bulk_upsert",
+            lambda: self.client.post(BULK_URL, rows, format="json"),
+            add_rows,
+        )
+
+
+@skipUnless(
+    connection.settings_dict["OPTIONS"].get("server_side_binding"),
+    "Requires server-side binding.",
+)
+class PreparedStatementTest(TestCase):
+    def test_repeated_queries_are_prepared(self) -> None:
+        book = create_book()
+        threshold = connection.settings_dict["OPTIONS"].get("prepare_threshold", 5)
+
+        for _ in range(threshold + 2):
+            Book.objects.get(pk=book.pk)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_prepared_statements "
+                "WHERE statement LIKE '%%FROM \"books_book\" WHERE%%'"
+            )
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_bulk_create_fits_the_parameter_limit(self) -> None:
+        fields = [field for field in Book._meta.concrete_fields if not field.primary_key]
+        books = [Book(**create_book(as_dict=True)) for _ in range(65535 // len(fields) + 1)]
+
+        self.assertEqual(
+            connection.ops.bulk_batch_size(fields, books), 65535 // len(fields)
+        )
+        Book.objects.bulk_create(books)
+
+        self.assertEqual(Book.objects.count(), len(books))
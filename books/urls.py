@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework import routers
 
 from books.views import BookViewSet
+from library_service_api.asyncviews import async_view
 
 
 router = routers.DefaultRouter()
@@ -10,6 +11,12 @@ router.register("books", BookViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/books/", async_view(BookViewSet, "list"), name="book-list-async"),
+    path(
+        "async/books/<int:pk>/",
+        async_view(BookViewSet, "retrieve"),
+        name="book-detail-async",
+    ),
 ]
 
 app_name = "books"
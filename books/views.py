@@ -1,20 +1,233 @@
-from drf_spectacular.utils import extend_schema_view, extend_schema
-from rest_framework import viewsets
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
+from books.autocomplete import get_index, get_setting
+from books.bulk import upsert_books
+from books.facets import FEE_BANDS, filter_books, get_facets
 from books.models import Book
-from books.serializers import BookSerializer
+from books.parsers import CSVParser, NDJSONParser
+from books.search import search_books
+from books.serializers import BookSerializer, BookBulkSerializer
 from books.permissions import IsAdminUserOrReadOnly
+from library_service_api.asyncviews import AsyncReadMixin
+from library_service_api.caching import VersionedResponseMixin
+from library_service_api.exports import CSVRenderer, NDJSONRenderer, stream_export
+from library_service_api.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetViewMixin
+from library_service_api.plans import LeanListMixin
+from library_service_api.versioning import get_model_last_modified, get_model_version
+
+
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        name="q",
+        type=OpenApiTypes.STR,
+        description="Search by book name or author, tolerates typos.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="author",
+        type=OpenApiTypes.STR,
+        description="Filter by exact author.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="cover",
+        type=OpenApiTypes.STR,
+        enum=Book.CoverChoices.values,
+        description="Filter by cover.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="fee_band",
+        type=OpenApiTypes.STR,
+        enum=[label for label, _, _ in FEE_BANDS],
+        description="Filter by daily fee band.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="in_stock",
+        type=OpenApiTypes.STR,
+        description="Filter by availability, choose from true/false options.",
+        required=False
+    ),
+]
 
 
 @extend_schema_view(
     create=extend_schema(summary="Create book"),
-    list=extend_schema(summary="List books"),
-    retrieve=extend_schema(summary="Get book details"),
+    retrieve=extend_schema(summary="Get book details", parameters=SPARSE_FIELDSET_PARAMETERS),
     update=extend_schema(summary="Update book"),
     partial_update=extend_schema(summary="Partially update book"),
     destroy=extend_schema(summary="Delete book"),
 )
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    LeanListMixin,
+    AsyncReadMixin,
+    SparseFieldsetViewMixin,
+    VersionedResponseMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAdminUserOrReadOnly]
+    cursor_ordering = ("name", "author", "id")
+    count_strategy = "estimated"
+    query_budgets = {
+        "list": 4,
+        "retrieve": 2,
+        "create": 2,
+        "update": 4,
+        "partial_update": 4,
+        "destroy": 6,
+        "facets": 2,
+        "autocomplete": 2,
+        "bulk_upsert": 6,
+        "export": 2,
+    }
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action in ("list", "facets"):
+            query = self.request.query_params.get("q")
+            if query:
+                queryset = search_books(queryset, query)
+            queryset = filter_books(queryset, self.request.query_params)
+        return queryset
+
+    def get_cache_version(self) -> int:
+        return get_model_version(Book)
+
+    def get_last_modified(self) -> float | None:
+        return get_model_last_modified(Book)
+
+    @extend_schema(
+        summary="List books",
+        description="Returns a list of books, ranked by relevance when searching.",
+        parameters=[*FILTER_PARAMETERS, *SPARSE_FIELDSET_PARAMETERS]
+    )
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(
+            request, lambda: super(BookViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(
+            request, lambda: super(BookViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aversioned_response(
+            request, lambda: super(BookViewSet, self).alist(request, *args, **kwargs)
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aversioned_response(
+            request, lambda: super(BookViewSet, self).aretrieve(request, *args, **kwargs)
+        )
+
+    @extend_schema(
+        summary="Catalog facets",
+        description=(
+            "Book counts by author, cover, daily fee band and stock for the "
+            "books matching the active filters."
+        ),
+        parameters=FILTER_PARAMETERS,
+        responses={
+            status.HTTP_200_OK: {
+                "total": 0,
+                "author": [{"value": "", "count": 0}],
+                "cover": [{"value": "HARD", "count": 0}],
+                "daily_fee": [{"band": "0-1", "min": None, "max": "1.00", "count": 0}],
+                "stock": [{"value": "in_stock", "count": 0}],
+            }
+        },
+    )
+    @action(methods=["GET"], detail=False, permission_classes=[AllowAny])
+    def facets(self, request):
+        return self.versioned_response(
+            request, lambda: Response(get_facets(self.get_queryset()))
+        )
+
+    @extend_schema(
+        summary="Autocomplete book names and authors",
+        description="Prefix matches served from an in-memory index, without database queries.",
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                description="Beginning of any word in a book name or author.",
+                required=True
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=OpenApiTypes.INT,
+                description="Maximum number of suggestions.",
+                required=False
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        authentication_classes=[],
+        permission_classes=[AllowAny],
+    )
+    def autocomplete(self, request):
+        max_results = get_setting("MAX_RESULTS")
+        try:
+            limit = min(max(int(request.query_params["limit"]), 1), max_results)
+        except (KeyError, ValueError):
+            limit = max_results
+
+        results = get_index().search(request.query_params.get("q", ""), limit)
+        return Response({"results": results})
+
+    @extend_schema(
+        summary="Bulk create or update books",
+        description=(
+            "Accepts a JSON array, NDJSON or CSV with a header row. "
+            "Books are matched by ISBN: existing ones are updated, new ones created. "
+            "Invalid rows are reported without aborting the rest of the upload."
+        ),
+        request=BookBulkSerializer(many=True),
+        responses={status.HTTP_200_OK: {"created": 0, "updated": 0, "errors": []}},
+    )
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk",
+        parser_classes=[JSONParser, NDJSONParser, CSVParser],
+    )
+    def bulk_upsert(self, request):
+        if not isinstance(request.data, list):
+            raise ValidationError("Expected a list of books.")
+        result = upsert_books(request.data)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Export the catalog",
+        description=(
+            "Streams every book as CSV or NDJSON, chosen with `?format=csv|ndjson` "
+            "or the Accept header."
+        ),
+        responses={(status.HTTP_200_OK, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[AllowAny],
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        return stream_export(
+            Book.objects.order_by("id"),
+            ["id", "name", "author", "isbn", "cover", "inventory", "daily_fee"],
+            request.accepted_renderer.format,
+            "books",
+        )
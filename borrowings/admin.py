@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, Notification
 
 
-admin.site.register(Borrowing)
+@admin.register(Borrowing)
+class BorrowingAdmin(admin.ModelAdmin):
+    # The default list shows Borrowing.__str__, which reads the book.
+    list_select_related = ("book",)
+
+
+admin.site.register(Notification)
@@ -0,0 +1,74 @@
+import time
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+
+from borrowings.models import ArchivedBorrowing, Borrowing
+from library_service_api.versioning import bump_model_version
+
+
+ARCHIVED_COLUMNS = (
+    "id",
+    "borrow_date",
+    "expected_return_date",
+    "actual_return_date",
+    "book_id",
+    "user_id",
+    "is_active",
+    "overdue_notified_at",
+)
+
+
+def get_archivable(before: date) -> QuerySet:
+    """Borrowings returned before ``before``."""
+    return Borrowing.objects.filter(is_active=False, actual_return_date__lt=before)
+
+
+def archive_chunk(before: date, after_id: int, chunk_size: int) -> list[int]:
+    """
+    Move up to ``chunk_size`` archivable borrowings with ids above
+    ``after_id`` in one transaction and return their ids.
+
+    Rows being changed by a request are skipped rather than waited for,
+    and a request touching one of the moved rows waits only for this
+    chunk. No delete signals are sent: the rows only change tables, so
+    lists read through ``BorrowingHistory`` stay the same.
+    """
+    with transaction.atomic():
+        rows = list(
+            get_archivable(before)
+            .filter(id__gt=after_id)
+            .select_for_update(skip_locked=True)
+            .order_by("id")
+            .values(*ARCHIVED_COLUMNS)[:chunk_size]
+        )
+        if not rows:
+            return []
+        ids = [row["id"] for row in rows]
+        ArchivedBorrowing.objects.bulk_create(ArchivedBorrowing(**row) for row in rows)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Borrowing._meta.db_table} "
+                f"WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+        bump_model_version(Borrowing)
+        bump_model_version(ArchivedBorrowing)
+    return ids
+
+
+def archive_borrowings(before: date, chunk_size: int = 1000, pause: float = 0) -> int:
+    """
+    Move borrowings returned before ``before`` to the archive table,
+    ``chunk_size`` rows per transaction, sleeping ``pause`` seconds
+    between chunks. Chunks walk the primary key, so later ones don't
+    scan past the rows earlier ones deleted. Returns the number moved.
+    """
+    moved, after_id = 0, 0
+    while ids := archive_chunk(before, after_id, chunk_size):
+        moved += len(ids)
+        after_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return moved
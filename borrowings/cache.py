@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from library_service_api.caching import VersionedCache
+from library_service_api.versioning import bump_version, get_last_modified, get_version
+
+
+DEFAULT_SETTINGS = {
+    "BACKEND": "library_service_api.caching.DjangoCacheBackend",
+    "OPTIONS": {},
+    "TIMEOUT": 300,
+}
+
+_cache: VersionedCache | None = None
+
+
+def get_borrowing_list_cache() -> VersionedCache:
+    """Per-user borrowing list cache configured by ``BORROWING_LIST_CACHE``."""
+    global _cache
+    if _cache is None:
+        config = {**DEFAULT_SETTINGS, **getattr(settings, "BORROWING_LIST_CACHE", {})}
+        backend = import_string(config["BACKEND"])(**config["OPTIONS"])
+        _cache = VersionedCache("borrowings:list", backend, config["TIMEOUT"])
+    return _cache
+
+
+def reset_borrowing_list_cache() -> None:
+    global _cache
+    _cache = None
+
+
+def user_version_key(user_id: int) -> str:
+    return f"version:borrowings:user:{user_id}"
+
+
+def get_user_version(user_id: int) -> int:
+    return get_version(user_version_key(user_id))
+
+
+def get_user_last_modified(user_id: int) -> float | None:
+    return get_last_modified(user_version_key(user_id))
+
+
+def bump_user_version(user_id: int) -> None:
+    bump_version(user_version_key(user_id))
@@ -0,0 +1,134 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils.timezone import now
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from books.models import Book
+from borrowings.cache import bump_user_version
+from borrowings.models import Borrowing
+from borrowings.popularity import count_borrowings
+from library_service_api.versioning import bump_model_version
+
+
+def checkout_book(user, book: Book, **fields) -> Borrowing:
+    """
+    Take one copy of ``book`` off the shelf and open a borrowing for it.
+
+    The copy is taken with a single ``UPDATE ... WHERE inventory > 0``, so
+    concurrent checkouts of the last copy can't both succeed and no stock
+    is lost to read-modify-write races. Queryset updates send no signals,
+    so the catalog version is bumped here. The book's popularity counters
+    are raised in the same transaction.
+    """
+    with transaction.atomic():
+        taken = Book.objects.filter(pk=book.pk, inventory__gt=0).update(
+            inventory=F("inventory") - 1
+        )
+        if not taken:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["This book is out of stock."]}
+            )
+        bump_model_version(Book)
+        borrowing = Borrowing.objects.create(user=user, book=book, **fields)
+        count_borrowings([borrowing])
+        return borrowing
+
+
+def return_borrowing(borrowing: Borrowing) -> bool:
+    """
+    Close ``borrowing`` and put its copy back on the shelf.
+
+    Returns ``False`` if it was already closed, including by a concurrent
+    request that got there first.
+    """
+    with transaction.atomic():
+        closed = Borrowing.objects.filter(pk=borrowing.pk, is_active=True).update(
+            is_active=False, actual_return_date=now().date()
+        )
+        if not closed:
+            return False
+        Book.objects.filter(pk=borrowing.book_id).update(inventory=F("inventory") + 1)
+        bump_model_version(Book)
+        bump_model_version(Borrowing)
+        bump_user_version(borrowing.user_id)
+    return True
+
+
+def adjust_inventory(changes: Counter) -> None:
+    """Apply per-book inventory ``changes`` with a single ``UPDATE``."""
+    changes = {book_id: change for book_id, change in changes.items() if change}
+    if not changes:
+        return
+    Book.objects.filter(pk__in=changes).update(
+        inventory=F("inventory") + Case(
+            *(When(pk=book_id, then=Value(change)) for book_id, change in changes.items()),
+            default=Value(0),
+        )
+    )
+    bump_model_version(Book)
+
+
+def checkout_books(user, items: list[dict]) -> list[Borrowing | None]:
+    """
+    Check out several books for ``user`` in one transaction.
+
+    The books are locked in primary key order, so concurrent batches can't
+    deadlock, and copies are handed out to ``items`` in request order. Each
+    book's inventory is lowered once by the number of copies granted and
+    the borrowings are inserted with one ``bulk_create``. Returns, for each
+    item, its borrowing or ``None`` if the book ran out of stock.
+    """
+    wanted = Counter(item["book"].pk for item in items)
+    with transaction.atomic():
+        available = dict(
+            Book.objects.select_for_update()
+            .filter(pk__in=wanted)
+            .order_by("pk")
+            .values_list("pk", "inventory")
+        )
+        granted = Counter()
+        results = []
+        for item in items:
+            book_id = item["book"].pk
+            if granted[book_id] < available.get(book_id, 0):
+                granted[book_id] += 1
+                results.append(Borrowing(user=user, **item))
+            else:
+                results.append(None)
+
+        adjust_inventory(Counter({book_id: -count for book_id, count in granted.items()}))
+        created = Borrowing.objects.bulk_create([borrowing for borrowing in results if borrowing])
+        count_borrowings(created)
+        if granted:
+            bump_model_version(Borrowing)
+            bump_user_version(user.pk)
+    return results
+
+
+def return_borrowings(borrowings: list[Borrowing]) -> set[int]:
+    """
+    Close several borrowings with one ``UPDATE`` and put their copies back.
+
+    Returns the ids of the borrowings that were closed; the others were
+    already returned, possibly by a concurrent request.
+    """
+    with transaction.atomic():
+        closing = list(
+            Borrowing.objects.select_for_update()
+            .filter(pk__in=[borrowing.pk for borrowing in borrowings], is_active=True)
+            .order_by("pk")
+            .values_list("pk", "book_id", "user_id")
+        )
+        if not closing:
+            return set()
+        Borrowing.objects.filter(pk__in=[pk for pk, _, _ in closing]).update(
+            is_active=False, actual_return_date=now().date()
+        )
+        adjust_inventory(Counter(book_id for _, book_id, _ in closing))
+        bump_model_version(Borrowing)
+        for user_id in {user_id for _, _, user_id in closing}:
+            bump_user_version(user_id)
+    return {pk for pk, _, _ in closing}
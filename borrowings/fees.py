@@ -0,0 +1,143 @@
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils.timezone import now
+
+from books.models import Book
+from borrowings.models import Borrowing, FeeCharge, JobWatermark
+
+
+DEFAULTS = {
+    "FINE_MULTIPLIER": 2,
+    "CHUNK_SIZE": 50_000,
+}
+
+WATERMARK = "fee_accrual"
+
+# Whole days between two dates, and the earlier or later of several.
+DATE_FUNCTIONS = {
+    "postgresql": {
+        "days": "({end} - {start})",
+        "least": "LEAST({})",
+        "greatest": "GREATEST({})",
+        "date": "%({})s::date",
+    },
+    "sqlite": {
+        "days": "CAST(julianday({end}) - julianday({start}) AS INTEGER)",
+        "least": "MIN({})",
+        "greatest": "MAX({})",
+        "date": "%({})s",
+    },
+}
+
+
+def get_setting(name: str):
+    return getattr(settings, "FEES", {}).get(name, DEFAULTS[name])
+
+
+def get_accrual_sql(vendor: str, since: date | None) -> str:
+    """
+    One statement computing both charges of every borrowing in an id range
+    and upserting them into the ledger.
+
+    A borrowing is charged ``daily_fee`` a day from its borrow date until
+    it is returned or expected back, whichever comes first, and
+    ``daily_fee * FINE_MULTIPLIER`` a day for being late after that.
+    Only rows whose amounts changed are rewritten.
+    """
+    functions = DATE_FUNCTIONS[vendor]
+    as_of = functions["date"].format("as_of")
+    end = functions["least"].format(f"COALESCE(b.actual_return_date, {as_of}), {as_of}")
+    rental_end = functions["least"].format(f"{end}, b.expected_return_date")
+    rental_days = functions["greatest"].format(
+        functions["days"].format(end=rental_end, start="b.borrow_date") + ", 0"
+    )
+    fine_days = functions["greatest"].format(
+        functions["days"].format(end=end, start="b.expected_return_date") + ", 0"
+    )
+    scope = "b.id BETWEEN %(first_id)s AND %(last_id)s"
+    if since is not None:
+        since_date = functions["date"].format("since")
+        scope += f" AND (b.is_active OR b.actual_return_date >= {since_date})"
+
+    charges = FeeCharge._meta.db_table
+    borrowings = Borrowing._meta.db_table
+    books = Book._meta.db_table
+    return f"""
+        INSERT INTO {charges}
+            (borrowing_id, user_id, kind, days, amount, accrued_through, updated_at)
+        SELECT id, user_id, kind, days, ROUND(days * rate, 2), {as_of}, %(now)s
+        FROM (
+            SELECT b.id, b.user_id, '{FeeCharge.KindChoices.RENTAL}' AS kind,
+                {rental_days} AS days, f.daily_fee AS rate
+            FROM {borrowings} b JOIN {books} f ON f.id = b.book_id
+            WHERE {scope}
+            UNION ALL
+            SELECT b.id, b.user_id, '{FeeCharge.KindChoices.FINE}',
+                {fine_days}, f.daily_fee * %(fine_multiplier)s
+            FROM {borrowings} b JOIN {books} f ON f.id = b.book_id
+            WHERE {scope}
+        ) AS accrued
+        WHERE days > 0
+        ON CONFLICT (borrowing_id, kind) DO UPDATE SET
+            days = excluded.days,
+            amount = excluded.amount,
+            accrued_through = excluded.accrued_through,
+            updated_at = excluded.updated_at
+        WHERE {charges}.days <> excluded.days OR {charges}.amount <> excluded.amount
+    """
+
+
+def accrue_fees(as_of: date, chunk_size: int | None = None) -> dict:
+    """
+    Bring the ledger up to ``as_of`` for active borrowings and those
+    returned since the previous run.
+
+    The charges are computed and written by the database, one id range
+    of ``chunk_size`` borrowings per statement and transaction, so no
+    rows pass through Python. Rerunning the same day rewrites nothing;
+    a day before the last run is skipped.
+    """
+    chunk_size = chunk_size or get_setting("CHUNK_SIZE")
+    watermark = JobWatermark.objects.filter(name=WATERMARK).first()
+    since = watermark.value if watermark else None
+    if since is not None and since > as_of:
+        return {"borrowings": 0, "charges": 0}
+
+    scope = Borrowing.objects.all()
+    if since is not None:
+        scope = scope.filter(Q(is_active=True) | Q(actual_return_date__gte=since))
+    bounds = scope.aggregate(first=Min("id"), last=Max("id"), count=Count("id"))
+
+    sql = get_accrual_sql(connection.vendor, since)
+    params = {
+        "as_of": as_of,
+        "since": since,
+        "now": now(),
+        "fine_multiplier": Decimal(str(get_setting("FINE_MULTIPLIER"))),
+    }
+    charges = 0
+    if bounds["first"] is not None:
+        for first_id in range(bounds["first"], bounds["last"] + 1, chunk_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    sql, {**params, "first_id": first_id, "last_id": first_id + chunk_size - 1}
+                )
+                charges += max(cursor.rowcount, 0)
+
+    JobWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": as_of})
+    return {"borrowings": bounds["count"], "charges": charges}
+
+
+def get_balance(user_id: int) -> dict:
+    """What ``user_id`` owes according to the ledger, by kind of charge."""
+    zero = Decimal("0.00")
+    balance = FeeCharge.objects.filter(user_id=user_id).aggregate(
+        rental=Sum("amount", filter=Q(kind=FeeCharge.KindChoices.RENTAL), default=zero),
+        fines=Sum("amount", filter=Q(kind=FeeCharge.KindChoices.FINE), default=zero),
+        accrued_through=Max("accrued_through"),
+    )
+    return {"user_id": user_id, **balance, "total": balance["rental"] + balance["fines"]}
@@ -0,0 +1,40 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.fees import accrue_fees
+from borrowings.models import current_date
+
+
+class Command(BaseCommand):
+    help = "Brings the fee ledger up to date for active and recently returned borrowings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Accrue fees up to this ISO date. Defaults to the current date.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Number of borrowing ids handled per statement.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["date"]) if options["date"] else current_date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        started = time.perf_counter()
+        results = accrue_fees(as_of, options["chunk_size"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Wrote {results['charges']} charges for {results['borrowings']} "
+            f"borrowings in {elapsed:.2f}s "
+            f"({results['borrowings'] / elapsed:.0f} rows/s)"
+        )
@@ -0,0 +1,55 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.archive import archive_borrowings
+from borrowings.models import current_date
+
+
+class Command(BaseCommand):
+    help = "Moves borrowings returned more than --days ago to the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Archive borrowings returned more than this many days ago.",
+        )
+        parser.add_argument(
+            "--date",
+            help="Treat this ISO date as today. Defaults to the current date.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of borrowings moved per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between chunks, to spread the load.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options["date"]) if options["date"] else current_date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if options["days"] < 0:
+            raise CommandError("--days can't be negative.")
+
+        started = time.perf_counter()
+        moved = archive_borrowings(
+            today - timedelta(days=options["days"]), options["chunk_size"], options["pause"]
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Archived {moved} borrowings in {elapsed:.2f}s ({moved / elapsed:.0f} rows/s)"
+        )
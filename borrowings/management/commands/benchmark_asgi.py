@@ -0,0 +1,235 @@
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from books.models import Book
+from borrowings.models import Borrowing
+
+
+EMAIL_PREFIX = "asgi-benchmark"
+BOOK_NAME = "ASGI benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves the read endpoints from one WSGI (gunicorn) and one ASGI "
+        "(uvicorn) process and compares them under the same concurrent load"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--borrowings-per-user", type=int, default=20)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per run.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--db-latency",
+            type=float,
+            default=0,
+            help="Milliseconds added to every database reply, as on a remote server.",
+        )
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=1,
+            help="Threads of the gunicorn worker; 1 is the plain sync worker.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The ASGI benchmark requires PostgreSQL.")
+
+        servers = (
+            ("WSGI gunicorn", "/api", [
+                "gunicorn", "library_service_api.wsgi:application",
+                "--workers", "1", "--threads", str(options["wsgi_threads"]),
+                "--bind", f"127.0.0.1:{options['port']}",
+            ]),
+            ("ASGI uvicorn", "/api/async", [
+                "uvicorn", "library_service_api.asgi:application",
+                "--workers", "1", "--port", str(options["port"]),
+                "--no-access-log", "--log-level", "warning",
+            ]),
+        )
+        try:
+            admin, user_ids, book_ids = self.seed(
+                options["users"], options["borrowings_per_user"]
+            )
+            token = str(AccessToken.for_user(admin))
+            env = os.environ.copy()
+            if options["db_latency"]:
+                proxy = LatencyProxy(
+                    connection.settings_dict["HOST"] or "localhost",
+                    int(connection.settings_dict["PORT"] or 5432),
+                    options["db_latency"] / 1000,
+                )
+                env.update(POSTGRES_HOST="127.0.0.1", POSTGRES_PORT=str(proxy.port))
+            for label, prefix, argv in servers:
+                with self.serve(argv, options["port"], env):
+                    base = f"http://127.0.0.1:{options['port']}{prefix}"
+                    for endpoint, make_url in (
+                        ("book detail", lambda: f"{base}/books/{random.choice(book_ids)}/"),
+                        (
+                            "borrowing list",
+                            lambda: f"{base}/borrowings/?cursor=&limit=20"
+                            f"&user_id={random.choice(user_ids)}",
+                        ),
+                    ):
+                        results = asyncio.run(self.load(
+                            make_url, token, options["concurrency"], options["duration"]
+                        ))
+                        self.report(label, endpoint, results)
+        finally:
+            self.cleanup()
+
+    def seed(self, users: int, borrowings_per_user: int) -> tuple:
+        admin = get_user_model().objects.create(
+            email=f"{EMAIL_PREFIX}-admin@example.com", password="!", is_staff=True
+        )
+        readers = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"{EMAIL_PREFIX}{number}@example.com", password="!")
+            for number in range(users)
+        )
+        books = Book.objects.bulk_create(
+            Book(
+                name=BOOK_NAME, author=f"Author {number}", cover="SOFT",
+                inventory=borrowings_per_user, daily_fee=1,
+            )
+            for number in range(borrowings_per_user)
+        )
+        Borrowing.objects.bulk_create(
+            (
+                Borrowing(user=reader, book=book, expected_return_date=date(2100, 1, 1))
+                for reader in readers
+                for book in books
+            ),
+            batch_size=5_000,
+        )
+        return admin, [reader.id for reader in readers], [book.id for book in books]
+
+    @staticmethod
+    def cleanup() -> None:
+        Borrowing.objects.filter(user__email__startswith=EMAIL_PREFIX).delete()
+        get_user_model().objects.filter(email__startswith=EMAIL_PREFIX).delete()
+        Book.objects.filter(name=BOOK_NAME).delete()
+
+    @staticmethod
+    def serve(argv: list[str], port: int, env: dict):
+        """Start a server process and wait until it answers."""
+        server = subprocess.Popen(
+            [sys.executable, "-m", *argv], env=env, stdout=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/api/books/", timeout=1)
+                break
+            except httpx.TransportError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    server.kill()
+                    raise CommandError(f"{argv[0]} did not start.")
+                time.sleep(0.2)
+        return _Running(server)
+
+    @staticmethod
+    async def load(make_url, token: str, concurrency: int, duration: float) -> dict:
+        """``concurrency`` clients sending requests back to back for ``duration`` seconds."""
+        latencies, errors = [], 0
+        headers = {"Authorize": f"Bearer {token}"}
+        limits = httpx.Limits(max_connections=concurrency)
+
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=60) as client:
+            deadline = time.perf_counter() + duration
+
+            async def worker() -> None:
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(make_url())
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+    def report(self, label: str, endpoint: str, results: dict) -> None:
+        latencies = sorted(results["latencies"])
+        if not latencies:
+            self.stdout.write(f"{label:<14} {endpoint:<15} no successful requests")
+            return
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        self.stdout.write(
+            f"{label:<14} {endpoint:<15} {len(latencies) / results['elapsed']:8.0f} requests/s  "
+            f"p50={p50:7.1f} ms  p99={p99:7.1f} ms  errors={results['errors']}"
+        )
+
+
+class _Running:
+    def __init__(self, process: subprocess.Popen) -> None:
+        self.process = process
+
+    def __enter__(self) -> subprocess.Popen:
+        return self.process
+
+    def __exit__(self, *exc_info) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+class LatencyProxy:
+    """
+    A TCP proxy to the database that holds back every reply for
+    ``latency`` seconds, running on its own event loop thread.
+    """
+
+    def __init__(self, host: str, port: int, latency: float) -> None:
+        self.target = (host, port)
+        self.latency = latency
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.accept, "127.0.0.1", 0), self.loop
+        ).result()
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def accept(self, reader, writer) -> None:
+        upstream_reader, upstream_writer = await asyncio.open_connection(*self.target)
+        await asyncio.gather(
+            self.pipe(reader, upstream_writer, 0),
+            self.pipe(upstream_reader, writer, self.latency),
+        )
+
+    @staticmethod
+    async def pipe(reader, writer, delay: float) -> None:
+        try:
+            while data := await reader.read(65536):
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
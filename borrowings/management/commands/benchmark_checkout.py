@@ -0,0 +1,149 @@
+import threading
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from books.models import Book
+from borrowings.checkout import checkout_book, return_borrowing
+from borrowings.models import Borrowing
+
+
+EMAIL_PREFIX = "checkout-benchmark"
+
+
+def legacy_checkout(user, book: Book) -> Borrowing:
+    """The read-modify-write checkout this benchmark compares against."""
+    book = Book.objects.get(pk=book.pk)
+    if book.inventory == 0:
+        raise ValidationError("This book is out of stock.")
+    book.inventory -= 1
+    book.save()
+    return Borrowing.objects.create(
+        user=user, book=book, expected_return_date=date(2100, 1, 1)
+    )
+
+
+def legacy_return(borrowing: Borrowing) -> bool:
+    borrowing = Borrowing.objects.select_related("book").get(pk=borrowing.pk)
+    if not borrowing.is_active:
+        return False
+    borrowing.is_active = False
+    borrowing.actual_return_date = date.today()
+    borrowing.book.inventory += 1
+    borrowing.book.save()
+    borrowing.save()
+    return True
+
+
+def atomic_checkout(user, book: Book) -> Borrowing:
+    return checkout_book(user, book, expected_return_date=date(2100, 1, 1))
+
+
+class Command(BaseCommand):
+    help = "Runs concurrent checkouts and returns of one book, old path against new"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borrowers", type=int, default=100)
+        parser.add_argument("--inventory", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The checkout benchmark requires PostgreSQL.")
+
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"{EMAIL_PREFIX}{number}@example.com", password="!")
+            for number in range(options["borrowers"])
+        )
+        try:
+            for label, checkout, give_back in (
+                ("read-modify-write", legacy_checkout, legacy_return),
+                ("conditional update", atomic_checkout, return_borrowing),
+            ):
+                self.run(
+                    label, checkout, give_back, users, options["inventory"], options["rounds"]
+                )
+        finally:
+            get_user_model().objects.filter(email__startswith=EMAIL_PREFIX).delete()
+
+    def run(self, label, checkout, give_back, users, inventory: int, rounds: int) -> None:
+        """
+        Every borrower tries to take a copy at once, then everyone who got
+        one returns it, ``rounds`` times. Borrowers are long-lived threads
+        with their own connection, released together by a barrier, so the
+        server needs ``max_connections`` above the number of borrowers.
+        """
+        book = Book.objects.create(
+            name="Checkout benchmark", author="Benchmark", cover="SOFT",
+            inventory=inventory, daily_fee=1,
+        )
+        barrier = threading.Barrier(len(users) + 1)
+        borrowed = [None] * len(users)
+        returned = [False] * len(users)
+
+        def borrower(position: int, user) -> None:
+            try:
+                for _ in range(rounds):
+                    barrier.wait()
+                    try:
+                        borrowed[position] = checkout(user, book)
+                    except ValidationError:
+                        borrowed[position] = None
+                    barrier.wait()
+                    barrier.wait()
+                    if borrowed[position] is not None:
+                        returned[position] = give_back(borrowed[position])
+                    barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            except Exception:
+                barrier.abort()
+                raise
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=borrower, args=(position, user))
+            for position, user in enumerate(users)
+        ]
+        for thread in threads:
+            thread.start()
+
+        granted = given_back = oversold = drift = 0
+        elapsed = 0.0
+        try:
+            for _ in range(rounds):
+                elapsed += self.phase(barrier)
+                checkouts = sum(borrowing is not None for borrowing in borrowed)
+                granted += checkouts
+                oversold += max(checkouts - inventory, 0)
+
+                elapsed += self.phase(barrier)
+                given_back += sum(returned)
+                book.refresh_from_db()
+                drift += abs(book.inventory - inventory)
+                Book.objects.filter(pk=book.pk).update(inventory=inventory)
+                returned[:] = [False] * len(users)
+        finally:
+            for thread in threads:
+                thread.join()
+            book.delete()
+
+        requests = len(users) * rounds + given_back
+        self.stdout.write(
+            f"{label:<19} {requests / elapsed:8.0f} requests/s  "
+            f"checkouts={granted} (expected {min(inventory, len(users)) * rounds}) "
+            f"oversold={oversold} inventory drift={drift}"
+        )
+
+    @staticmethod
+    def phase(barrier: threading.Barrier) -> float:
+        """Release the borrowers and time until all of them are done."""
+        barrier.wait()
+        started = time.perf_counter()
+        barrier.wait()
+        return time.perf_counter() - started
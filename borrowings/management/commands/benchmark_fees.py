@@ -0,0 +1,131 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from books.models import Book
+from borrowings.fees import accrue_fees, get_setting
+from borrowings.models import Borrowing, FeeCharge
+
+
+AS_OF = date(2025, 6, 30)
+
+
+def accrue_in_python(borrowing: Borrowing, as_of: date) -> None:
+    """The per-borrowing loop the bulk accrual replaces."""
+    end = min(borrowing.actual_return_date or as_of, as_of)
+    rental_days = max((min(end, borrowing.expected_return_date) - borrowing.borrow_date).days, 0)
+    fine_days = max((end - borrowing.expected_return_date).days, 0)
+    fee = borrowing.book.daily_fee
+    for kind, days, rate in (
+        (FeeCharge.KindChoices.RENTAL, rental_days, fee),
+        (FeeCharge.KindChoices.FINE, fine_days, fee * Decimal(str(get_setting("FINE_MULTIPLIER")))),
+    ):
+        if days:
+            FeeCharge.objects.update_or_create(
+                borrowing_id=borrowing.id,
+                kind=kind,
+                defaults={
+                    "user_id": borrowing.user_id,
+                    "days": days,
+                    "amount": round(days * rate, 2),
+                    "accrued_through": as_of,
+                    "updated_at": now(),
+                },
+            )
+
+
+class Command(BaseCommand):
+    help = "Accrues fees for a million borrowings in bulk and with a per-row loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borrowings", type=int, default=1_000_000)
+        parser.add_argument("--loop-sample", type=int, default=5_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The fee benchmark requires PostgreSQL.")
+        try:
+            with transaction.atomic():
+                total = self.seed(options["borrowings"], options["batch_size"])
+                self.run(total, options["loop_sample"])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("Generated rows rolled back.")
+
+    def seed(self, total: int, batch_size: int) -> int:
+        rng = random.Random(42)
+        started = time.perf_counter()
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"fees-benchmark{number}@example.com", password="!")
+            for number in range(1000)
+        )
+        books = Book.objects.bulk_create(
+            Book(
+                name=f"Fees benchmark book {number}",
+                author="Author",
+                cover="SOFT",
+                inventory=10,
+                daily_fee=rng.randint(10, 500) / 100,
+            )
+            for number in range(1000)
+        )
+        for offset in range(0, total, batch_size):
+            borrowings = []
+            for _ in range(min(batch_size, total - offset)):
+                borrow_date = AS_OF - timedelta(days=rng.randint(1, 365))
+                expected_return_date = borrow_date + timedelta(days=rng.randint(7, 30))
+                returned = rng.random() < 0.9
+                borrowings.append(Borrowing(
+                    borrow_date=borrow_date,
+                    expected_return_date=expected_return_date,
+                    actual_return_date=(
+                        min(expected_return_date + timedelta(days=rng.randint(-5, 10)), AS_OF)
+                        if returned else None
+                    ),
+                    book=rng.choice(books),
+                    user=rng.choice(users),
+                    is_active=not returned,
+                ))
+            Borrowing.objects.bulk_create(borrowings)
+        with connection.cursor() as cursor:
+            for model in (get_user_model(), Book, Borrowing):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        self.stdout.write(f"Seeded {total} borrowings in {time.perf_counter() - started:.1f}s")
+        return Borrowing.objects.count()
+
+    def run(self, total: int, loop_sample: int) -> None:
+        sample = Borrowing.objects.select_related("book").order_by("id")[:loop_sample]
+        started = time.perf_counter()
+        for borrowing in sample:
+            accrue_in_python(borrowing, AS_OF)
+        elapsed = time.perf_counter() - started
+        self.report(f"per-row loop ({loop_sample} rows)", loop_sample, elapsed)
+        self.stdout.write(f"{'':<28} about {total / (loop_sample / elapsed):.0f}s for all rows")
+        FeeCharge.objects.all().delete()
+
+        for label, as_of in (
+            ("bulk, first run", AS_OF),
+            ("bulk, same day again", AS_OF),
+            ("bulk, next day", AS_OF + timedelta(days=1)),
+        ):
+            started = time.perf_counter()
+            results = accrue_fees(as_of)
+            elapsed = time.perf_counter() - started
+            self.report(label, results["borrowings"], elapsed, results["charges"])
+
+    def report(self, label: str, rows: int, elapsed: float, charges: int | None = None) -> None:
+        written = "" if charges is None else f"  {charges} charges written"
+        self.stdout.write(
+            f"{label:<28} {elapsed:8.2f}s  {rows / elapsed:10.0f} borrowings/s{written}"
+        )
+
+
+class _Rollback(Exception):
+    pass
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import random
+
+import httpx
+from django.core.management.base import CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from borrowings.management.commands import benchmark_asgi
+
+
+class Command(benchmark_asgi.Command):
+    help = (
+        "Serves the read endpoints from a threaded gunicorn worker with and "
+        "without a database connection pool and compares their latency"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(wsgi_threads=16, concurrency=16)
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=10,
+            help="DB_POOL_MAX_SIZE of the pooled run.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The pool benchmark requires PostgreSQL.")
+
+        argv = [
+            "gunicorn", "library_service_api.wsgi:application",
+            "--workers", "1", "--threads", str(options["wsgi_threads"]),
+            "--bind", f"127.0.0.1:{options['port']}",
+        ]
+        try:
+            admin, user_ids, book_ids = self.seed(
+                options["users"], options["borrowings_per_user"]
+            )
+            token = str(AccessToken.for_user(admin))
+            env = os.environ.copy()
+            if options["db_latency"]:
+                proxy = benchmark_asgi.LatencyProxy(
+                    connection.settings_dict["HOST"] or "localhost",
+                    int(connection.settings_dict["PORT"] or 5432),
+                    options["db_latency"] / 1000,
+                )
+                env.update(POSTGRES_HOST="127.0.0.1", POSTGRES_PORT=str(proxy.port))
+            base = f"http://127.0.0.1:{options['port']}/api"
+            for label, pool_size in (("unpooled", 0), ("pooled", options["pool_size"])):
+                with self.serve(argv, options["port"], {**env, "DB_POOL_MAX_SIZE": str(pool_size)}):
+                    for endpoint, make_url in (
+                        ("book detail", lambda: f"{base}/books/{random.choice(book_ids)}/"),
+                        (
+                            "borrowing list",
+                            lambda: f"{base}/borrowings/?cursor=&limit=20"
+                            f"&user_id={random.choice(user_ids)}",
+                        ),
+                    ):
+                        results = asyncio.run(self.load(
+                            make_url, token, options["concurrency"], options["duration"]
+                        ))
+                        self.report(label, endpoint, results)
+                    if pool_size:
+                        self.report_pool(options["port"], token)
+        finally:
+            self.cleanup()
+
+    def report_pool(self, port: int, token: str) -> None:
+        """Prints the pool samples the server exposes on ``/metrics/``."""
+        response = httpx.get(
+            f"http://127.0.0.1:{port}/metrics/",
+            headers={"Authorize": f"Bearer {token}"},
+            timeout=10,
+        )
+        for line in response.text.splitlines():
+            name = line.partition("{")[0]
+            if name.startswith("library_db_pool_") and not name.endswith("_created"):
+                self.stdout.write(f"  {line}")
@@ -0,0 +1,115 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from books.models import Book
+from books.serializers import BookSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingAdminListSerializer, BorrowingListSerializer
+from library_service_api.plans import get_row_plan
+
+
+class Command(BaseCommand):
+    help = "Compares list serializers with the .values() row plans replacing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        try:
+            with transaction.atomic():
+                self.seed(sizes[-1], options["batch_size"])
+                for size in sizes:
+                    self.run(size, options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("Generated rows rolled back.")
+
+    def seed(self, total: int, batch_size: int) -> None:
+        rng = random.Random(42)
+        started = time.perf_counter()
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(
+                email=f"benchmark{number}@example.com",
+                first_name=f"First{number}",
+                last_name=f"Last{number}",
+                password="!",
+            )
+            for number in range(1000)
+        )
+        for offset in range(0, total, batch_size):
+            count = min(batch_size, total - offset)
+            books = Book.objects.bulk_create(
+                Book(
+                    name=f"Benchmark book {offset + number}",
+                    author=f"Author {rng.randint(1, 5000)}",
+                    cover=rng.choice(Book.CoverChoices.values),
+                    inventory=rng.randint(0, 20),
+                    daily_fee=rng.randint(10, 500) / 100,
+                )
+                for number in range(count)
+            )
+            Borrowing.objects.bulk_create(
+                Borrowing(
+                    borrow_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)),
+                    expected_return_date=date(2025, 6, 1),
+                    book=book,
+                    user=rng.choice(users),
+                    is_active=rng.random() < 0.3,
+                )
+                for book in books
+            )
+        with connection.cursor() as cursor:
+            for model in (get_user_model(), Book, Borrowing):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f"ANALYZE {table}")
+        self.stdout.write(
+            f"Seeded {total} books and borrowings in {time.perf_counter() - started:.1f}s"
+        )
+
+    def run(self, size: int, repeat: int) -> None:
+        cases = (
+            ("books", BookSerializer, Book.objects.order_by("id")),
+            (
+                "borrowings",
+                BorrowingListSerializer,
+                Borrowing.objects.select_related("book").order_by("id"),
+            ),
+            (
+                "admin borrowings",
+                BorrowingAdminListSerializer,
+                Borrowing.objects.select_related("book", "user").order_by("id"),
+            ),
+        )
+        for label, serializer_class, queryset in cases:
+            plan = get_row_plan(serializer_class, None, queryset.model)
+            serializer_time = self.best_of(
+                repeat, lambda: serializer_class(queryset[:size], many=True).data
+            )
+            plan_time = self.best_of(
+                repeat, lambda: plan.represent_many(queryset.values(*plan.lookups)[:size])
+            )
+            self.stdout.write(
+                f"{size:>7} {label:<17} serializer={serializer_time:9.1f}ms "
+                f"plan={plan_time:9.1f}ms speedup={serializer_time / plan_time:5.1f}x"
+            )
+
+    @staticmethod
+    def best_of(repeat: int, build) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build()
+            timings.append((time.perf_counter() - started) * 1000)
+        return min(timings)
+
+
+class _Rollback(Exception):
+    pass
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.notifications.outbox import (
+    RateLimiter,
+    adispatch_pending,
+    dispatch_pending,
+    get_setting,
+)
+from borrowings.notifications.telegram import AsyncTelegramClient, TelegramClient
+
+
+class Command(BaseCommand):
+    help = "Delivers queued borrowing notifications to Telegram"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no due notifications are left instead of polling.",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_async",
+            help="Send each batch concurrently from an event loop.",
+        )
+
+    def handle(self, *args, **options):
+        client_class = AsyncTelegramClient if options["use_async"] else TelegramClient
+        try:
+            client = client_class.from_settings()
+        except ValueError as error:
+            raise CommandError(str(error))
+        limiter = RateLimiter(get_setting("RATE_LIMIT"))
+
+        try:
+            if options["use_async"]:
+                async_to_sync(self.run_async)(client, limiter, options["once"])
+            else:
+                self.run(client, limiter, options["once"])
+        except KeyboardInterrupt:
+            pass
+
+    def run(self, client: TelegramClient, limiter: RateLimiter, once: bool) -> None:
+        try:
+            while True:
+                self.report(dispatch_pending(client, limiter))
+                if once:
+                    break
+                time.sleep(get_setting("POLL_INTERVAL"))
+        finally:
+            client.close()
+
+    async def run_async(self, client: AsyncTelegramClient, limiter: RateLimiter, once: bool) -> None:
+        try:
+            while True:
+                self.report(await adispatch_pending(client, limiter))
+                if once:
+                    break
+                await asyncio.sleep(get_setting("POLL_INTERVAL"))
+        finally:
+            await client.close()
+
+    def report(self, results: dict) -> None:
+        if any(results.values()):
+            self.stdout.write(
+                f"sent={results['sent']} retry={results['retry']} failed={results['failed']} "
+                f"released={results['released']}"
+            )
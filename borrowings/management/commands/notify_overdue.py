@@ -0,0 +1,41 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.models import current_date
+from borrowings.overdue import send_overdue_reminders
+
+
+class Command(BaseCommand):
+    help = "Queues one reminder per user for borrowings that fell overdue since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Treat this ISO date as today. Defaults to the current date.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of users handled per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options["date"]) if options["date"] else current_date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        started = time.perf_counter()
+        results = send_overdue_reminders(today, options["chunk_size"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Queued {results['reminders']} reminders for {results['borrowings']} "
+            f"overdue borrowings in {elapsed:.2f}s "
+            f"({results['borrowings'] / elapsed:.0f} rows/s)"
+        )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.popularity import rebuild_popularity
+
+
+class Command(BaseCommand):
+    help = "Recounts the book popularity counters from the borrowing history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1_000,
+            help="Number of books recounted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        started = time.perf_counter()
+        written = rebuild_popularity(options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Wrote {written} popularity counters in {elapsed:.2f}s")
@@ -0,0 +1,38 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from borrowings.models import current_date
+from borrowings.rollups import catch_up
+
+
+class Command(BaseCommand):
+    help = "Rolls up borrowings and returns per day for every day finished since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Treat this ISO date as today; days before it are rolled up.",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            help="Number of days rolled up per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options["date"]) if options["date"] else current_date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+        if options["chunk_days"] is not None and options["chunk_days"] < 1:
+            raise CommandError("--chunk-days must be positive.")
+
+        started = time.perf_counter()
+        results = catch_up(today, options["chunk_days"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Rolled up {results['days']} days into {results['rows']} rows in {elapsed:.2f}s"
+        )
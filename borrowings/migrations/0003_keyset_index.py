@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_keyset_index"),
+        ("borrowings", "0002_alter_borrowing_borrow_date"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["borrow_date", "id"], name="borrowing_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_isbn"),
+        ("borrowings", "0003_keyset_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                fields=["user", "is_active", "borrow_date", "id"],
+                name="borrowing_user_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["expected_return_date"],
+                name="borrowing_overdue_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["book"],
+                name="borrowing_active_book_idx",
+            ),
+        ),
+    ]
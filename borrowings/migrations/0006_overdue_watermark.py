@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0005_notification"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobWatermark",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("value", models.DateField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="borrowing",
+            name="overdue_notified_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.1.7 on 2026-10-18 05:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+COLUMNS = (
+    "id, borrow_date, expected_return_date, actual_return_date, "
+    "book_id, user_id, is_active, overdue_notified_at"
+)
+
+CREATE_VIEW_SQL = f"""
+    CREATE VIEW borrowings_borrowinghistory AS
+    SELECT {COLUMNS} FROM borrowings_borrowing
+    UNION ALL
+    SELECT {COLUMNS} FROM borrowings_archivedborrowing
+"""
+
+DROP_VIEW_SQL = "DROP VIEW IF EXISTS borrowings_borrowinghistory"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_isbn"),
+        ("borrowings", "0006_overdue_watermark"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BorrowingHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("borrow_date", models.DateField()),
+                ("expected_return_date", models.DateField()),
+                ("actual_return_date", models.DateField(blank=True, null=True)),
+                ("is_active", models.BooleanField()),
+                (
+                    "overdue_notified_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+            ],
+            options={
+                "db_table": "borrowings_borrowinghistory",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedBorrowing",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("borrow_date", models.DateField()),
+                ("expected_return_date", models.DateField()),
+                ("actual_return_date", models.DateField(blank=True, null=True)),
+                ("is_active", models.BooleanField(default=False)),
+                (
+                    "overdue_notified_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_borrowings",
+                        to="books.book",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_borrowings",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["borrow_date", "id"],
+                        name="archived_borrowing_keyset_idx",
+                    ),
+                    models.Index(
+                        fields=["user", "borrow_date", "id"],
+                        name="archived_borrowing_user_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW_SQL, DROP_VIEW_SQL),
+    ]
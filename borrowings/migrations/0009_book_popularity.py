@@ -0,0 +1,61 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_isbn"),
+        ("borrowings", "0008_fee_charge"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookPopularity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("WEEK", "Week"), ("MONTH", "Month"), ("ALL", "All")],
+                        max_length=5,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("borrowings", models.PositiveIntegerField(default=0)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="popularity",
+                        to="books.book",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["period", "period_start", "-borrowings", "book"],
+                        name="book_popularity_top_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("book", "period", "period_start"),
+                        name="book_popularity_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_isbn"),
+        ("borrowings", "0009_book_popularity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyBookBorrowings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("borrowed", models.PositiveIntegerField(default=0)),
+                ("returned", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyBorrowingTotals",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("borrowed", models.PositiveIntegerField(default=0)),
+                ("returned", models.PositiveIntegerField(default=0)),
+                ("day", models.DateField(unique=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyCohortBorrowings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("borrowed", models.PositiveIntegerField(default=0)),
+                ("returned", models.PositiveIntegerField(default=0)),
+                ("cohort", models.DateField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedborrowing",
+            index=models.Index(
+                fields=["actual_return_date"], name="archived_borrowing_return_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowing",
+            index=models.Index(
+                condition=models.Q(("actual_return_date__isnull", False)),
+                fields=["actual_return_date"],
+                name="borrowing_returned_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailybookborrowings",
+            name="book",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="daily_borrowings",
+                to="books.book",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailycohortborrowings",
+            index=models.Index(fields=["day"], name="daily_cohort_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailycohortborrowings",
+            constraint=models.UniqueConstraint(
+                fields=("cohort", "day"), name="daily_cohort_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailybookborrowings",
+            index=models.Index(fields=["day"], name="daily_book_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailybookborrowings",
+            constraint=models.UniqueConstraint(
+                fields=("book", "day"), name="daily_book_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+COLUMNS = (
+    "id, borrow_date, expected_return_date, actual_return_date, "
+    "book_id, user_id, is_active, overdue_notified_at"
+)
+
+CREATE_VIEW_SQL = f"""
+    CREATE VIEW borrowings_borrowinghistory AS
+    SELECT {COLUMNS} FROM borrowings_borrowing
+    UNION ALL
+    SELECT {COLUMNS} FROM borrowings_archivedborrowing
+"""
+
+DROP_VIEW_SQL = "DROP VIEW IF EXISTS borrowings_borrowinghistory"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_book_isbn"),
+        ("borrowings", "0010_daily_rollups"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # SQLite adds constraints by rebuilding the table, which the history
+    # view would block, so the view is dropped around the change.
+    operations = [
+        migrations.RunSQL(DROP_VIEW_SQL, CREATE_VIEW_SQL),
+        migrations.AddConstraint(
+            model_name="archivedborrowing",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("expected_return_date__gte", models.F("borrow_date"))
+                ),
+                name="archived_expected_return_after_borrow",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="archivedborrowing",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    ("actual_return_date__gte", models.F("borrow_date"))
+                ),
+                name="archived_actual_return_after_borrow",
+            ),
+        ),
+        migrations.RunSQL(CREATE_VIEW_SQL, DROP_VIEW_SQL),
+    ]
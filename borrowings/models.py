@@ -25,6 +25,7 @@ class Borrowing(models.Model):
         related_name="borrowings",
     )
     is_active = models.BooleanField(default=True)
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         constraints = [
@@ -37,6 +38,312 @@ class Borrowing(models.Model):
                 name="actual_return_after_borrow"
             )
         ]
+        indexes = [
+            models.Index(fields=["borrow_date", "id"], name="borrowing_keyset_idx"),
+            models.Index(
+                fields=["user", "is_active", "borrow_date", "id"],
+                name="borrowing_user_active_idx",
+            ),
+            # Only active borrowings are ever checked for being overdue or
+            # for holding a copy of a book, and they are a small share of
+            # all rows, so these indexes leave returned borrowings out.
+            models.Index(
+                fields=["expected_return_date"],
+                condition=Q(is_active=True),
+                name="borrowing_overdue_idx",
+            ),
+            models.Index(
+                fields=["book"],
+                condition=Q(is_active=True),
+                name="borrowing_active_book_idx",
+            ),
+            # Daily rollups count the returns of each day.
+            models.Index(
+                fields=["actual_return_date"],
+                condition=Q(actual_return_date__isnull=False),
+                name="borrowing_returned_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.book.name} ({self.borrow_date} - {self.expected_return_date})"
+
+
+class ArchivedBorrowing(models.Model):
+    """
+    Borrowings returned long ago, moved out of ``Borrowing`` by
+    ``manage.py archive_borrowings`` so the table queried for active loans
+    stays small. Rows keep their ids.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField(null=True, blank=True)
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="archived_borrowings",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="archived_borrowings",
+        db_index=False,
+    )
+    is_active = models.BooleanField(default=False)
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(expected_return_date__gte=F("borrow_date")),
+                name="archived_expected_return_after_borrow"
+            ),
+            models.CheckConstraint(
+                check=Q(actual_return_date__gte=F("borrow_date")),
+                name="archived_actual_return_after_borrow"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["borrow_date", "id"], name="archived_borrowing_keyset_idx"),
+            models.Index(
+                fields=["user", "borrow_date", "id"],
+                name="archived_borrowing_user_idx",
+            ),
+            models.Index(fields=["actual_return_date"], name="archived_borrowing_return_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.book.name} ({self.borrow_date} - {self.actual_return_date})"
+
+
+class BorrowingHistory(models.Model):
+    """
+    Read-only view over ``Borrowing`` and ``ArchivedBorrowing``, so lists
+    and details show archived borrowings too. The database pushes filters
+    and keyset ranges down into both tables' indexes.
+    """
+
+    # Versions that invalidate counts cached for this view.
+    version_tables = ("borrowings_borrowing", "borrowings_archivedborrowing")
+
+    borrow_date = models.DateField()
+    expected_return_date = models.DateField()
+    actual_return_date = models.DateField(null=True, blank=True)
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        related_name="+",
+        db_constraint=False,
+    )
+    is_active = models.BooleanField()
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        managed = False
+        db_table = "borrowings_borrowinghistory"
 
     def __str__(self) -> str:
         return f"{self.book.name} ({self.borrow_date} - {self.expected_return_date})"
+
+
+class FeeCharge(models.Model):
+    """
+    Ledger of what borrowings cost: the rental of each borrowing and the
+    fine for keeping it past the expected return date, one row per kind.
+
+    ``manage.py accrue_fees`` recomputes the rows of active and recently
+    returned borrowings in bulk, so running it again for the same day
+    changes nothing. ``borrowing_id`` is not a foreign key, so charges
+    outlive the move of their borrowing to ``ArchivedBorrowing``.
+    """
+
+    class KindChoices(models.TextChoices):
+        RENTAL = "RENTAL"
+        FINE = "FINE"
+
+    borrowing_id = models.BigIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="fee_charges",
+        db_index=False,
+    )
+    kind = models.CharField(max_length=6, choices=KindChoices.choices)
+    days = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    accrued_through = models.DateField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["borrowing_id", "kind"], name="fee_charge_borrowing_kind_unique"
+            ),
+        ]
+        indexes = [
+            # Balances are summed from the index alone.
+            models.Index(fields=["user", "kind", "amount"], name="fee_charge_user_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} of borrowing {self.borrowing_id}: {self.amount}"
+
+
+class BookPopularity(models.Model):
+    """
+    How many times a book was borrowed in a week, a month and in total.
+
+    Counters are raised in the transaction that checks a book out, so the
+    most borrowed books are read from a few rows instead of counting
+    borrowings. ``manage.py rebuild_popularity`` recounts them from the
+    borrowing history.
+    """
+
+    class PeriodChoices(models.TextChoices):
+        WEEK = "WEEK"
+        MONTH = "MONTH"
+        ALL = "ALL"
+
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="popularity",
+        db_index=False,
+    )
+    period = models.CharField(max_length=5, choices=PeriodChoices.choices)
+    # Monday of the week, first of the month, or date.min for all time.
+    period_start = models.DateField()
+    borrowings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "period", "period_start"], name="book_popularity_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["period", "period_start", "-borrowings", "book"],
+                name="book_popularity_top_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.book_id} {self.period} {self.period_start}: {self.borrowings}"
+
+
+class DailyRollup(models.Model):
+    """
+    Borrowings opened and returned on one day, counted from the borrowing
+    history by ``manage.py rollup_borrowings``. Active loans at the end of
+    a day are the sum of ``borrowed - returned`` up to it.
+    """
+
+    day = models.DateField()
+    borrowed = models.PositiveIntegerField(default=0)
+    returned = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyBorrowingTotals(DailyRollup):
+    day = models.DateField(unique=True)
+
+    def __str__(self) -> str:
+        return f"{self.day}: +{self.borrowed} -{self.returned}"
+
+
+class DailyBookBorrowings(DailyRollup):
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="daily_borrowings",
+        db_index=False,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["book", "day"], name="daily_book_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="daily_book_day_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.book_id} {self.day}: +{self.borrowed} -{self.returned}"
+
+
+class DailyCohortBorrowings(DailyRollup):
+    # First day of the month the borrowers joined in.
+    cohort = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cohort", "day"], name="daily_cohort_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="daily_cohort_day_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.cohort} {self.day}: +{self.borrowed} -{self.returned}"
+
+
+class Notification(models.Model):
+    """
+    Outbox of messages to staff, written in the transaction that caused them.
+
+    A worker (``manage.py dispatch_notifications``) delivers pending rows
+    once ``next_attempt_at`` has passed, so requests never wait on the
+    messaging API and no message is lost if the sender is down.
+    """
+
+    class StatusChoices(models.TextChoices):
+        PENDING = "PENDING"
+        SENT = "SENT"
+        FAILED = "FAILED"
+
+    message = models.TextField()
+    status = models.CharField(
+        max_length=7,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=Q(status="PENDING"),
+                name="notification_pending_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.status}: {self.message[:50]}"
+
+
+class JobWatermark(models.Model):
+    """How far an incremental job has processed, so the next run resumes there."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+from borrowings.models import Notification
+from borrowings.notifications.telegram import AsyncTelegramClient, TelegramClient, TelegramError
+from library_service_api.metrics import NOTIFICATION_DELIVERIES, NOTIFICATION_LATENCY
+
+
+DEFAULTS = {
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF_BASE": 2,
+    "BACKOFF_MAX": 3600,
+    "RATE_LIMIT": 1,
+    "LEASE": 60,
+    "POLL_INTERVAL": 2,
+}
+
+
+def get_setting(name: str):
+    return getattr(settings, "NOTIFICATION_OUTBOX", {}).get(name, DEFAULTS[name])
+
+
+def enqueue(message: str) -> Notification:
+    """Queue ``message``; it is only delivered if the caller's transaction commits."""
+    return Notification.objects.create(message=message)
+
+
+def get_backoff(attempts: int) -> float:
+    return min(get_setting("BACKOFF_BASE") ** attempts, get_setting("BACKOFF_MAX"))
+
+
+def get_lease(size: int, timeout: float) -> float:
+    """
+    Seconds a batch of ``size`` is held: sending it at ``RATE_LIMIT``, the
+    last request's ``timeout``, and ``LEASE`` to spare.
+    """
+    rate = get_setting("RATE_LIMIT")
+    return (size / rate if rate else 0) + timeout + get_setting("LEASE")
+
+
+class RateLimiter:
+    """Spaces calls at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self, deadline: datetime | None = None) -> bool:
+        """
+        Take the next slot, sleeping until it is free. Returns False without
+        taking one if ``deadline`` passes first.
+        """
+        while not is_past(deadline):
+            if (delay := self._acquire()) <= 0:
+                return True
+            time.sleep(delay)
+        return False
+
+    async def await_turn(self, deadline: datetime | None = None) -> bool:
+        while not is_past(deadline):
+            if (delay := self._acquire()) <= 0:
+                return True
+            await asyncio.sleep(delay)
+        return False
+
+    def _acquire(self) -> float:
+        """Take the slot if it is free, or return how long until it is."""
+        with self._lock:
+            current = time.monotonic()
+            if self.next_at > current:
+                return self.next_at - current
+            self.next_at = current + self.interval
+            return 0
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+def is_past(deadline: datetime | None) -> bool:
+    return deadline is not None and now() > deadline
+
+
+def claim_batch(size: int, lease: float) -> list[Notification]:
+    """
+    Take up to ``size`` due notifications for this worker.
+
+    Claimed rows are pushed ``lease`` seconds into the future, so other
+    workers skip them while they are being sent, and a worker that dies
+    mid-batch leaves them to be retried once the lease runs out. The
+    returned notifications carry the new ``next_attempt_at``, which
+    updates recording their outcome are conditioned on.
+    """
+    claimed_at = now()
+    leased_until = claimed_at + timedelta(seconds=lease)
+    with transaction.atomic():
+        batch = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.StatusChoices.PENDING, next_attempt_at__lte=claimed_at)
+            .order_by("next_attempt_at", "id")[:size]
+        )
+        Notification.objects.filter(pk__in=[notification.pk for notification in batch]).update(
+            next_attempt_at=leased_until
+        )
+    for notification in batch:
+        notification.next_attempt_at = leased_until
+    return batch
+
+
+def get_deadline(
+    client: TelegramClient | AsyncTelegramClient, batch: list[Notification]
+) -> datetime:
+    """The last moment a send can start and still finish within the batch's lease."""
+    return batch[0].next_attempt_at - timedelta(seconds=client.timeout)
+
+
+def held_notification(notification: Notification) -> QuerySet:
+    """The notification's row, unless it was claimed again since ``notification`` was read."""
+    return Notification.objects.filter(
+        pk=notification.pk, next_attempt_at=notification.next_attempt_at
+    )
+
+
+def deliver(
+    client: TelegramClient,
+    limiter: RateLimiter,
+    notification: Notification,
+    deadline: datetime | None = None,
+) -> str:
+    """
+    Send one notification and record the outcome: sent, retry or failed.
+    If its turn comes after ``deadline`` it is released unsent instead,
+    without using up a send slot, to be claimed again once the lease runs
+    out.
+    """
+    if not limiter.wait(deadline):
+        return "released"
+    try:
+        client.send(notification.message)
+    except TelegramError as error:
+        outcome, changes = get_outcome(limiter, notification, error)
+    else:
+        outcome, changes = get_outcome(limiter, notification)
+    held_notification(notification).update(**changes)
+    record_outcome(notification, outcome, changes)
+    return outcome
+
+
+async def adeliver(
+    client: AsyncTelegramClient,
+    limiter: RateLimiter,
+    notification: Notification,
+    deadline: datetime | None = None,
+) -> str:
+    """``deliver`` for an event loop, where other sends go on while this one waits."""
+    if not await limiter.await_turn(deadline):
+        return "released"
+    try:
+        await client.send(notification.message)
+    except TelegramError as error:
+        outcome, changes = get_outcome(limiter, notification, error)
+    else:
+        outcome, changes = get_outcome(limiter, notification)
+    await held_notification(notification).aupdate(**changes)
+    record_outcome(notification, outcome, changes)
+    return outcome
+
+
+def get_outcome(
+    limiter: RateLimiter, notification: Notification, error: TelegramError | None = None
+) -> tuple[str, dict]:
+    """The outcome of a delivery attempt and the field updates recording it."""
+    attempts = notification.attempts + 1
+    if error is None:
+        return "sent", {
+            "status": Notification.StatusChoices.SENT,
+            "attempts": attempts,
+            "sent_at": now(),
+        }
+    if error.retry_after:
+        limiter.pause(error.retry_after)
+    if not error.retry or attempts >= get_setting("MAX_ATTEMPTS"):
+        return "failed", {
+            "status": Notification.StatusChoices.FAILED,
+            "attempts": attempts,
+            "last_error": str(error),
+        }
+    delay = error.retry_after if error.retry_after is not None else get_backoff(attempts)
+    return "retry", {
+        "attempts": attempts,
+        "next_attempt_at": now() + timedelta(seconds=delay),
+        "last_error": str(error),
+    }
+
+
+def record_outcome(notification: Notification, outcome: str, changes: dict) -> None:
+    NOTIFICATION_DELIVERIES.labels(outcome).inc()
+    if outcome == "sent":
+        NOTIFICATION_LATENCY.observe((changes["sent_at"] - notification.created_at).total_seconds())
+
+
+def dispatch_pending(client: TelegramClient, limiter: RateLimiter) -> dict:
+    """Deliver due notifications batch by batch until none are left."""
+    results = {"sent": 0, "retry": 0, "failed": 0, "released": 0}
+    size = get_setting("BATCH_SIZE")
+    while True:
+        batch = claim_batch(size, get_lease(size, client.timeout))
+        if not batch:
+            return results
+        deadline = get_deadline(client, batch)
+        for notification in batch:
+            results[deliver(client, limiter, notification, deadline)] += 1
+
+
+async def adispatch_pending(client: AsyncTelegramClient, limiter: RateLimiter) -> dict:
+    """
+    ``dispatch_pending`` sending a whole batch at once: the limiter still
+    spaces the requests, but each one no longer waits for the previous
+    response, so a slow Bot API doesn't lower the rate.
+    """
+    results = {"sent": 0, "retry": 0, "failed": 0, "released": 0}
+    size = get_setting("BATCH_SIZE")
+    while True:
+        batch = await sync_to_async(claim_batch)(size, get_lease(size, client.timeout))
+        if not batch:
+            return results
+        deadline = get_deadline(client, batch)
+        outcomes = await asyncio.gather(
+            *(adeliver(client, limiter, notification, deadline) for notification in batch)
+        )
+        for outcome in outcomes:
+            results[outcome] += 1
@@ -1,17 +1,91 @@
-import os
+import httpx
 import requests
-from dotenv import load_dotenv
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 
-load_dotenv()
+class TelegramError(Exception):
+    """
+    Delivery failed. ``retry`` tells whether sending again may succeed and
+    ``retry_after`` is the wait in seconds Telegram asked for, if any.
+    """
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-CHAT_ID = os.getenv("CHAT_ID")
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+    def __init__(self, message: str, retry: bool = True, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
 
 
-def send_telegram_message(message: str) -> None:
-    if not BOT_TOKEN or not CHAT_ID:
-        raise ValueError("BOT_TOKEN or CHAT_ID must be set.")
+def raise_for_response(status_code: int, reason: str, get_payload) -> None:
+    """Turn an unsuccessful Bot API response into a ``TelegramError``."""
+    if status_code < 400:
+        return
+    try:
+        payload = get_payload()
+    except ValueError:
+        payload = {}
+    description = payload.get("description") or reason
+    if status_code == 429:
+        retry_after = payload.get("parameters", {}).get("retry_after")
+        raise TelegramError(description, retry_after=retry_after)
+    raise TelegramError(f"{status_code}: {description}", retry=status_code >= 500)
 
-    requests.post(TELEGRAM_API_URL, json={"chat_id": CHAT_ID, "text": message})
+
+class BaseTelegramClient:
+    def __init__(self, bot_token: str, chat_id: str, api_url: str, timeout: float) -> None:
+        if not bot_token or not chat_id:
+            raise ValueError("BOT_TOKEN or CHAT_ID must be set.")
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.api_url = api_url
+        self.chat_id = chat_id
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls):
+        config = settings.TELEGRAM
+        return cls(config["BOT_TOKEN"], config["CHAT_ID"], config["API_URL"], config["TIMEOUT"])
+
+
+class TelegramClient(BaseTelegramClient):
+    """Sends messages to one chat over a pooled keep-alive session."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        self.session.mount(self.api_url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+    def send(self, message: str) -> None:
+        try:
+            response = self.session.post(
+                self.url,
+                json={"chat_id": self.chat_id, "text": message},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as error:
+            raise TelegramError(str(error)) from error
+        raise_for_response(response.status_code, response.reason, response.json)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncTelegramClient(BaseTelegramClient):
+    """``TelegramClient`` for event loops: sending awaits the response."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout, limits=httpx.Limits(max_connections=4)
+        )
+
+    async def send(self, message: str) -> None:
+        try:
+            response = await self.client.post(
+                self.url, json={"chat_id": self.chat_id, "text": message}
+            )
+        except httpx.HTTPError as error:
+            raise TelegramError(str(error)) from error
+        raise_for_response(response.status_code, response.reason_phrase, response.json)
+
+    async def close(self) -> None:
+        await self.client.aclose()
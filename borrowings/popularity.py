@@ -0,0 +1,140 @@
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, DateField, QuerySet, Value
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from books.models import Book
+from borrowings.models import BookPopularity, Borrowing, BorrowingHistory
+
+
+DEFAULTS = {
+    "CACHE_TIMEOUT": 60,
+    "MAX_LIMIT": 100,
+}
+
+Period = BookPopularity.PeriodChoices
+
+
+def get_setting(name: str):
+    return getattr(settings, "BOOK_POPULARITY", {}).get(name, DEFAULTS[name])
+
+
+def get_period_starts(day: date) -> dict[str, date]:
+    """The start of each counted period that ``day`` falls in."""
+    return {
+        Period.WEEK: day - timedelta(days=day.weekday()),
+        Period.MONTH: day.replace(day=1),
+        Period.ALL: date.min,
+    }
+
+
+def count_borrowings(borrowings: Iterable[Borrowing]) -> None:
+    """
+    Add ``borrowings`` to their books' counters with one upsert, in the
+    caller's transaction.
+
+    Rows are written in key order, so concurrent checkouts of the same
+    books lock them in the same order and can't deadlock.
+    """
+    counts = Counter()
+    for borrowing in borrowings:
+        for period, start in get_period_starts(borrowing.borrow_date).items():
+            counts[borrowing.book_id, period, start] += 1
+    if not counts:
+        return
+
+    table = BookPopularity._meta.db_table
+    rows = sorted(counts.items())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (book_id, period, period_start, borrowings)
+            VALUES {", ".join(["(%s, %s, %s, %s)"] * len(rows))}
+            ON CONFLICT (book_id, period, period_start) DO UPDATE
+            SET borrowings = {table}.borrowings + excluded.borrowings
+            """,
+            [value for key, count in rows for value in (*key, count)],
+        )
+
+
+def get_top_books(period: str, period_start: date, limit: int) -> list[dict]:
+    """The ``limit`` most borrowed books in the ``period`` from ``period_start``."""
+    return [
+        {
+            "id": row["book_id"],
+            "name": row["book__name"],
+            "author": row["book__author"],
+            "borrowings": row["borrowings"],
+        }
+        for row in BookPopularity.objects.filter(period=period, period_start=period_start)
+        .order_by("-borrowings", "book_id")
+        .values("book_id", "book__name", "book__author", "borrowings")[:limit]
+    ]
+
+
+def rebuild_counters(period: str, history: QuerySet, book_ids: list[int]) -> int:
+    """
+    Recount the ``period`` counters of ``book_ids`` in one transaction and
+    return the number written.
+
+    The existing counters are locked before counting, so checkouts of
+    these books wait for the recount instead of being overwritten by it.
+    Recounted counters are upserted in key order, as checkouts write
+    them, and counters left without borrowings are deleted.
+    """
+    with transaction.atomic():
+        existing = {
+            (book_id, start): pk
+            for book_id, start, pk in BookPopularity.objects.select_for_update()
+            .filter(period=period, book_id__in=book_ids)
+            .order_by("book_id", "period_start")
+            .values_list("book_id", "period_start", "pk")
+        }
+        counts = {
+            (row["book_id"], row["start"]): row["count"]
+            for row in history.filter(book_id__in=book_ids)
+            .values("book_id", "start")
+            .annotate(count=Count("id"))
+        }
+        BookPopularity.objects.bulk_create(
+            [
+                BookPopularity(book_id=book_id, period=period, period_start=start, borrowings=count)
+                for (book_id, start), count in sorted(counts.items())
+            ],
+            update_conflicts=True,
+            unique_fields=["book", "period", "period_start"],
+            update_fields=["borrowings"],
+        )
+        BookPopularity.objects.filter(
+            pk__in=[pk for key, pk in existing.items() if key not in counts]
+        ).delete()
+    return len(counts)
+
+
+def rebuild_popularity(batch_size: int = 1_000) -> int:
+    """
+    Recount every counter from the borrowing history, archive included.
+
+    Borrowings are grouped by the database; only one row per book and
+    period reaches Python. Books are recounted ``batch_size`` at a time,
+    one period per transaction, so a checkout only ever waits for the
+    recount of its own book. Returns the number of counters written.
+    """
+    history = BorrowingHistory.objects.order_by()
+    groups = (
+        (Period.WEEK, history.annotate(start=TruncWeek("borrow_date"))),
+        (Period.MONTH, history.annotate(start=TruncMonth("borrow_date"))),
+        (Period.ALL, history.annotate(start=Value(date.min, output_field=DateField()))),
+    )
+    written = 0
+    book_ids = Book.objects.order_by("id").values_list("id", flat=True)
+    last_id = 0
+    while batch := list(book_ids.filter(id__gt=last_id)[:batch_size]):
+        for period, queryset in groups:
+            written += rebuild_counters(period, queryset, batch)
+        last_id = batch[-1]
+    return written
@@ -1,8 +1,15 @@
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
 
+from borrowings.checkout import checkout_book
 from borrowings.models import Borrowing
+from borrowings.popularity import get_setting as get_popularity_setting
+from borrowings.rollups import get_setting as get_rollup_setting
+from books.models import Book
 from books.serializers import BookSerializer
+from library_service_api.fieldsets import SparseFieldsetSerializerMixin
+
+
+MAX_BATCH_SIZE = 50
 
 
 class BorrowingSerializer(serializers.ModelSerializer):
@@ -16,14 +23,112 @@ class BorrowingSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, attrs):
-        if attrs["book"].inventory == 0:
-            raise ValidationError("This book is out of stock.")
+        borrow_date = attrs.get("borrow_date") or Borrowing._meta.get_field("borrow_date").get_default()
+        if attrs["expected_return_date"] < borrow_date:
+            raise serializers.ValidationError(
+                {"expected_return_date": ["Expected return date can't be before the borrow date."]}
+            )
         return attrs
 
+    def create(self, validated_data):
+        return checkout_book(**validated_data)
+
+
+class PreloadedBookField(serializers.PrimaryKeyRelatedField):
+    """Looks books up in ``context["books"]``, loaded once for a whole batch."""
+
+    def to_internal_value(self, data):
+        try:
+            return self.context["books"][int(data)]
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+class BorrowingBatchItemSerializer(BorrowingSerializer):
+    book = PreloadedBookField(queryset=Book.objects.all())
+
+
+class BorrowingBatchSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+
+
+class BorrowingBatchReturnSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+
+
+class BorrowingBalanceSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    rental = serializers.DecimalField(max_digits=14, decimal_places=2)
+    fines = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    accrued_through = serializers.DateField(allow_null=True)
+
+
+class PopularBooksQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=["week", "month", "all"], default="week")
+    limit = serializers.IntegerField(min_value=1, default=10)
+
+    def validate_limit(self, value: int) -> int:
+        return min(value, get_popularity_setting("MAX_LIMIT"))
+
 
-class BorrowingListSerializer(serializers.ModelSerializer):
+class PopularBookSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    author = serializers.CharField()
+    borrowings = serializers.IntegerField()
+
+
+class PopularBooksSerializer(serializers.Serializer):
+    period = serializers.CharField()
+    period_start = serializers.DateField()
+    results = PopularBookSerializer(many=True)
+
+
+class BorrowingAnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    book = serializers.IntegerField(required=False)
+    cohort = serializers.DateField(required=False, input_formats=["%Y-%m"])
+
+    def validate(self, attrs):
+        if attrs["end"] < attrs["start"]:
+            raise serializers.ValidationError({"end": ["End can't be before start."]})
+        max_days = get_rollup_setting("MAX_RANGE_DAYS")
+        if (attrs["end"] - attrs["start"]).days >= max_days:
+            raise serializers.ValidationError({"end": [f"Ranges are limited to {max_days} days."]})
+        if "book" in attrs and "cohort" in attrs:
+            raise serializers.ValidationError("Filter by book or by cohort, not both.")
+        return attrs
+
+
+class DailyBorrowingsSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    borrowed = serializers.IntegerField()
+    returned = serializers.IntegerField()
+    active = serializers.IntegerField()
+
+
+class BorrowingAnalyticsSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    book = serializers.IntegerField(allow_null=True)
+    cohort = serializers.DateField(allow_null=True, format="%Y-%m")
+    rolled_up_until = serializers.DateField(allow_null=True)
+    days = DailyBorrowingsSerializer(many=True)
+
+
+class BorrowingListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     book = serializers.SlugRelatedField(read_only=True, slug_field="name")
 
+    expandable_fields = {"book": BookSerializer}
+
     class Meta:
         model = Borrowing
         fields = (
@@ -43,6 +148,12 @@ class BorrowingDetailSerializer(BorrowingListSerializer):
 class BorrowingAdminListSerializer(BorrowingListSerializer):
     user = serializers.CharField(read_only=True, source="user.get_full_name")
 
+    field_columns = {"user": ("user__first_name", "user__last_name")}
+
+    @staticmethod
+    def represent_user(first_name: str, last_name: str) -> str:
+        return f"{first_name} {last_name}".strip()
+
     class Meta(BorrowingListSerializer.Meta):
         fields = BorrowingListSerializer.Meta.fields + ("user",)
 
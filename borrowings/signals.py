@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from borrowings.cache import bump_user_version
+from borrowings.models import Borrowing
+from library_service_api.versioning import bump_model_version
+
+
+@receiver(post_save, sender=Borrowing)
+@receiver(post_delete, sender=Borrowing)
+def bump_borrowing_version(sender, instance, **kwargs):
+    bump_model_version(Borrowing)
+    bump_user_version(instance.user_id)
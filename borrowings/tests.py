@@ -1,21 +1,78 @@
-from datetime import date
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
 from django.contrib.auth import get_user_model
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.timezone import now
 
-from borrowings.models import Borrowing
+from borrowings.archive import archive_borrowings
+from borrowings.cache import get_borrowing_list_cache, reset_borrowing_list_cache
+from borrowings.checkout import checkout_book, return_borrowing
+from borrowings.fees import WATERMARK as FEE_WATERMARK, accrue_fees
+from borrowings.models import (
+    ArchivedBorrowing,
+    BookPopularity,
+    Borrowing,
+    DailyBookBorrowings,
+    DailyBorrowingTotals,
+    DailyCohortBorrowings,
+    FeeCharge,
+    JobWatermark,
+    Notification,
+    current_date,
+)
+from borrowings.notifications.outbox import (
+    RateLimiter,
+    adeliver,
+    claim_batch,
+    deliver,
+    enqueue,
+    get_lease,
+)
+from borrowings.notifications.telegram import TelegramClient
+from borrowings.overdue import WATERMARK, send_overdue_reminders
+from borrowings.popularity import rebuild_popularity
+from borrowings.rollups import catch_up
 from borrowings.serializers import (
+    MAX_BATCH_SIZE,
     BorrowingListSerializer,
     BorrowingDetailSerializer,
     BorrowingAdminListSerializer,
     BorrowingAdminDetailSerializer,
 )
-from books.tests import create_book
+from borrowings.views import BorrowingViewSet
+from library_service_api.fieldsets import SparseFieldset
+from library_service_api.metrics import REGISTRY, record_pool_stats, render_metrics
+from library_service_api.plans import get_row_plan
+from library_service_api.replicas import ReplicaRouter, use_primary
+from library_service_api.testing import QueryBudgetTestMixin
+from books.models import Book
+from books.tests import BOOK_URL, create_book
 
 
 BORROWING_URL = reverse("borrowings:borrowing-list")
@@ -25,9 +82,17 @@ def detail_url(borrowing_id: int) -> Response:
     return reverse("borrowings:borrowing-detail", args=[borrowing_id])
 
 
+BATCH_URL = reverse("borrowings:borrowing-batch-checkout")
+BATCH_RETURN_URL = reverse("borrowings:borrowing-batch-return")
+
+
+def return_url(borrowing_id: int) -> str:
+    return reverse("borrowings:borrowing-return-book", args=[borrowing_id])
+
+
 def create_borrowing(as_dict: bool=False, **params):
     defaults = {
-        "expected_return_date": date(2025, 6, 30),
+        "expected_return_date": current_date() + timedelta(days=14),
         "book": create_book(),
         "user": params.get("user") or get_user_model().objects.create_user(
             email="test@user.com", password="test123user"
@@ -159,3 +224,1869 @@ class AdminUserTest(TestCase):
         self.assertEqual(payload["expected_return_date"], borrowing.expected_return_date)
         self.assertEqual(payload["book"], borrowing.book.id)
         self.assertEqual(self.admin_user.id, borrowing.user.id)
+
+
+class BorrowingCursorPaginationTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        for day in (3, 1, 2, 1):
+            create_borrowing(
+                user=self.user,
+                borrow_date=date(2025, 1, day),
+                expected_return_date=date(2025, 2, 1),
+            )
+
+        self.client.force_authenticate(self.admin_user)
+
+    def test_cursor_pages_follow_keyset_ordering(self) -> None:
+        ids, url, params = [], BORROWING_URL, {"cursor": "", "limit": 3}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [borrowing["id"] for borrowing in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(
+            ids,
+            list(
+                Borrowing.objects.order_by("borrow_date", "id")
+                .values_list("id", flat=True)
+            )
+        )
+
+    def test_cursor_keeps_filters(self) -> None:
+        Borrowing.objects.filter(borrow_date=date(2025, 1, 1)).update(is_active=False)
+
+        response = self.client.get(
+            BORROWING_URL, {"cursor": "", "limit": 1, "is_active": "true"}
+        )
+        response = self.client.get(response.data["next"])
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["borrow_date"], "2025-01-03")
+        self.assertIsNone(response.data["next"])
+
+
+class BorrowingCountStrategyTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        for _ in range(3):
+            create_borrowing(
+                user=self.user, expected_return_date=current_date() + timedelta(days=14)
+            )
+
+        self.client.force_authenticate(self.admin_user)
+
+    def test_cached_count_is_reused_until_write(self) -> None:
+        response = self.client.get(BORROWING_URL, {"limit": 2})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(response.data["count_strategy"], "cached")
+        self.assertIsNotNone(response.data["next"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(BORROWING_URL, {"limit": 2})
+        self.assertEqual(response.data["count"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_borrowing(
+                user=self.user, expected_return_date=current_date() + timedelta(days=14)
+            )
+        response = self.client.get(BORROWING_URL, {"limit": 2})
+        self.assertEqual(response.data["count"], 4)
+
+    def test_cached_count_depends_on_filters(self) -> None:
+        Borrowing.objects.filter(pk=self.borrowing_ids()[0]).update(is_active=False)
+
+        active = self.client.get(BORROWING_URL, {"is_active": "true"})
+        returned = self.client.get(BORROWING_URL, {"is_active": "false"})
+
+        self.assertEqual(active.data["count"], 2)
+        self.assertEqual(returned.data["count"], 1)
+
+    def test_no_count_strategy(self) -> None:
+        with mock.patch.object(BorrowingViewSet, "count_strategy", "none"):
+            first = self.client.get(BORROWING_URL, {"limit": 2})
+            last = self.client.get(BORROWING_URL, {"limit": 2, "offset": 2})
+
+        self.assertNotIn("count", first.data)
+        self.assertEqual(first.data["count_strategy"], "none")
+        self.assertTrue(first.data["has_next"])
+        self.assertFalse(last.data["has_next"])
+        self.assertIsNone(last.data["next"])
+        self.assertEqual(len(last.data["results"]), 1)
+
+    def test_estimated_count_falls_back_to_exact_when_filtered(self) -> None:
+        with mock.patch.object(BorrowingViewSet, "count_strategy", "estimated"):
+            response = self.client.get(BORROWING_URL, {"user_id": self.user.id})
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(response.data["count_strategy"], "exact")
+
+    def borrowing_ids(self) -> list[int]:
+        return list(Borrowing.objects.order_by("id").values_list("id", flat=True))
+
+
+class BorrowingCatalogVersionTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.book = create_book(inventory=3)
+
+        self.client.force_authenticate(self.user)
+
+    def test_checkout_and_return_change_book_etag(self) -> None:
+        etag = self.client.get(BOOK_URL).headers["ETag"]
+
+        response = self.client.post(
+            BORROWING_URL,
+            {"book": self.book.id, "expected_return_date": current_date() + timedelta(days=14)}
+        )
+        book_list = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(book_list.status_code, status.HTTP_200_OK)
+        self.assertEqual(book_list.data["results"][0]["inventory"], 2)
+
+        etag = book_list.headers["ETag"]
+        self.client.get(return_url(response.data["id"]))
+        book_list = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(book_list.status_code, status.HTTP_200_OK)
+        self.assertEqual(book_list.data["results"][0]["inventory"], 3)
+
+
+@override_settings(BORROWING_LIST_CACHE={
+    "BACKEND": "library_service_api.caching.LRUCacheBackend",
+    "OPTIONS": {"max_entries": 16},
+})
+class BorrowingListCacheTest(TestCase):
+    def setUp(self) -> None:
+        reset_borrowing_list_cache()
+        self.addCleanup(reset_borrowing_list_cache)
+        self.client = APIClient()
+        self.user_1 = get_user_model().objects.create_user(
+            email="test_1@user.com", password="test123user"
+        )
+        self.user_2 = get_user_model().objects.create_user(
+            email="test_2@user.com", password="test123user"
+        )
+        self.borrowing = create_borrowing(
+            user=self.user_1, expected_return_date=current_date() + timedelta(days=14)
+        )
+
+        self.client.force_authenticate(self.user_1)
+
+    def test_repeated_list_is_served_from_cache(self) -> None:
+        first = self.client.get(BORROWING_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(BORROWING_URL)
+
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(
+            get_borrowing_list_cache().stats(), {"hits": 1, "misses": 1}
+        )
+
+    def test_create_and_return_invalidate_cache(self) -> None:
+        self.client.get(BORROWING_URL)
+
+        response = self.client.post(
+            BORROWING_URL,
+            {"book": create_book().id, "expected_return_date": current_date() + timedelta(days=14)}
+        )
+        after_create = self.client.get(BORROWING_URL)
+        self.client.get(return_url(response.data["id"]))
+        after_return = self.client.get(BORROWING_URL)
+
+        self.assertEqual(after_create.headers["X-Cache"], "MISS")
+        self.assertEqual(after_create.data["count"], 2)
+        self.assertEqual(after_return.headers["X-Cache"], "MISS")
+        self.assertIn(
+            False, [item["is_active"] for item in after_return.data["results"]]
+        )
+
+    def test_cache_is_per_user(self) -> None:
+        self.client.get(BORROWING_URL)
+
+        self.client.force_authenticate(self.user_2)
+        response = self.client.get(BORROWING_URL)
+
+        self.assertEqual(response.headers["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"], [])
+
+
+ASYNC_BORROWING_URL = reverse("borrowings:borrowing-list-async")
+
+
+def async_detail_url(borrowing_id: int) -> str:
+    return reverse("borrowings:borrowing-detail-async", args=[borrowing_id])
+
+
+class BorrowingAsyncViewTest(TestCase):
+    def setUp(self) -> None:
+        reset_borrowing_list_cache()
+        self.addCleanup(reset_borrowing_list_cache)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_1@user.com", password="test123user"
+        )
+        self.other = get_user_model().objects.create_user(
+            email="test_2@user.com", password="test123user"
+        )
+        self.borrowing = create_borrowing(user=self.user)
+        self.second = create_borrowing(
+            user=self.user, expected_return_date=current_date() + timedelta(days=28)
+        )
+        self.foreign = create_borrowing(user=self.other)
+
+    def test_anonymous_access_denied(self) -> None:
+        for url in (ASYNC_BORROWING_URL, async_detail_url(self.borrowing.id)):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_matches_sync_list(self) -> None:
+        admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        for user, params in (
+            (self.user, {}),
+            (self.user, {"cursor": "", "limit": 1}),
+            (admin, {}),
+            (admin, {"user_id": self.other.id, "is_active": "true"}),
+            (admin, {"fields": "id,book"}),
+        ):
+            with self.subTest(user=user.email, params=params):
+                self.client.force_authenticate(user)
+                expected = self.client.get(BORROWING_URL, params)
+                response = self.client.get(ASYNC_BORROWING_URL, params)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data["results"], expected.data["results"])
+
+    def test_user_list_is_cached_and_invalidated(self) -> None:
+        self.client.force_authenticate(self.user)
+
+        first = self.client.get(ASYNC_BORROWING_URL)
+        with self.assertNumQueries(0):
+            second = self.client.get(ASYNC_BORROWING_URL)
+        self.client.get(return_url(self.borrowing.id))
+        third = self.client.get(ASYNC_BORROWING_URL)
+
+        self.assertEqual(
+            [first.headers["X-Cache"], second.headers["X-Cache"], third.headers["X-Cache"]],
+            ["MISS", "HIT", "MISS"],
+        )
+        self.assertEqual(second.data, first.data)
+        self.assertIn(False, [item["is_active"] for item in third.data["results"]])
+
+    def test_retrieve_own_borrowings_only(self) -> None:
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(async_detail_url(self.borrowing.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.client.get(detail_url(self.borrowing.id)).data)
+        self.assertEqual(
+            self.client.get(async_detail_url(self.foreign.id)).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    async def test_served_through_asgi_with_token(self) -> None:
+        token = AccessToken.for_user(self.user)
+
+        response = await self.async_client.get(
+            ASYNC_BORROWING_URL, headers={"Authorize": f"Bearer {token}"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {item["id"] for item in response.json()["results"]},
+            {self.borrowing.id, self.second.id},
+        )
+
+
+EXPORT_URL = reverse("borrowings:borrowing-export")
+
+
+class BorrowingExportTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.com", password="test123admin", is_staff=True
+        )
+        expected_return_date = current_date() + timedelta(days=14)
+        self.borrowing_1 = create_borrowing(expected_return_date=expected_return_date)
+        self.borrowing_2 = create_borrowing(
+            user=self.admin, expected_return_date=expected_return_date, is_active=False
+        )
+
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params) -> list[dict]:
+        response = self.client.get(EXPORT_URL, {"format": "csv", **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.DictReader(content.splitlines()))
+
+    def test_csv_export(self) -> None:
+        rows = self.export()
+
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [self.borrowing_1.id, self.borrowing_2.id],
+        )
+        self.assertEqual(rows[0]["user_email"], "test@user.com")
+        self.assertEqual(rows[0]["book_name"], "test_name")
+        self.assertEqual(
+            rows[0]["expected_return_date"], self.borrowing_1.expected_return_date.isoformat()
+        )
+        self.assertEqual(rows[1]["is_active"], "False")
+
+    def test_export_filters(self) -> None:
+        self.assertEqual(
+            [int(row["id"]) for row in self.export(is_active="true")],
+            [self.borrowing_1.id],
+        )
+        self.assertEqual(
+            [int(row["id"]) for row in self.export(user_id=self.admin.id)],
+            [self.borrowing_2.id],
+        )
+
+    def test_ndjson_export(self) -> None:
+        response = self.client.get(EXPORT_URL, {"format": "ndjson"})
+        lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 2)
+
+    def test_export_is_staff_only(self) -> None:
+        self.client.force_authenticate(self.borrowing_1.user)
+
+        response = self.client.get(EXPORT_URL, {"format": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BorrowingSparseFieldsetTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.com", password="test123admin", is_staff=True
+        )
+        self.borrowing = create_borrowing(
+            user=self.user, expected_return_date=current_date() + timedelta(days=14)
+        )
+
+        self.client.force_authenticate(self.user)
+
+    def test_list_fields_skip_book_join(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BORROWING_URL, {"fields": "id,is_active"})
+
+        self.assertEqual(
+            response.data["results"], [{"id": self.borrowing.id, "is_active": True}]
+        )
+        self.assertNotIn("books_book", queries[-1]["sql"])
+
+    def test_list_book_name_in_one_query(self) -> None:
+        with self.assertNumQueries(2):
+            response = self.client.get(BORROWING_URL, {"fields": "id,book"})
+
+        self.assertEqual(response.data["results"][0]["book"], "test_name")
+
+    def test_expand_book(self) -> None:
+        response = self.client.get(
+            BORROWING_URL, {"fields": "id,book.name,book.inventory", "expand": "book"}
+        )
+
+        self.assertEqual(
+            response.data["results"][0]["book"], {"name": "test_name", "inventory": 10}
+        )
+
+    def test_detail_nested_fields(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                detail_url(self.borrowing.id), {"fields": "id,book.name"}
+            )
+
+        self.assertEqual(
+            response.data, {"id": self.borrowing.id, "book": {"name": "test_name"}}
+        )
+        self.assertNotIn('"daily_fee"', queries[-1]["sql"])
+
+    def test_admin_list_user_loads_name_only(self) -> None:
+        self.client.force_authenticate(self.admin)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(BORROWING_URL, {"fields": "id,user"})
+
+        self.assertEqual(response.data["results"], [{"id": self.borrowing.id, "user": ""}])
+        self.assertIn('"first_name"', queries[-1]["sql"])
+        self.assertNotIn('"password"', queries[-1]["sql"])
+
+
+class LeanListTest(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com",
+            password="test123user",
+            first_name="Jane",
+            last_name="Austen",
+        )
+        expected_return_date = current_date() + timedelta(days=14)
+        create_borrowing(user=self.user, expected_return_date=expected_return_date)
+        self.returned = create_borrowing(
+            user=self.user,
+            expected_return_date=expected_return_date,
+            actual_return_date=current_date() + timedelta(days=7),
+            is_active=False,
+        )
+        self.borrowings = Borrowing.objects.order_by("id")
+
+    def assert_matches_serializer(self, serializer_class, fieldset=None) -> None:
+        plan = get_row_plan(serializer_class, fieldset, Borrowing)
+        serializer = serializer_class(
+            self.borrowings, many=True, sparse_fieldset=fieldset
+        )
+
+        self.assertIsNotNone(plan)
+        self.assertEqual(
+            plan.represent_many(self.borrowings.values(*plan.lookups)), serializer.data
+        )
+
+    def test_plans_match_serializers(self) -> None:
+        self.assert_matches_serializer(BorrowingListSerializer)
+        self.assert_matches_serializer(BorrowingAdminListSerializer)
+        self.assert_matches_serializer(
+            BorrowingListSerializer, SparseFieldset(expand=frozenset({"book"}))
+        )
+
+    def test_method_fields_fall_back_to_serializer(self) -> None:
+        class ReprSerializer(BorrowingListSerializer):
+            title = serializers.CharField(source="__str__")
+
+            class Meta(BorrowingListSerializer.Meta):
+                fields = BorrowingListSerializer.Meta.fields + ("title",)
+
+        self.assertIsNone(get_row_plan(ReprSerializer, None, Borrowing))
+
+    def test_list_builds_no_instances(self) -> None:
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        with mock.patch.object(Borrowing, "__init__") as init:
+            response = self.client.get(BORROWING_URL)
+
+        init.assert_not_called()
+        self.assertEqual(
+            response.data["results"][1]["actual_return_date"],
+            self.returned.actual_return_date.isoformat(),
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL.")
+class BorrowingQueryPlanTest(TestCase):
+    """Fails when a hot borrowing query falls back to a sequential scan."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        rng = random.Random(42)
+        cls.users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"plan{number}@user.com", password="!")
+            for number in range(200)
+        )
+        cls.books = Book.objects.bulk_create(
+            Book(
+                name=f"Plan book {number}",
+                author="test_author",
+                cover="SOFT",
+                inventory=10,
+                daily_fee=1,
+            )
+            for number in range(500)
+        )
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                borrow_date=date(2024, 1, 1) + timedelta(days=rng.randint(0, 365)),
+                expected_return_date=date(2025, 6, rng.randint(1, 30)),
+                book=rng.choice(cls.books),
+                user=rng.choice(cls.users),
+                is_active=rng.random() < 0.05,
+            )
+            for _ in range(20_000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE borrowings_borrowing")
+        cls.admin = get_user_model().objects.create_user(
+            email="admin@admin.com", password="test123admin", is_staff=True
+        )
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = self.users[0]
+        self.borrowing = Borrowing.objects.filter(user=self.user).first()
+
+    def scanned_tables(self, sql: str) -> set[str]:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        tables, nodes = set(), [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                tables.add(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+        return tables
+
+    def assert_no_seq_scan(self, user, url: str, params: dict | None = None) -> None:
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [
+            query["sql"] for query in queries
+            if query["sql"].startswith("SELECT") and "borrowings_borrowing" in query["sql"]
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            with self.subTest(url=url, params=params, sql=sql):
+                self.assertNotIn("borrowings_borrowing", self.scanned_tables(sql))
+
+    def test_user_list(self) -> None:
+        self.assert_no_seq_scan(self.user, BORROWING_URL)
+        self.assert_no_seq_scan(self.user, BORROWING_URL, {"cursor": ""})
+
+    def test_user_detail(self) -> None:
+        self.assert_no_seq_scan(self.user, detail_url(self.borrowing.id))
+
+    def test_staff_filters(self) -> None:
+        user_id = self.user.id
+        self.assert_no_seq_scan(self.admin, BORROWING_URL, {"user_id": user_id})
+        self.assert_no_seq_scan(
+            self.admin, BORROWING_URL, {"user_id": user_id, "is_active": "true"}
+        )
+        self.assert_no_seq_scan(
+            self.admin, BORROWING_URL, {"is_active": "true", "cursor": ""}
+        )
+        self.assert_no_seq_scan(self.admin, BORROWING_URL, {"cursor": ""})
+
+    def test_overdue_and_active_book_lookups(self) -> None:
+        querysets = [
+            Borrowing.objects.filter(
+                is_active=True, expected_return_date__lt=date(2025, 6, 10)
+            ),
+            Borrowing.objects.filter(book=self.books[0], is_active=True),
+        ]
+        for queryset in querysets:
+            with self.subTest(sql=str(queryset.query)):
+                sql = connection.ops.compose_sql(*queryset.query.sql_with_params())
+                self.assertNotIn("borrowings_borrowing", self.scanned_tables(sql))
+
+
+class CheckoutTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.book = create_book(inventory=1)
+
+        self.client.force_authenticate(self.user)
+
+    def borrow(self):
+        return self.client.post(
+            BORROWING_URL,
+            {"book": self.book.id, "expected_return_date": current_date() + timedelta(days=14)},
+        )
+
+    def test_last_copy_can_be_borrowed_once(self) -> None:
+        first = self.borrow()
+        second = self.borrow()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.data, {"non_field_errors": ["This book is out of stock."]})
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(Borrowing.objects.count(), 1)
+
+    def test_book_is_returned_once(self) -> None:
+        borrowing = checkout_book(
+            self.user, self.book, expected_return_date=current_date() + timedelta(days=14)
+        )
+
+        self.assertTrue(return_borrowing(borrowing))
+        self.assertFalse(return_borrowing(borrowing))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 1)
+
+    def test_checkout_does_not_save_whole_book(self) -> None:
+        Book.objects.filter(pk=self.book.pk).update(name="Renamed")
+
+        self.borrow()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.name, "Renamed")
+
+
+class BatchBorrowingTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.single = create_book(name="Single", inventory=1)
+        self.double = create_book(name="Double", inventory=2)
+
+        self.client.force_authenticate(self.user)
+
+    def item(self, book, expected_return_date: date | None = None) -> dict:
+        return {
+            "book": book,
+            "expected_return_date": expected_return_date or current_date() + timedelta(days=14),
+        }
+
+    def test_batch_checkout_reports_each_item(self) -> None:
+        response = self.client.post(
+            BATCH_URL,
+            {
+                "items": [
+                    self.item(self.single.id),
+                    self.item(self.single.id),
+                    self.item(self.double.id),
+                    self.item(999),
+                    self.item(self.double.id, current_date() - timedelta(days=1)),
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], [201, 400, 201, 400, 400])
+        self.assertEqual(results[1]["errors"], {"book": ["This book is out of stock."]})
+        self.assertIn("book", results[3]["errors"])
+        self.assertIn("expected_return_date", results[4]["errors"])
+        self.assertEqual(
+            set(Borrowing.objects.values_list("id", flat=True)),
+            {results[0]["data"]["id"], results[2]["data"]["id"]},
+        )
+
+        self.single.refresh_from_db()
+        self.double.refresh_from_db()
+        self.assertEqual((self.single.inventory, self.double.inventory), (0, 1))
+        message = Notification.objects.get().message
+        self.assertIn("Single", message)
+        self.assertIn("Double", message)
+
+    def test_batch_checkout_queries_do_not_grow_with_items(self) -> None:
+        Book.objects.update(inventory=100)
+
+        def checkout(count: int) -> int:
+            items = [self.item(self.double.id if n % 2 else self.single.id) for n in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(BATCH_URL, {"items": items}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        self.assertEqual(checkout(2), checkout(20))
+
+    def test_batch_return_reports_each_item(self) -> None:
+        expected_return_date = current_date() + timedelta(days=14)
+        first = checkout_book(self.user, self.double, expected_return_date=expected_return_date)
+        second = checkout_book(self.user, self.double, expected_return_date=expected_return_date)
+        returned = create_borrowing(
+            user=self.user, book=self.single, is_active=False, actual_return_date=current_date()
+        )
+        other = create_borrowing(
+            user=get_user_model().objects.create_user(email="other@user.com", password="test123user"),
+            book=self.single,
+        )
+
+        response = self.client.post(
+            BATCH_RETURN_URL,
+            {"ids": [first.id, second.id, returned.id, other.id, first.id]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(result["id"], result["status"]) for result in response.data["results"]],
+            [(first.id, 200), (second.id, 200), (returned.id, 400), (other.id, 404), (first.id, 400)],
+        )
+        self.double.refresh_from_db()
+        self.assertEqual(self.double.inventory, 2)
+        other.refresh_from_db()
+        self.assertTrue(other.is_active)
+
+    def test_batch_size_is_limited(self) -> None:
+        responses = [
+            self.client.post(BATCH_URL, {"items": []}, format="json"),
+            self.client.post(
+                BATCH_URL,
+                {"items": [self.item(self.double.id)] * (MAX_BATCH_SIZE + 1)},
+                format="json",
+            ),
+            self.client.post(BATCH_RETURN_URL, {"ids": "1"}, format="json"),
+        ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Borrowing.objects.exists())
+
+
+@skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL.")
+class ConcurrentCheckoutTest(TransactionTestCase):
+    def test_concurrent_checkouts_do_not_oversell(self) -> None:
+        book = create_book(inventory=3)
+        users = [
+            get_user_model().objects.create_user(email=f"test_{number}@user.com")
+            for number in range(10)
+        ]
+        barrier = threading.Barrier(len(users))
+        results = []
+
+        def borrow(user) -> None:
+            barrier.wait()
+            try:
+                checkout_book(user, book, expected_return_date=current_date() + timedelta(days=14))
+                results.append(True)
+            except ValidationError:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=borrow, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        book.refresh_from_db()
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(Borrowing.objects.count(), 3)
+
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        length = int(self.headers["Content-Length"])
+        self.server.received.append((self.path, json.loads(self.rfile.read(length))))
+        status_code, payload = (
+            self.server.responses.pop(0) if self.server.responses else (200, {"ok": True})
+        )
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class NotificationOutboxTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTelegramHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.telegram = override_settings(
+            TELEGRAM={
+                "BOT_TOKEN": "token",
+                "CHAT_ID": "42",
+                "API_URL": f"http://127.0.0.1:{cls.server.server_port}",
+                "TIMEOUT": 5,
+            },
+            NOTIFICATION_OUTBOX={"RATE_LIMIT": 0, "MAX_ATTEMPTS": 3},
+        )
+        cls.telegram.enable()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.telegram.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.server.received = []
+        self.server.responses = []
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+
+    def borrow(self, book=None):
+        return self.client.post(
+            BORROWING_URL,
+            {
+                "book": (book or create_book()).id,
+                "expected_return_date": current_date() + timedelta(days=14),
+            },
+        )
+
+    def dispatch(self) -> None:
+        call_command("dispatch_notifications", "--once", stdout=mock.MagicMock())
+
+    def test_borrowing_queues_message_without_sending(self) -> None:
+        with override_settings(TELEGRAM={}):
+            response = self.borrow()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.server.received, [])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, Notification.StatusChoices.PENDING)
+        self.assertIn("Created new borrowing!", notification.message)
+
+    def test_failed_checkout_queues_nothing(self) -> None:
+        self.borrow(create_book(inventory=0))
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_dispatch_sends_pending_messages(self) -> None:
+        self.borrow()
+        self.borrow()
+
+        self.dispatch()
+
+        self.assertEqual(len(self.server.received), 2)
+        path, body = self.server.received[0]
+        self.assertEqual(path, "/bottoken/sendMessage")
+        self.assertEqual(body["chat_id"], "42")
+        self.assertEqual(
+            Notification.objects.filter(status=Notification.StatusChoices.SENT).count(), 2
+        )
+
+    def test_server_errors_are_retried_with_backoff(self) -> None:
+        self.borrow()
+        self.server.responses = [(500, {"ok": False, "description": "Internal"})]
+
+        self.dispatch()
+        notification = Notification.objects.get()
+
+        self.assertEqual(notification.status, Notification.StatusChoices.PENDING)
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, now())
+        self.assertIn("Internal", notification.last_error)
+
+        Notification.objects.update(next_attempt_at=now())
+        self.dispatch()
+        notification.refresh_from_db()
+
+        self.assertEqual(notification.status, Notification.StatusChoices.SENT)
+        self.assertEqual(notification.attempts, 2)
+
+    def test_rate_limit_response_is_honored(self) -> None:
+        self.borrow()
+        self.server.responses = [
+            (429, {"ok": False, "parameters": {"retry_after": 30}})
+        ]
+
+        self.dispatch()
+        notification = Notification.objects.get()
+
+        self.assertGreater(notification.next_attempt_at, now() + timedelta(seconds=25))
+
+    def test_gives_up_on_client_errors_and_after_max_attempts(self) -> None:
+        self.borrow()
+        self.borrow()
+        self.server.responses = [
+            (400, {"ok": False, "description": "chat not found"}),
+            (502, {"ok": False}),
+            (502, {"ok": False}),
+            (502, {"ok": False}),
+        ]
+
+        for _ in range(3):
+            self.dispatch()
+            Notification.objects.filter(status="PENDING").update(next_attempt_at=now())
+
+        self.assertEqual(
+            list(Notification.objects.order_by("id").values_list("status", "attempts")),
+            [("FAILED", 1), ("FAILED", 3)],
+        )
+
+    def test_lease_covers_sending_the_batch(self) -> None:
+        with override_settings(NOTIFICATION_OUTBOX={"RATE_LIMIT": 0.5, "LEASE": 30}):
+            self.assertEqual(get_lease(50, timeout=10), 140)
+        with override_settings(NOTIFICATION_OUTBOX={"RATE_LIMIT": 0, "LEASE": 30}):
+            self.assertEqual(get_lease(50, timeout=10), 40)
+
+    def test_notifications_past_the_lease_are_released_unsent(self) -> None:
+        self.borrow()
+        notification = claim_batch(10, lease=60)[0]
+
+        outcome = deliver(
+            TelegramClient.from_settings(),
+            RateLimiter(0),
+            notification,
+            deadline=now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(outcome, "released")
+        self.assertEqual(self.server.received, [])
+        self.assertEqual(
+            Notification.objects.get().next_attempt_at, notification.next_attempt_at
+        )
+
+    def test_deadline_passing_during_the_wait_leaves_the_slot_free(self) -> None:
+        self.borrow()
+        notification = claim_batch(10, lease=60)[0]
+        limiter = RateLimiter(rate=1)
+        limiter.pause(0.2)
+        free_at = limiter.next_at
+        async_client = mock.AsyncMock()
+
+        outcome = deliver(
+            TelegramClient.from_settings(),
+            limiter,
+            notification,
+            deadline=now() + timedelta(seconds=0.1),
+        )
+        async_outcome = asyncio.run(
+            adeliver(
+                async_client,
+                limiter,
+                notification,
+                deadline=now() - timedelta(seconds=1),
+            )
+        )
+
+        self.assertEqual([outcome, async_outcome], ["released", "released"])
+        self.assertEqual(self.server.received, [])
+        async_client.send.assert_not_awaited()
+        self.assertEqual(limiter.next_at, free_at)
+
+    def test_outcome_is_not_recorded_after_losing_the_lease(self) -> None:
+        self.borrow()
+        notification = claim_batch(10, lease=60)[0]
+        Notification.objects.update(next_attempt_at=now() + timedelta(hours=1))
+
+        deliver(TelegramClient.from_settings(), RateLimiter(0), notification)
+
+        self.assertEqual(len(self.server.received), 1)
+        self.assertEqual(Notification.objects.get().status, Notification.StatusChoices.PENDING)
+
+    def test_dispatch_requires_credentials(self) -> None:
+        credentials = {"BOT_TOKEN": None, "CHAT_ID": None, "API_URL": "", "TIMEOUT": 1}
+        with override_settings(TELEGRAM=credentials):
+            with self.assertRaises(CommandError):
+                self.dispatch()
+
+    def test_rate_limiter_spaces_calls(self) -> None:
+        limiter = RateLimiter(rate=20)
+        started = time.monotonic()
+
+        for _ in range(3):
+            limiter.wait()
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_rate_limiter_spaces_awaited_calls(self) -> None:
+        limiter = RateLimiter(rate=20)
+        started = time.monotonic()
+
+        async def wait_turns() -> None:
+            await asyncio.gather(*(limiter.await_turn() for _ in range(3)))
+
+        asyncio.run(wait_turns())
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_async_dispatch(self) -> None:
+        for _ in range(3):
+            self.borrow()
+        self.server.responses = [(500, {"ok": False, "description": "Internal"})]
+
+        call_command("dispatch_notifications", "--once", "--async", stdout=mock.MagicMock())
+
+        self.assertEqual(len(self.server.received), 3)
+        self.assertEqual(
+            sorted(Notification.objects.values_list("status", "attempts")),
+            [("PENDING", 1), ("SENT", 1), ("SENT", 1)],
+        )
+
+
+class OverdueReminderTest(TestCase):
+    def setUp(self) -> None:
+        self.alice = get_user_model().objects.create_user(
+            email="alice@user.com", password="test123user", first_name="Alice", last_name="Smith"
+        )
+        self.bob = get_user_model().objects.create_user(
+            email="bob@user.com", password="test123user"
+        )
+        self.book = create_book()
+
+    def borrow(self, user, expected_return_date: date, **params) -> Borrowing:
+        return create_borrowing(
+            user=user,
+            book=self.book,
+            borrow_date=date(2025, 1, 1),
+            expected_return_date=expected_return_date,
+            **params,
+        )
+
+    def test_one_reminder_per_user(self) -> None:
+        first = self.borrow(self.alice, date(2025, 2, 1))
+        second = self.borrow(self.alice, date(2025, 2, 10))
+        self.borrow(self.bob, date(2025, 2, 5))
+        on_time = self.borrow(self.bob, date(2025, 3, 1))
+        returned = self.borrow(
+            self.bob, date(2025, 2, 1), is_active=False, actual_return_date=date(2025, 2, 1)
+        )
+
+        results = send_overdue_reminders(date(2025, 3, 1), chunk_size=1)
+
+        self.assertEqual(results, {"borrowings": 3, "reminders": 2})
+        messages = list(Notification.objects.order_by("id").values_list("message", flat=True))
+        self.assertEqual(len(messages), 2)
+        self.assertIn("Alice Smith (alice@user.com)", messages[0])
+        self.assertIn(f"expected {first.expected_return_date}", messages[0])
+        self.assertIn(f"expected {second.expected_return_date}", messages[0])
+        self.assertIn("bob@user.com (bob@user.com)", messages[1])
+        self.assertEqual(messages[1].count(self.book.name), 1)
+
+        on_time.refresh_from_db()
+        returned.refresh_from_db()
+        self.assertIsNone(on_time.overdue_notified_at)
+        self.assertIsNone(returned.overdue_notified_at)
+        self.assertEqual(JobWatermark.objects.get(name=WATERMARK).value, date(2025, 3, 1))
+
+    def test_rerun_does_not_notify_twice(self) -> None:
+        self.borrow(self.alice, date(2025, 2, 1))
+        send_overdue_reminders(date(2025, 3, 1))
+
+        self.assertEqual(
+            send_overdue_reminders(date(2025, 3, 1)), {"borrowings": 0, "reminders": 0}
+        )
+        self.assertEqual(Notification.objects.count(), 1)
+
+        later = self.borrow(self.alice, date(2025, 3, 1))
+        results = send_overdue_reminders(date(2025, 3, 2))
+
+        self.assertEqual(results, {"borrowings": 1, "reminders": 1})
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertIn(f"expected {later.expected_return_date}", Notification.objects.latest("id").message)
+
+    def test_rescan_after_interrupted_run_skips_notified(self) -> None:
+        notified = self.borrow(self.alice, date(2025, 2, 1))
+        Borrowing.objects.filter(pk=notified.pk).update(overdue_notified_at=now())
+        self.borrow(self.bob, date(2025, 2, 1))
+
+        results = send_overdue_reminders(date(2025, 3, 1))
+
+        self.assertEqual(results, {"borrowings": 1, "reminders": 1})
+        self.assertIn("bob@user.com", Notification.objects.get().message)
+
+    def test_watermark_bounds_scanned_range(self) -> None:
+        JobWatermark.objects.create(name=WATERMARK, value=date(2025, 2, 15))
+        self.borrow(self.alice, date(2025, 2, 1))
+
+        self.assertEqual(
+            send_overdue_reminders(date(2025, 3, 1)), {"borrowings": 0, "reminders": 0}
+        )
+
+    def test_command_reports_throughput(self) -> None:
+        self.borrow(self.alice, date(2025, 2, 1))
+        out = StringIO()
+
+        call_command("notify_overdue", "--date", "2025-03-01", stdout=out)
+
+        self.assertIn("Queued 1 reminders for 1 overdue borrowings", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("notify_overdue", "--date", "yesterday")
+
+
+class BorrowingQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user", first_name="Test", last_name="User"
+        )
+        self.admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.borrowings = []
+
+    def create_borrowings(self, count: int) -> None:
+        self.borrowings += [
+            create_borrowing(
+                user=self.user,
+                book=create_book(name=f"Book {len(self.borrowings) + number}"),
+                expected_return_date=current_date() + timedelta(days=14),
+            )
+            for number in range(count)
+        ]
+
+    def test_every_action_has_a_budget(self) -> None:
+        self.assertQueryBudgetsCover(BorrowingViewSet)
+
+    def test_reads(self) -> None:
+        for user in (self.user, self.admin):
+            self.client.force_authenticate(user)
+            for action, request in (
+                ("list", lambda: self.client.get(BORROWING_URL)),
+                ("list", lambda: self.client.get(BORROWING_URL, {"cursor": "", "fields": "id,book"})),
+                ("retrieve", lambda: self.client.get(detail_url(self.borrowings[-1].id))),
+            ):
+                with self.subTest(user=user.email, action=action):
+                    Borrowing.objects.all().delete()
+                    self.borrowings = []
+                    self.assertWithinQueryBudget(
+                        BorrowingViewSet, action, request, self.create_borrowings
+                    )
+
+        self.assertWithinQueryBudget(
+            BorrowingViewSet,
+            "export",
+            lambda: self.client.get(reverse("borrowings:borrowing-export"), {"format": "csv"}),
+            self.create_borrowings,
+        )
+        for action, request in (
+            ("balance", lambda: self.client.get(BALANCE_URL)),
+            ("popular", lambda: self.client.get(POPULAR_URL, {"limit": 50})),
+            (
+                "analytics",
+                lambda: self.client.get(ANALYTICS_URL, {"start": "2025-01-01", "end": "2025-03-31"}),
+            ),
+        ):
+            with self.subTest(action=action):
+                self.assertWithinQueryBudget(
+                    BorrowingViewSet, action, request, self.create_borrowings
+                )
+
+    def test_writes(self) -> None:
+        self.client.force_authenticate(self.user)
+        book = create_book(inventory=1000)
+        item = {"book": book.id, "expected_return_date": current_date() + timedelta(days=14)}
+        for action, request in (
+            ("create", lambda: self.client.post(BORROWING_URL, item)),
+            ("return_book", lambda: self.client.get(return_url(self.borrowings.pop().id))),
+            (
+                "batch_checkout",
+                lambda: self.client.post(BATCH_URL, {"items": [item] * 10}, format="json"),
+            ),
+            (
+                "batch_return",
+                lambda: self.client.post(
+                    BATCH_RETURN_URL,
+                    {"ids": [self.borrowings.pop().id for _ in range(10)]},
+                    format="json",
+                ),
+            ),
+        ):
+            with self.subTest(action=action):
+                self.assertWithinQueryBudget(
+                    BorrowingViewSet, action, request, self.create_borrowings
+                )
+
+
+class BorrowingArchiveTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.old = [
+            self.returned(date(2025, 1, 1) + timedelta(days=number)) for number in range(3)
+        ]
+        self.recent = self.returned(date(2025, 5, 20))
+        self.active = create_borrowing(user=self.user, borrow_date=date(2025, 1, 1))
+
+    def returned(self, actual_return_date: date) -> Borrowing:
+        return create_borrowing(
+            user=self.user,
+            borrow_date=date(2025, 1, 1),
+            actual_return_date=actual_return_date,
+            is_active=False,
+        )
+
+    def test_moves_old_returned_borrowings_in_chunks(self) -> None:
+        moved = archive_borrowings(date(2025, 5, 1), chunk_size=2)
+
+        self.assertEqual(moved, 3)
+        self.assertQuerySetEqual(
+            ArchivedBorrowing.objects.order_by("id").values_list("id", flat=True),
+            [borrowing.id for borrowing in self.old],
+        )
+        self.assertQuerySetEqual(
+            Borrowing.objects.order_by("id").values_list("id", flat=True),
+            [self.recent.id, self.active.id],
+        )
+        archived = ArchivedBorrowing.objects.get(pk=self.old[0].pk)
+        self.assertEqual(archived.actual_return_date, self.old[0].actual_return_date)
+        self.assertEqual(archived.book_id, self.old[0].book_id)
+        self.assertEqual(archive_borrowings(date(2025, 5, 1)), 0)
+
+    def test_archived_borrowings_are_still_listed_and_retrieved(self) -> None:
+        self.client.force_authenticate(self.user)
+        before = self.client.get(BORROWING_URL, {"cursor": ""}).data["results"]
+        detail = self.client.get(detail_url(self.old[0].id)).data
+        reset_borrowing_list_cache()
+
+        archive_borrowings(date(2025, 5, 1))
+
+        self.assertEqual(self.client.get(BORROWING_URL, {"cursor": ""}).data["results"], before)
+        self.assertEqual(self.client.get(detail_url(self.old[0].id)).data, detail)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(BORROWING_URL, {"is_active": "false"})
+        self.assertEqual(response.data["count"], 4)
+
+    def test_archived_borrowings_are_already_returned(self) -> None:
+        archive_borrowings(date(2025, 5, 1))
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(return_url(self.old[0].id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "This book is already returned.")
+
+        response = self.client.post(
+            BATCH_RETURN_URL, {"ids": [self.old[1].id, self.active.id + 1000]}, format="json"
+        )
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [status.HTTP_400_BAD_REQUEST, status.HTTP_404_NOT_FOUND],
+        )
+
+        other = get_user_model().objects.create_user(email="other@user.com", password="test123user")
+        self.client.force_authenticate(other)
+        response = self.client.get(return_url(self.old[0].id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archive_keeps_the_date_checks(self) -> None:
+        archived = ArchivedBorrowing(
+            id=self.active.id + 1000,
+            borrow_date=date(2025, 1, 10),
+            expected_return_date=date(2025, 1, 20),
+            actual_return_date=date(2025, 1, 5),
+            book=self.active.book,
+            user=self.user,
+        )
+
+        with self.assertRaises(IntegrityError):
+            archived.save()
+
+    def test_cached_counts_follow_new_borrowings(self) -> None:
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(BORROWING_URL).data["count"], 5)
+        archive_borrowings(date(2025, 5, 1))
+
+        create_borrowing(user=self.user, expected_return_date=current_date() + timedelta(days=14))
+
+        self.assertEqual(self.client.get(BORROWING_URL).data["count"], 6)
+
+    def test_command(self) -> None:
+        out = StringIO()
+        call_command("archive_borrowings", "--date", "2025-06-01", "--days", "31", stdout=out)
+
+        self.assertIn("Archived 3 borrowings", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("archive_borrowings", "--chunk-size", "0")
+
+
+BALANCE_URL = reverse("borrowings:borrowing-balance")
+
+
+class FeeAccrualTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.book = create_book(daily_fee=2.50)
+        self.on_time = self.borrow(date(2025, 1, 11))
+        self.overdue = self.borrow(date(2025, 1, 5))
+        self.returned_late = self.borrow(
+            date(2025, 1, 3), is_active=False, actual_return_date=date(2025, 1, 4)
+        )
+
+    def borrow(self, expected_return_date: date, **params) -> Borrowing:
+        return create_borrowing(
+            user=self.user,
+            book=self.book,
+            borrow_date=date(2025, 1, 1),
+            expected_return_date=expected_return_date,
+            **params,
+        )
+
+    def charges(self) -> dict:
+        return {
+            (charge.borrowing_id, charge.kind): (charge.days, charge.amount)
+            for charge in FeeCharge.objects.all()
+        }
+
+    def test_accrues_rentals_and_fines(self) -> None:
+        results = accrue_fees(date(2025, 1, 8), chunk_size=2)
+
+        self.assertEqual(results, {"borrowings": 3, "charges": 5})
+        self.assertEqual(self.charges(), {
+            (self.on_time.id, "RENTAL"): (7, Decimal("17.50")),
+            (self.overdue.id, "RENTAL"): (4, Decimal("10.00")),
+            (self.overdue.id, "FINE"): (3, Decimal("15.00")),
+            (self.returned_late.id, "RENTAL"): (2, Decimal("5.00")),
+            (self.returned_late.id, "FINE"): (1, Decimal("5.00")),
+        })
+        self.assertEqual(
+            FeeCharge.objects.filter(borrowing_id=self.overdue.id).first().user, self.user
+        )
+
+    def test_rerun_is_idempotent(self) -> None:
+        accrue_fees(date(2025, 1, 8))
+        charges = self.charges()
+
+        self.assertEqual(accrue_fees(date(2025, 1, 8))["charges"], 0)
+        self.assertEqual(self.charges(), charges)
+
+        results = accrue_fees(date(2025, 1, 9))
+
+        self.assertEqual(results, {"borrowings": 2, "charges": 2})
+        self.assertEqual(self.charges()[self.overdue.id, "FINE"], (4, Decimal("20.00")))
+        self.assertEqual(
+            self.charges()[self.returned_late.id, "FINE"], charges[self.returned_late.id, "FINE"]
+        )
+        self.assertEqual(JobWatermark.objects.get(name=FEE_WATERMARK).value, date(2025, 1, 9))
+        self.assertEqual(accrue_fees(date(2025, 1, 7)), {"borrowings": 0, "charges": 0})
+
+    def test_borrowings_returned_since_last_run_are_settled(self) -> None:
+        accrue_fees(date(2025, 1, 8))
+        return_borrowing(self.overdue)
+        Borrowing.objects.filter(pk=self.overdue.pk).update(actual_return_date=date(2025, 1, 9))
+
+        accrue_fees(date(2025, 1, 12))
+
+        self.assertEqual(self.charges()[self.overdue.id, "FINE"], (4, Decimal("20.00")))
+        self.assertEqual(self.charges()[self.on_time.id, "FINE"], (1, Decimal("5.00")))
+
+    def test_balance(self) -> None:
+        accrue_fees(date(2025, 1, 8))
+        expected = {
+            "user_id": self.user.id,
+            "rental": "32.50",
+            "fines": "20.00",
+            "total": "52.50",
+            "accrued_through": "2025-01-08",
+        }
+        self.client.force_authenticate(self.user)
+
+        self.assertEqual(self.client.get(BALANCE_URL).data, expected)
+        self.assertEqual(self.client.get(BALANCE_URL, {"user_id": 0}).data, expected)
+
+        admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+
+        self.assertEqual(self.client.get(BALANCE_URL, {"user_id": self.user.id}).data, expected)
+        self.assertEqual(self.client.get(BALANCE_URL).data["total"], "0.00")
+        self.assertEqual(
+            self.client.get(BALANCE_URL, {"user_id": "me"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_command(self) -> None:
+        out = StringIO()
+        call_command("accrue_fees", "--date", "2025-01-08", stdout=out)
+
+        self.assertIn("Wrote 5 charges for 3 borrowings", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("accrue_fees", "--date", "tomorrow")
+
+
+POPULAR_URL = reverse("borrowings:borrowing-popular")
+
+
+@mock.patch("borrowings.views.current_date", return_value=date(2025, 1, 15))
+class BookPopularityTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.dune = create_book(name="Dune", author="Frank Herbert", inventory=100)
+        self.emma = create_book(name="Emma", author="Jane Austen", inventory=100)
+
+    def checkout(self, book: Book, borrow_date: date, copies: int = 1) -> None:
+        self.client.force_authenticate(self.user)
+        item = {
+            "book": book.id,
+            "borrow_date": borrow_date,
+            "expected_return_date": borrow_date + timedelta(days=7),
+        }
+        if copies == 1:
+            response = self.client.post(BORROWING_URL, item)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        else:
+            response = self.client.post(BATCH_URL, {"items": [item] * copies}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+
+    def counters(self) -> dict:
+        return {
+            (row.book_id, row.period, row.period_start): row.borrowings
+            for row in BookPopularity.objects.all()
+        }
+
+    def test_checkouts_raise_counters(self, _) -> None:
+        self.checkout(self.dune, date(2025, 1, 14))
+        self.checkout(self.dune, date(2025, 1, 15), copies=2)
+        self.checkout(self.dune, date(2024, 12, 31))
+
+        self.assertEqual(self.counters(), {
+            (self.dune.id, "WEEK", date(2025, 1, 13)): 3,
+            (self.dune.id, "WEEK", date(2024, 12, 30)): 1,
+            (self.dune.id, "MONTH", date(2025, 1, 1)): 3,
+            (self.dune.id, "MONTH", date(2024, 12, 1)): 1,
+            (self.dune.id, "ALL", date.min): 4,
+        })
+
+    def test_top_books(self, _) -> None:
+        self.checkout(self.dune, date(2025, 1, 2), copies=3)
+        self.checkout(self.emma, date(2025, 1, 14), copies=2)
+
+        response = self.client.get(POPULAR_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            "period": "week",
+            "period_start": "2025-01-13",
+            "results": [
+                {"id": self.emma.id, "name": "Emma", "author": "Jane Austen", "borrowings": 2},
+            ],
+        })
+        results = self.client.get(POPULAR_URL, {"period": "month"}).data["results"]
+        self.assertEqual([book["id"] for book in results], [self.dune.id, self.emma.id])
+        results = self.client.get(POPULAR_URL, {"period": "all", "limit": 1}).data["results"]
+        self.assertEqual([book["id"] for book in results], [self.dune.id])
+        self.assertEqual(
+            self.client.get(POPULAR_URL, {"period": "year"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_responses_are_cached(self, _) -> None:
+        self.checkout(self.dune, date(2025, 1, 14))
+        self.client.get(POPULAR_URL)
+        self.checkout(self.emma, date(2025, 1, 14), copies=2)
+
+        with self.assertNumQueries(0):
+            results = self.client.get(POPULAR_URL).data["results"]
+
+        self.assertEqual([book["id"] for book in results], [self.dune.id])
+        cache.clear()
+        results = self.client.get(POPULAR_URL).data["results"]
+        self.assertEqual([book["id"] for book in results], [self.emma.id, self.dune.id])
+
+    def test_rebuild_counts_history(self, _) -> None:
+        self.checkout(self.dune, date(2025, 1, 14), copies=2)
+        self.checkout(self.emma, date(2024, 12, 31))
+        counters = self.counters()
+        Borrowing.objects.filter(book=self.emma).update(
+            is_active=False, actual_return_date=date(2025, 1, 1)
+        )
+        archive_borrowings(date(2025, 1, 2))
+        BookPopularity.objects.filter(book=self.dune).update(borrowings=100)
+        BookPopularity.objects.filter(book=self.emma).delete()
+        BookPopularity.objects.create(
+            book=self.emma, period="WEEK", period_start=date(2024, 12, 2), borrowings=5
+        )
+
+        self.assertEqual(rebuild_popularity(batch_size=1), len(counters))
+        self.assertEqual(self.counters(), counters)
+
+        out = StringIO()
+        call_command("rebuild_popularity", stdout=out)
+        self.assertIn(f"Wrote {len(counters)} popularity counters", out.getvalue())
+
+
+ANALYTICS_URL = reverse("borrowings:borrowing-analytics")
+
+
+class DailyRollupTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+        self.alice = self.create_user("alice@user.com", datetime(2024, 12, 15, 12))
+        self.bob = self.create_user("bob@user.com", datetime(2025, 1, 2, 12))
+        self.dune = create_book(name="Dune", inventory=100)
+        self.emma = create_book(name="Emma", inventory=100)
+        self.borrow(self.alice, self.dune, date(2025, 1, 2), actual_return_date=date(2025, 1, 4))
+        self.borrow(self.alice, self.emma, date(2025, 1, 2))
+        self.borrow(self.bob, self.dune, date(2025, 1, 3))
+
+    @staticmethod
+    def create_user(email: str, date_joined: datetime):
+        user = get_user_model().objects.create_user(email=email, password="test123user")
+        get_user_model().objects.filter(pk=user.pk).update(
+            date_joined=date_joined.replace(tzinfo=timezone.utc)
+        )
+        return user
+
+    @staticmethod
+    def borrow(user, book: Book, borrow_date: date, **params) -> Borrowing:
+        return create_borrowing(
+            user=user,
+            book=book,
+            borrow_date=borrow_date,
+            expected_return_date=borrow_date + timedelta(days=14),
+            is_active="actual_return_date" not in params,
+            **params,
+        )
+
+    @staticmethod
+    def rollups(model, key: str | None = None) -> dict:
+        return {
+            (row.day, getattr(row, key)) if key else row.day: (row.borrowed, row.returned)
+            for row in model.objects.all()
+        }
+
+    def get_series(self, **params) -> list[tuple]:
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(
+            ANALYTICS_URL, {"start": "2025-01-03", "end": "2025-01-05", **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (day["day"], day["borrowed"], day["returned"], day["active"])
+            for day in response.data["days"]
+        ]
+
+    def test_rolls_up_per_day_book_and_cohort(self) -> None:
+        self.assertEqual(catch_up(date(2025, 1, 6)), {"days": 4, "rows": 10})
+
+        self.assertEqual(self.rollups(DailyBorrowingTotals), {
+            date(2025, 1, 2): (2, 0),
+            date(2025, 1, 3): (1, 0),
+            date(2025, 1, 4): (0, 1),
+        })
+        self.assertEqual(self.rollups(DailyBookBorrowings, "book_id"), {
+            (date(2025, 1, 2), self.dune.id): (1, 0),
+            (date(2025, 1, 2), self.emma.id): (1, 0),
+            (date(2025, 1, 3), self.dune.id): (1, 0),
+            (date(2025, 1, 4), self.dune.id): (0, 1),
+        })
+        self.assertEqual(self.rollups(DailyCohortBorrowings, "cohort"), {
+            (date(2025, 1, 2), date(2024, 12, 1)): (2, 0),
+            (date(2025, 1, 3), date(2025, 1, 1)): (1, 0),
+            (date(2025, 1, 4), date(2024, 12, 1)): (0, 1),
+        })
+
+    def test_catch_up_recounts_the_lookback_days(self) -> None:
+        catch_up(date(2025, 1, 6))
+        totals = self.rollups(DailyBorrowingTotals)
+        catch_up(date(2025, 1, 6))
+        self.assertEqual(self.rollups(DailyBorrowingTotals), totals)
+
+        self.borrow(self.bob, self.emma, date(2025, 1, 3))
+        Borrowing.objects.filter(book=self.dune).update(
+            is_active=False, actual_return_date=date(2025, 1, 5)
+        )
+        archive_borrowings(date(2025, 1, 6))
+
+        self.assertEqual(catch_up(date(2025, 1, 7))["days"], 8)
+        self.assertEqual(self.rollups(DailyBorrowingTotals), {
+            date(2025, 1, 2): (2, 0),
+            date(2025, 1, 3): (2, 0),
+            date(2025, 1, 5): (0, 2),
+        })
+
+    def test_daily_series(self) -> None:
+        catch_up(date(2025, 1, 6))
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(ANALYTICS_URL, {"start": "2025-01-03", "end": "2025-01-05"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rolled_up_until"], "2025-01-06")
+        self.assertEqual(self.get_series(), [
+            ("2025-01-03", 1, 0, 3),
+            ("2025-01-04", 0, 1, 2),
+            ("2025-01-05", 0, 0, 2),
+        ])
+        self.assertEqual(self.get_series(book=self.dune.id), [
+            ("2025-01-03", 1, 0, 2),
+            ("2025-01-04", 0, 1, 1),
+            ("2025-01-05", 0, 0, 1),
+        ])
+        self.assertEqual(self.get_series(cohort="2024-12"), [
+            ("2025-01-03", 0, 0, 2),
+            ("2025-01-04", 0, 1, 1),
+            ("2025-01-05", 0, 0, 1),
+        ])
+
+    def test_analytics_is_for_staff_with_valid_ranges(self) -> None:
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(ANALYTICS_URL, {"start": "2025-01-01", "end": "2025-01-31"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin)
+        for params in (
+            {"start": "2025-01-31", "end": "2025-01-01"},
+            {"start": "2024-01-01", "end": "2025-01-31"},
+            {"start": "2025-01-01", "end": "2025-01-31", "cohort": "2024-12-01"},
+            {"start": "2025-01-01", "end": "2025-01-31", "book": self.dune.id, "cohort": "2024-12"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(ANALYTICS_URL, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self) -> None:
+        out = StringIO()
+        call_command("rollup_borrowings", date="2025-01-06", stdout=out)
+        self.assertIn("Rolled up 4 days into 10 rows", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("rollup_borrowings", date="2025-13-01")
+
+
+METRICS_URL = reverse("metrics")
+
+
+class MetricsTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@user.com", password="test123user", is_staff=True
+        )
+
+    @staticmethod
+    def sample(name: str, **labels) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @skipUnless(connection.vendor == "postgresql", "Needs the PostgreSQL backend.")
+    def test_requests_are_recorded_per_view(self) -> None:
+        borrowing = create_borrowing(user=self.admin)
+        labels = {"view": "BorrowingViewSet.return_book", "method": "GET", "status": "200"}
+        before = self.sample("library_request_duration_seconds_count", **labels)
+        queries_before = self.sample("library_request_db_queries_sum", **labels)
+
+        self.client.force_authenticate(self.admin)
+        self.client.get(return_url(borrowing.id))
+
+        self.assertEqual(self.sample("library_request_duration_seconds_count", **labels), before + 1)
+        self.assertGreater(self.sample("library_request_db_queries_sum", **labels), queries_before)
+        self.assertEqual(self.sample("library_response_size_bytes_count", **labels), before + 1)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'library_request_duration_seconds_count{method="GET",status="200",'
+            'view="BorrowingViewSet.return_book"}',
+            response.content.decode(),
+        )
+
+    def test_endpoint_requires_staff_or_token(self) -> None:
+        self.assertIn(
+            self.client.get(METRICS_URL).status_code,
+            (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN),
+        )
+        with override_settings(METRICS={"TOKEN": "scrape-me"}):
+            self.assertEqual(
+                self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer wrong").status_code,
+                status.HTTP_401_UNAUTHORIZED,
+            )
+            response = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer scrape-me")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_notification_latency_is_recorded(self) -> None:
+        notification = enqueue("Hello")
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=now() - timedelta(seconds=30)
+        )
+        notification.refresh_from_db()
+        latency = self.sample("library_notification_latency_seconds_sum")
+        sent = self.sample("library_notification_deliveries_total", outcome="sent")
+
+        deliver(mock.Mock(), RateLimiter(0), notification)
+
+        self.assertGreaterEqual(self.sample("library_notification_latency_seconds_sum"), latency + 30)
+        self.assertEqual(self.sample("library_notification_deliveries_total", outcome="sent"), sent + 1)
+
+    @skipUnless(connection.settings_dict["OPTIONS"].get("pool"), "Needs a connection pool.")
+    def test_pool_usage_is_recorded(self) -> None:
+        timeouts = self.sample("library_db_pool_timeouts_total", database=DEFAULT_DB_ALIAS)
+        self.client.force_authenticate(self.admin)
+
+        pop_stats = connection.pool.pop_stats
+        with mock.patch.object(
+            connection.pool, "pop_stats", lambda: {**pop_stats(), "requests_errors": 2}
+        ):
+            output = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'library_db_pool_connections{database="default",state="in_use"} 1.0', output
+        )
+        self.assertIn('library_db_pool_waiting{database="default"} 0.0', output)
+        self.assertEqual(
+            self.sample("library_db_pool_timeouts_total", database=DEFAULT_DB_ALIAS),
+            timeouts + 4,
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "Needs the PostgreSQL backend.")
+    def test_pool_stats_leave_unused_databases_alone(self) -> None:
+        connections.settings["unused"] = {**connection.settings_dict, "OPTIONS": {"pool": True}}
+        self.addCleanup(connections.settings.pop, "unused")
+
+        with mock.patch("psycopg_pool.ConnectionPool") as pool_class:
+            record_pool_stats()
+
+        pool_class.assert_not_called()
+
+    def test_samples_from_all_processes_are_added_up(self) -> None:
+        record = (
+            "import django; django.setup(); "
+            "from library_service_api.metrics import DB_POOL_WAITING, REQUEST_LATENCY; "
+            "REQUEST_LATENCY.labels('BookViewSet.list', 'GET', '200').observe(0.25); "
+            "DB_POOL_WAITING.labels('default').set(3)"
+        )
+        with tempfile.TemporaryDirectory() as root:
+            for container in ("web", "worker"):
+                directory = os.path.join(root, container)
+                os.mkdir(directory)
+                subprocess.run(
+                    [sys.executable, "-c", record],
+                    cwd=settings.BASE_DIR,
+                    env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory},
+                    check=True,
+                )
+            with override_settings(METRICS={"MULTIPROC_ROOT": root}):
+                output = render_metrics().decode()
+
+        self.assertNotIn('library_db_pool_waiting{database="default"}', output)
+
+        self.assertIn(
+            'library_request_duration_seconds_count{method="GET",status="200",'
+            'view="BookViewSet.list"} 2.0',
+            output,
+        )
+        self.assertIn(
+            'library_request_duration_seconds_sum{method="GET",status="200",'
+            'view="BookViewSet.list"} 0.5',
+            output,
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs a connection blind to uncommitted rows.")
+class ReplicaRoutingTest(TestCase):
+    """
+    The replica is a second connection to the test database. It can't see
+    rows the test hasn't committed, like a replica that hasn't caught up.
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        connections.settings["replica"] = {**connections[DEFAULT_DB_ALIAS].settings_dict}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        connections["replica"].close()
+        connections["replica"].close_pool()
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def setUp(self) -> None:
+        self.replicas = override_settings(
+            REPLICAS={"DATABASES": ["replica"], "STICKY_SECONDS": 5}
+        )
+        self.replicas.enable()
+        self.addCleanup(self.replicas.disable)
+        reset_borrowing_list_cache()
+        self.addCleanup(reset_borrowing_list_cache)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.client.force_authenticate(self.user)
+        self.borrowing = create_borrowing(user=self.user)
+
+    def without_stickiness(self):
+        return override_settings(REPLICAS={"DATABASES": ["replica"], "STICKY_SECONDS": 0})
+
+    def borrow(self) -> int:
+        response = self.client.post(
+            BORROWING_URL,
+            {"book": create_book().id, "expected_return_date": current_date() + timedelta(days=14)},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def test_safe_requests_read_from_replica(self) -> None:
+        with CaptureQueriesContext(connections["replica"]) as queries:
+            response = self.client.get(detail_url(self.borrowing.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(queries.captured_queries)
+
+    def test_writer_sticks_to_primary(self) -> None:
+        borrowing_id = self.borrow()
+
+        response = self.client.get(detail_url(borrowing_id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_stickiness_expires(self) -> None:
+        with self.without_stickiness():
+            borrowing_id = self.borrow()
+            response = self.client.get(detail_url(borrowing_id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_return_reads_from_primary(self) -> None:
+        response = self.client.get(return_url(self.borrowing.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_fresh_cache_versions_are_filled_from_primary(self) -> None:
+        fresh = self.client.get(BORROWING_URL)
+        with self.without_stickiness():
+            create_borrowing(user=self.user, expected_return_date=current_date() + timedelta(days=28))
+            stale = self.client.get(BORROWING_URL)
+
+        self.assertEqual([item["id"] for item in fresh.data["results"]], [self.borrowing.id])
+        self.assertEqual(stale.data["results"], [])
+
+    def test_primary_outside_requests(self) -> None:
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(Borrowing))
+        with use_primary():
+            self.assertIsNone(router.db_for_read(Borrowing))
+        self.assertIs(router.allow_migrate("replica", "borrowings"), False)
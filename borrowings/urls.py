@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework import routers
 
 from borrowings.views import BorrowingViewSet
+from library_service_api.asyncviews import async_view
 
 router = routers.DefaultRouter()
 router.register("borrowings", BorrowingViewSet)
@@ -9,6 +10,16 @@ router.register("borrowings", BorrowingViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path(
+        "async/borrowings/",
+        async_view(BorrowingViewSet, "list"),
+        name="borrowing-list-async",
+    ),
+    path(
+        "async/borrowings/<int:pk>/",
+        async_view(BorrowingViewSet, "retrieve"),
+        name="borrowing-detail-async",
+    ),
 ]
 
 app_name = "borrowings"
@@ -1,38 +1,92 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import Http404
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from django.utils.timezone import now
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 
-from borrowings.models import Borrowing
+from borrowings.cache import (
+    get_borrowing_list_cache,
+    get_user_last_modified,
+    get_user_version,
+)
+from books.models import Book
+from borrowings.checkout import checkout_books, return_borrowing, return_borrowings
+from borrowings.fees import get_balance
+from borrowings.models import ArchivedBorrowing, Borrowing, BorrowingHistory, current_date
+from borrowings.popularity import (
+    get_period_starts,
+    get_setting as get_popularity_setting,
+    get_top_books,
+)
+from borrowings.rollups import get_daily_series, get_rolled_up_until
 from borrowings.serializers import (
+    BorrowingAnalyticsQuerySerializer,
+    BorrowingAnalyticsSerializer,
     BorrowingSerializer,
+    BorrowingBalanceSerializer,
     BorrowingListSerializer,
     BorrowingDetailSerializer,
     BorrowingAdminListSerializer,
-    BorrowingAdminDetailSerializer
+    BorrowingAdminDetailSerializer,
+    BorrowingBatchItemSerializer,
+    BorrowingBatchReturnSerializer,
+    BorrowingBatchSerializer,
+    PopularBooksQuerySerializer,
+    PopularBooksSerializer,
 )
-from borrowings.notifications.telegram import send_telegram_message
+from borrowings.notifications.outbox import enqueue
+from library_service_api.asyncviews import AsyncReadMixin
+from library_service_api.caching import get_or_compute
+from library_service_api.exports import CSVRenderer, NDJSONRenderer, stream_export
+from library_service_api.fieldsets import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetViewMixin
+from library_service_api.plans import LeanListMixin
+from library_service_api.replicas import is_recent_write, use_primary
 
 
 @extend_schema_view(
     create=extend_schema(summary="Create borrowing"),
-    retrieve=extend_schema(summary="Get borrowing details")
+    retrieve=extend_schema(summary="Get borrowing details", parameters=SPARSE_FIELDSET_PARAMETERS)
 )
 class BorrowingViewSet(
+    LeanListMixin,
+    AsyncReadMixin,
+    SparseFieldsetViewMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
     queryset = Borrowing.objects.all()
+    # Reads that include archived borrowings; the rest only need the
+    # borrowings that can still change.
+    history_queryset = BorrowingHistory.objects.all()
+    history_actions = ("list", "retrieve", "export")
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("borrow_date", "id")
+    count_strategy = "cached"
+    query_budgets = {
+        "list": 3,
+        "retrieve": 2,
+        "create": 10,
+        "export": 2,
+        "return_book": 6,
+        "batch_checkout": 11,
+        "batch_return": 7,
+        "balance": 1,
+        "popular": 1,
+        "analytics": 3,
+    }
 
     def get_queryset(self):
-        queryset = self.queryset.select_related()
+        queryset = self.history_queryset if self.action in self.history_actions else self.queryset
         if self.request.user.is_staff:
+            queryset = queryset.select_related()
             is_active = self.request.query_params.get("is_active")
             if is_active:
                 queryset = queryset.filter(is_active=is_active == "true")
@@ -42,7 +96,14 @@ class BorrowingViewSet(
                 queryset = queryset.filter(user_id=user_id)
 
             return queryset
-        return self.queryset.filter(user=self.request.user)
+        return queryset.select_related("book").filter(user=self.request.user)
+
+    def get_archived_queryset(self):
+        """The archived borrowings the user may see; all were returned before archiving."""
+        queryset = ArchivedBorrowing.objects.all()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -52,20 +113,18 @@ class BorrowingViewSet(
         return BorrowingSerializer
 
     def perform_create(self, serializer):
-        book = serializer.validated_data["book"]
-        book.inventory -= 1
-        book.save()
-        borrowing = serializer.save(user=self.request.user)
-
-        message = (
-            f"Created new borrowing!\n"
-            f"\n"
-            f"User: {borrowing.user.get_full_name()}\n"
-            f"Book: {borrowing.book.__str__()}\n"
-            f"Data of borrowing: {borrowing.borrow_date}\n"
-            f"Expected return date: {borrowing.expected_return_date}\n"
-        )
-        send_telegram_message(message)
+        with transaction.atomic():
+            borrowing = serializer.save(user=self.request.user)
+
+            message = (
+                f"Created new borrowing!\n"
+                f"\n"
+                f"User: {borrowing.user.get_full_name()}\n"
+                f"Book: {borrowing.book.__str__()}\n"
+                f"Data of borrowing: {borrowing.borrow_date}\n"
+                f"Expected return date: {borrowing.expected_return_date}\n"
+            )
+            enqueue(message)
 
     @extend_schema(
         summary="List borrowings",
@@ -83,24 +142,101 @@ class BorrowingViewSet(
                 description="Filter by user_id field.",
                 required=False
             ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+
+        def build():
+            # Someone else, e.g. staff returning a book, may have just
+            # changed this user's borrowings.
+            with use_primary(is_recent_write(get_user_last_modified(request.user.id))):
+                return super(BorrowingViewSet, self).list(request, *args, **kwargs).data
+
+        data, hit = get_borrowing_list_cache().get_or_set(
+            get_user_version(request.user.id),
+            f"{request.user.id}:{request.accepted_renderer.format}:{request.get_full_path()}",
+            build,
+        )
+        return Response(data, headers={"X-Cache": "HIT" if hit else "MISS"})
+
+    async def alist(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return await super().alist(request, *args, **kwargs)
+
+        async def build():
+            last_modified = await sync_to_async(get_user_last_modified)(request.user.id)
+            with use_primary(is_recent_write(last_modified)):
+                return (await super(BorrowingViewSet, self).alist(request, *args, **kwargs)).data
+
+        data, hit = await get_borrowing_list_cache().aget_or_set(
+            await sync_to_async(get_user_version)(request.user.id),
+            f"{request.user.id}:{request.accepted_renderer.format}:{request.get_full_path()}",
+            build,
+        )
+        return Response(data, headers={"X-Cache": "HIT" if hit else "MISS"})
+
+    @extend_schema(
+        summary="Export borrowings",
+        description=(
+            "Streams borrowings as CSV or NDJSON, chosen with `?format=csv|ndjson` "
+            "or the Accept header. Accepts the same filters as the list. Staff only."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="is_active",
+                type=OpenApiTypes.STR,
+                description="Filter by is_active field, choose from true/false options.",
+                required=False
+            ),
+            OpenApiParameter(
+                name="user_id",
+                type=OpenApiTypes.INT,
+                description="Filter by user_id field.",
+                required=False
+            ),
+        ],
+        responses={(status.HTTP_200_OK, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        return stream_export(
+            self.get_queryset().order_by("id"),
+            [
+                "id",
+                "borrow_date",
+                "expected_return_date",
+                "actual_return_date",
+                "is_active",
+                "book_id",
+                "book__name",
+                "user_id",
+                "user__email",
+            ],
+            request.accepted_renderer.format,
+            "borrowings",
+        )
 
     @extend_schema(
         responses={status.HTTP_200_OK: {"detail": "The book returned successfully."}}
     )
     @action(methods=["GET"], detail=True, url_path="return")
+    @use_primary()
     def return_book(self, request, pk=None):
         """Return the book in library and close the borrowing."""
-        borrowing = self.get_object()
-        if borrowing.is_active:
-            borrowing.is_active = False
-            borrowing.actual_return_date = now().date()
-            borrowing.book.inventory += 1
-            borrowing.book.save()
-            borrowing.save()
+        try:
+            returned = return_borrowing(self.get_object())
+        except Http404:
+            get_object_or_404(self.get_archived_queryset(), pk=pk)
+            returned = False
+        if returned:
             return Response(
                 {"detail": "The book returned successfully."},
                 status=status.HTTP_200_OK
@@ -109,3 +245,190 @@ class BorrowingViewSet(
             {"detail": "This book is already returned."},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @extend_schema(
+        summary="Check out several books",
+        description=(
+            "Creates one borrowing per item in a single transaction and sends one "
+            "notification for the whole batch. Every item gets its own result: "
+            "status 201 with the borrowing, or status 400 with the errors."
+        ),
+        request=BorrowingBatchSerializer,
+    )
+    @action(methods=["POST"], detail=False, url_path="batch")
+    def batch_checkout(self, request):
+        batch = BorrowingBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        items = batch.validated_data["items"]
+
+        book_ids = set()
+        for item in items:
+            try:
+                book_ids.add(int(item.get("book")))
+            except (TypeError, ValueError):
+                pass
+        context = {**self.get_serializer_context(), "books": Book.objects.in_bulk(book_ids)}
+
+        results = [None] * len(items)
+        valid = []
+        for position, item in enumerate(items):
+            serializer = BorrowingBatchItemSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((position, serializer))
+            else:
+                results[position] = {"status": status.HTTP_400_BAD_REQUEST, "errors": serializer.errors}
+
+        with transaction.atomic():
+            borrowings = checkout_books(
+                request.user, [serializer.validated_data for _, serializer in valid]
+            )
+            created = []
+            for (position, serializer), borrowing in zip(valid, borrowings):
+                if borrowing is None:
+                    results[position] = {
+                        "status": status.HTTP_400_BAD_REQUEST,
+                        "errors": {"book": ["This book is out of stock."]},
+                    }
+                    continue
+                serializer.instance = borrowing
+                results[position] = {"status": status.HTTP_201_CREATED, "data": serializer.data}
+                created.append(borrowing)
+
+            if created:
+                books = "".join(
+                    f"- {borrowing.book} (expected {borrowing.expected_return_date})\n"
+                    for borrowing in created
+                )
+                enqueue(
+                    f"Created new borrowings!\n"
+                    f"\n"
+                    f"User: {request.user.get_full_name()}\n"
+                    f"Data of borrowing: {created[0].borrow_date}\n"
+                    f"Books:\n"
+                    f"{books}"
+                )
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Return several books",
+        description=(
+            "Closes the given borrowings with one update in a single transaction. "
+            "Every id gets its own result: status 200 if it was returned, 400 if it "
+            "was already returned or 404 if it isn't one of your borrowings."
+        ),
+        request=BorrowingBatchReturnSerializer,
+    )
+    @action(methods=["POST"], detail=False, url_path="batch-return")
+    def batch_return(self, request):
+        batch = BorrowingBatchReturnSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        ids = batch.validated_data["ids"]
+
+        borrowings = Borrowing.objects.filter(pk__in=ids)
+        if not request.user.is_staff:
+            borrowings = borrowings.filter(user=request.user)
+        found = borrowings.in_bulk()
+        closed = return_borrowings(list(found.values()))
+        archived = set()
+        if missing := [pk for pk in ids if pk not in found]:
+            archived = set(
+                self.get_archived_queryset().filter(pk__in=missing).values_list("pk", flat=True)
+            )
+
+        results = []
+        for pk in ids:
+            if pk not in found and pk not in archived:
+                results.append({"id": pk, "status": status.HTTP_404_NOT_FOUND, "detail": "Not found."})
+            elif pk in closed:
+                closed.discard(pk)
+                results.append(
+                    {"id": pk, "status": status.HTTP_200_OK, "detail": "The book returned successfully."}
+                )
+            else:
+                results.append(
+                    {"id": pk, "status": status.HTTP_400_BAD_REQUEST, "detail": "This book is already returned."}
+                )
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Fee balance",
+        description=(
+            "What the user owes for rentals and late fines, as of the last fee "
+            "accrual. Staff can pass `user_id` to see another user's balance."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="user_id",
+                type=OpenApiTypes.INT,
+                description="User to show the balance of (admin only).",
+                required=False
+            ),
+        ],
+        responses=BorrowingBalanceSerializer,
+    )
+    @action(methods=["GET"], detail=False)
+    def balance(self, request):
+        user_id = request.user.id
+        if request.user.is_staff and request.query_params.get("user_id"):
+            try:
+                user_id = int(request.query_params["user_id"])
+            except ValueError:
+                raise ValidationError({"user_id": ["A valid integer is required."]})
+        return Response(BorrowingBalanceSerializer(get_balance(user_id)).data)
+
+    @extend_schema(
+        summary="Most borrowed books",
+        description=(
+            "The most borrowed books this week, this month or of all time, read "
+            "from counters kept up to date on checkout and cached briefly."
+        ),
+        parameters=[PopularBooksQuerySerializer],
+        responses=PopularBooksSerializer,
+    )
+    @action(methods=["GET"], detail=False, permission_classes=[AllowAny])
+    def popular(self, request):
+        query = PopularBooksQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        period = query.validated_data["period"].upper()
+        limit = query.validated_data["limit"]
+        period_start = get_period_starts(current_date())[period]
+
+        results = get_or_compute(
+            f"borrowings:popular:{period}:{period_start}:{limit}",
+            lambda: get_top_books(period, period_start, limit),
+            get_popularity_setting("CACHE_TIMEOUT"),
+        )
+        return Response(PopularBooksSerializer({
+            "period": query.validated_data["period"],
+            "period_start": period_start,
+            "results": results,
+        }).data)
+
+    @extend_schema(
+        summary="Daily borrowing analytics",
+        description=(
+            "Borrowings opened, returned and active at the end of each day from "
+            "`start` to `end`, for all borrowings, one `book` or one user `cohort` "
+            "(the month users joined, as YYYY-MM). Read from daily rollups, which "
+            "cover the days before `rolled_up_until`. Staff only."
+        ),
+        parameters=[BorrowingAnalyticsQuerySerializer],
+        responses=BorrowingAnalyticsSerializer,
+    )
+    @action(methods=["GET"], detail=False, permission_classes=[IsAdminUser])
+    def analytics(self, request):
+        query = BorrowingAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        return Response(BorrowingAnalyticsSerializer({
+            "start": params["start"],
+            "end": params["end"],
+            "book": params.get("book"),
+            "cohort": params.get("cohort"),
+            "rolled_up_until": get_rolled_up_until(),
+            "days": get_daily_series(
+                params["start"], params["end"], params.get("book"), params.get("cohort")
+            ),
+        }).data)
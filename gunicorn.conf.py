@@ -0,0 +1,10 @@
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Workers leave through os._exit, skipping atexit; drop their live
+    # gauges here so they stop counting towards the pool totals.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
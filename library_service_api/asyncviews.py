@@ -0,0 +1,84 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response
+
+from library_service_api.fieldsets import SparseFieldset, SparseFieldsetSerializerMixin
+from library_service_api.plans import get_row_plan
+
+
+class AsyncReadMixin:
+    """
+    Async ``list`` and ``retrieve`` for viewsets served by ``async_view``.
+
+    Querysets, permissions and serializers are the viewset's own; only
+    reading the rows is awaited through the async ORM, so a worker keeps
+    serving other requests while it waits on the database. Lists need a
+    serializer ``LeanListMixin`` can compile; others run the sync ``list``
+    in a worker thread.
+    """
+
+    async def alist(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fieldset = None
+        if issubclass(serializer_class, SparseFieldsetSerializerMixin):
+            fieldset = SparseFieldset.from_query_params(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = get_row_plan(serializer_class, fieldset, queryset.model)
+        if plan is None:
+            return await sync_to_async(self.list)(request, *args, **kwargs)
+
+        ordering = [field.lstrip("-") for field in getattr(self, "cursor_ordering", ())]
+        rows = queryset.values(*dict.fromkeys(plan.lookups + ordering))
+        if self.paginator is None:
+            return Response(plan.represent_many([row async for row in rows]))
+        page = await self.paginator.apaginate_queryset(rows, request, view=self)
+        if page is None:
+            return Response(plan.represent_many([row async for row in rows]))
+        return self.get_paginated_response(plan.represent_many(page))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+
+def async_view(viewset_class, action: str):
+    """
+    An async Django view running ``a<action>`` of ``viewset_class`` for GET.
+
+    It goes through the same steps as ``APIView.dispatch``: content
+    negotiation, authentication, permissions, exception handling and
+    rendering. Authenticators are sync and run in a worker thread.
+    """
+
+    async def view(request, *args, **kwargs):
+        self = viewset_class(action_map={"get": action, "head": action})
+        self.args = args
+        self.kwargs = kwargs
+        self.request = self.initialize_request(request, *args, **kwargs)
+        self.headers = self.default_response_headers
+        try:
+            if self.request.method.lower() not in self.action_map:
+                raise MethodNotAllowed(self.request.method)
+            await sync_to_async(self.perform_authentication)(self.request)
+            self.initial(self.request, *args, **kwargs)
+            response = await getattr(self, f"a{action}")(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(self.request, response, *args, **kwargs)
+
+    view.cls = viewset_class
+    view.initkwargs = {}
+    view.actions = {"get": action, "head": action}
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,162 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+logger = logging.getLogger(__name__)
+
+VIEWSET_ACTIONS = ("list", "create", "retrieve", "update", "partial_update", "destroy")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def get_query_budget(view_class, action: str) -> int | None:
+    """
+    The most queries ``action`` of ``view_class`` may run, from its
+    ``query_budgets`` mapping. Viewsets key it by action name, plain API
+    views by lowercase HTTP method.
+    """
+    return getattr(view_class, "query_budgets", {}).get(action)
+
+
+def resolve_view(request) -> tuple[type | None, str]:
+    """
+    The API view class that served ``request`` and the action it ran, or
+    ``None`` for requests that didn't reach a DRF view.
+    """
+    match = request.resolver_match
+    view_class = getattr(getattr(match, "func", None), "cls", None)
+    method = request.method.lower()
+    if view_class is None:
+        return None, method
+    return view_class, getattr(match.func, "actions", {}).get(method, method)
+
+
+def get_view_actions(view_class) -> list[str]:
+    """Every action a view serves, as keys for ``query_budgets``."""
+    if hasattr(view_class, "get_extra_actions"):
+        actions = [action for action in VIEWSET_ACTIONS if hasattr(view_class, action)]
+        return actions + [action.__name__ for action in view_class.get_extra_actions()]
+    return [
+        method for method in view_class.http_method_names
+        if method not in ("head", "options") and hasattr(view_class, method)
+    ]
+
+
+def get_missing_budgets(view_class) -> list[str]:
+    return [
+        action for action in get_view_actions(view_class)
+        if get_query_budget(view_class, action) is None
+    ]
+
+
+_query_observers: ContextVar[tuple] = ContextVar("query_observers", default=())
+
+
+@contextmanager
+def notify_observers(sql: str):
+    """
+    Time the query ``sql`` run inside the block for the active observers.
+    The project's database backend runs every cursor query inside it.
+    """
+    observers = _query_observers.get()
+    if not observers:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        for observer in observers:
+            observer(sql, duration)
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Call ``observer(sql, duration)`` for every query run inside the block.
+
+    Observers live in a context variable rather than on one connection, so
+    queries the async ORM runs on worker threads, each with its own
+    connection, are seen as well. Queries are reported by the cursors of
+    the ``library_service_api.postgresql`` backend.
+    """
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+@contextmanager
+def capture_queries():
+    """Collect the SQL of every query run on any database inside the block."""
+    queries = []
+    with observe_queries(lambda sql, duration: queries.append(sql)):
+        yield queries
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries of each API request and checks them against the
+    view's ``query_budgets``.
+
+    Meant for development: it only loads when ``QUERY_BUDGETS["ENFORCE"]``
+    is set, which defaults to ``DEBUG``. Over-budget requests raise
+    ``QueryBudgetExceeded``, or are only logged with ``"RAISE": False``.
+    Responses carry ``X-Query-Count`` and ``X-Query-Budget`` headers.
+    Streaming responses run their queries after the view returns, so they
+    are left to the test helpers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        config = getattr(settings, "QUERY_BUDGETS", {})
+        if not config.get("ENFORCE", settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.raise_on_exceeded = config.get("RAISE", True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with capture_queries() as queries:
+            response = self.get_response(request)
+        return self.check(request, response, queries)
+
+    async def __acall__(self, request):
+        with capture_queries() as queries:
+            response = await self.get_response(request)
+        return self.check(request, response, queries)
+
+    def check(self, request, response, queries: list[str]):
+        view_class, action = resolve_view(request)
+        if view_class is None or response.streaming:
+            return response
+        budget = get_query_budget(view_class, action)
+
+        response["X-Query-Count"] = str(len(queries))
+        if budget is None:
+            return response
+        response["X-Query-Budget"] = str(budget)
+        if len(queries) > budget:
+            message = (
+                f"{view_class.__name__}.{action} ran {len(queries)} queries, "
+                f"its budget is {budget}."
+            )
+            if self.raise_on_exceeded:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from library_service_api.replicas import is_recent_write, use_primary
+
+
+def get_or_compute(key: str, compute, timeout: int, lock_timeout: int = 10):
+    """
+    Return the cached value for ``key``, computing it at most once at a time.
+
+    On a miss one caller takes a short lock in the cache and computes the
+    value while concurrent callers poll for the result, so an expired entry
+    costs a single database query instead of one per waiting request.
+    Waiters compute the value themselves only if the lock holder gives up.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + lock_timeout
+    while not cache.add(lock_key, 1, lock_timeout):
+        time.sleep(0.02)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if time.monotonic() > deadline:
+            return compute()
+
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+async def aget_or_compute(key: str, compute, timeout: int, lock_timeout: int = 10):
+    """``get_or_compute`` for async callers, awaiting ``compute()``."""
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + lock_timeout
+    while not await cache.aadd(lock_key, 1, lock_timeout):
+        await asyncio.sleep(0.02)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+        if time.monotonic() > deadline:
+            return await compute()
+
+    try:
+        value = await compute()
+        await cache.aset(key, value, timeout)
+        return value
+    finally:
+        await cache.adelete(lock_key)
+
+
+class LRUCacheBackend:
+    """Bounded in-process cache, meant for tests and single-worker setups."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: int | None) -> None:
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class DjangoCacheBackend:
+    """Entries and counters in a Django cache, shared by every worker."""
+
+    def __init__(self, alias: str = "default") -> None:
+        self.cache = caches[alias]
+
+    def get(self, key: str):
+        return self.cache.get(key)
+
+    def set(self, key: str, value, timeout: int | None) -> None:
+        self.cache.set(key, value, timeout)
+
+    def incr(self, key: str) -> None:
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def get_counter(self, key: str) -> int:
+        return self.cache.get(key, 0)
+
+
+class VersionedCache:
+    """
+    Values stored under a caller-supplied version, with hit/miss counters.
+
+    Bumping the version is the only invalidation: entries written under an
+    older version are never read again and age out of the backend.
+    """
+
+    def __init__(self, namespace: str, backend, timeout: int | None = 300) -> None:
+        self.namespace = namespace
+        self.backend = backend
+        self.timeout = timeout
+
+    def get_key(self, version: int, variant: str) -> str:
+        digest = hashlib.md5(variant.encode()).hexdigest()
+        return f"{self.namespace}:{version}:{digest}"
+
+    def get_or_set(self, version: int, variant: str, compute) -> tuple[object, bool]:
+        key = self.get_key(version, variant)
+        value = self.backend.get(key)
+        if value is not None:
+            self.backend.incr(f"{self.namespace}:hits")
+            return value, True
+
+        self.backend.incr(f"{self.namespace}:misses")
+        value = compute()
+        self.backend.set(key, value, self.timeout)
+        return value, False
+
+    async def aget_or_set(self, version: int, variant: str, compute) -> tuple[object, bool]:
+        """``get_or_set`` for async callers; backend calls run in a worker thread."""
+        key = self.get_key(version, variant)
+        value = await sync_to_async(self.backend.get)(key)
+        if value is not None:
+            await sync_to_async(self.backend.incr)(f"{self.namespace}:hits")
+            return value, True
+
+        await sync_to_async(self.backend.incr)(f"{self.namespace}:misses")
+        value = await compute()
+        await sync_to_async(self.backend.set)(key, value, self.timeout)
+        return value, False
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.backend.get_counter(f"{self.namespace}:hits"),
+            "misses": self.backend.get_counter(f"{self.namespace}:misses"),
+        }
+
+
+class VersionedResponseMixin:
+    """
+    Conditional GET and server-side caching for read-only actions.
+
+    ``get_cache_version`` returns a counter bumped on every write to the
+    underlying data. The ETag derives from that version and the request
+    URL, so ``If-None-Match`` is answered with 304 before any query runs,
+    and serialized payloads are cached under the same key.
+    """
+
+    response_cache_timeout = 60 * 60
+
+    def get_cache_version(self) -> int:
+        raise NotImplementedError
+
+    def get_last_modified(self) -> float | None:
+        return None
+
+    def versioned_response(self, request, build):
+        etag, last_modified, not_modified = self.get_conditional_response(request)
+        if not_modified is not None:
+            return not_modified
+        # Fill the cache for a new version from the primary, not from a
+        # replica that may not have the write behind it yet.
+        with use_primary(is_recent_write(last_modified)):
+            data = get_or_compute(
+                f"response:{etag}",
+                lambda: build().data,
+                self.response_cache_timeout,
+            )
+        return self.get_versioned_response(data, etag, last_modified)
+
+    async def aversioned_response(self, request, build):
+        """``versioned_response`` for async views, awaiting ``build()``."""
+        etag, last_modified, not_modified = await sync_to_async(
+            self.get_conditional_response
+        )(request)
+        if not_modified is not None:
+            return not_modified
+
+        async def build_data():
+            return (await build()).data
+
+        with use_primary(is_recent_write(last_modified)):
+            data = await aget_or_compute(
+                f"response:{etag}", build_data, self.response_cache_timeout
+            )
+        return self.get_versioned_response(data, etag, last_modified)
+
+    def get_conditional_response(self, request):
+        """The ETag and Last-Modified of ``request``, and a 304 if they match."""
+        variant = (
+            f"{self.get_cache_version()}:{request.accepted_renderer.format}:"
+            f"{request.get_full_path()}"
+        )
+        etag = f'"{hashlib.md5(variant.encode()).hexdigest()}"'
+        last_modified = self.get_last_modified()
+
+        # Last-Modified has whole-second precision and the version can
+        # change twice within a second, so only a matching ETag is trusted
+        # for a 304; If-Modified-Since alone always gets the full response.
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            not_modified.headers.setdefault("ETag", etag)
+        return etag, last_modified, not_modified
+
+    @staticmethod
+    def get_versioned_response(data, etag: str, last_modified: float | None) -> Response:
+        response = Response(data, headers={"ETag": etag})
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
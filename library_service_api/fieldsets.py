@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to return, `book.name` for nested ones.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="exclude",
+        type=OpenApiTypes.STR,
+        description="Comma-separated fields to leave out.",
+        required=False
+    ),
+    OpenApiParameter(
+        name="expand",
+        type=OpenApiTypes.STR,
+        description="Comma-separated related fields to return as nested objects.",
+        required=False
+    ),
+]
+
+
+def _split(value: str | None) -> frozenset:
+    return frozenset(part.strip() for part in (value or "").split(",") if part.strip())
+
+
+def _children(paths: frozenset, name: str) -> frozenset:
+    prefix = f"{name}."
+    return frozenset(path[len(prefix):] for path in paths if path.startswith(prefix))
+
+
+@dataclass(frozen=True)
+class SparseFieldset:
+    """
+    Fields requested with ``?fields=``, ``?exclude=`` and ``?expand=``.
+
+    Dotted paths address nested serializers: ``fields=id,book.name`` keeps
+    ``id`` and only the ``name`` of the nested book.
+    """
+
+    include: frozenset | None = None
+    exclude: frozenset = frozenset()
+    expand: frozenset = frozenset()
+
+    @classmethod
+    def from_query_params(cls, params) -> "SparseFieldset":
+        include = _split(params.get("fields"))
+        return cls(
+            include=include or None,
+            exclude=_split(params.get("exclude")),
+            expand=_split(params.get("expand")),
+        )
+
+    def top_level(self, paths: frozenset) -> set[str]:
+        return {path.split(".", 1)[0] for path in paths}
+
+    def nested(self, name: str) -> "SparseFieldset":
+        include = None
+        if self.include is not None and name not in self.include:
+            include = _children(self.include, name) or None
+        return SparseFieldset(
+            include=include,
+            exclude=_children(self.exclude, name),
+            expand=_children(self.expand, name),
+        )
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer trimmed to the fieldset requested by the client.
+
+    ``expandable_fields`` maps field names to serializer classes that
+    replace the flat representation when the field is named in
+    ``?expand=``. ``field_columns`` lists the model columns a field reads
+    when that can't be told from its source, such as a model method.
+    """
+
+    expandable_fields: dict = {}
+    field_columns: dict = {}
+
+    def __init__(self, *args, **kwargs):
+        self.sparse_fieldset = kwargs.pop("sparse_fieldset", None)
+        super().__init__(*args, **kwargs)
+        request = self._context.get("request")
+        if self.sparse_fieldset is None and request is not None:
+            self.sparse_fieldset = SparseFieldset.from_query_params(request.query_params)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.sparse_fieldset
+        if fieldset is None:
+            return fields
+
+        for name in fieldset.top_level(fieldset.expand) & set(self.expandable_fields):
+            fields[name] = self.expandable_fields[name](read_only=True)
+
+        requested = set()
+        for paths in (fieldset.include or frozenset(), fieldset.exclude, fieldset.expand):
+            requested |= fieldset.top_level(paths)
+        unknown = requested - set(fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+
+        if fieldset.include is not None:
+            keep = fieldset.top_level(fieldset.include)
+            fields = {name: field for name, field in fields.items() if name in keep}
+        for name in fieldset.exclude:
+            fields.pop(name, None)
+
+        for name, field in fields.items():
+            if isinstance(field, SparseFieldsetSerializerMixin):
+                field.sparse_fieldset = fieldset.nested(name)
+        return fields
+
+
+def get_model_columns(serializer, model, prefix: str = "") -> tuple[set, set] | None:
+    """
+    Columns and forward relations ``serializer`` reads from ``model``.
+
+    Returns ``(columns, relations)`` as lookup paths for ``.only()`` and
+    ``select_related()``, or ``None`` when a field reads something that
+    can't be mapped to columns.
+    """
+    columns, relations = set(), set()
+    field_columns = getattr(serializer, "field_columns", {})
+    for name, field in serializer.fields.items():
+        if name in field_columns:
+            for path in field_columns[name]:
+                columns.add(prefix + path)
+                parts = path.split("__")[:-1]
+                relations.update(
+                    prefix + "__".join(parts[:depth]) for depth in range(1, len(parts) + 1)
+                )
+            continue
+        if field.source == "*":
+            return None
+
+        attribute, *rest = field.source_attrs
+        try:
+            model_field = model._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            return None
+
+        path = prefix + attribute
+        columns.add(path)
+        if not model_field.is_relation or isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+
+        relations.add(path)
+        related = model_field.related_model
+        if isinstance(field, serializers.BaseSerializer):
+            nested = get_model_columns(field, related, f"{path}__")
+            if nested is not None:
+                columns |= nested[0]
+                relations |= nested[1]
+        elif isinstance(field, serializers.SlugRelatedField):
+            columns.add(f"{path}__{field.slug_field}")
+        elif rest:
+            try:
+                related._meta.get_field(rest[0])
+                columns.add(f"{path}__{rest[0]}")
+            except FieldDoesNotExist:
+                pass
+    return columns, relations
+
+
+class SparseFieldsetViewMixin:
+    """
+    Narrows the queryset of read actions to what the serializer returns.
+
+    Unused columns are deferred with ``.only()`` and only the joins the
+    serializer follows are kept in ``select_related()``. Fields named in
+    ``cursor_ordering`` are always loaded for keyset pagination.
+    """
+
+    sparse_fieldset_actions = ("list", "retrieve")
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_fieldset_actions:
+            return queryset
+
+        serializer = self.get_serializer()
+        mapped = get_model_columns(serializer, queryset.model)
+        if mapped is None:
+            return queryset
+        columns, relations = mapped
+        columns.update(
+            field.lstrip("-") for field in getattr(self, "cursor_ordering", ())
+        )
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset.only(*sorted(columns))
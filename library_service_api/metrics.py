@@ -0,0 +1,240 @@
+import atexit
+import glob
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from drf_spectacular.utils import extend_schema
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.views import APIView
+
+from library_service_api.budgets import observe_queries, resolve_view
+
+
+# Metrics are process-local unless PROMETHEUS_MULTIPROC_DIR is set before
+# this module is imported; then every process writes its samples there and
+# the endpoint adds them up, so all workers and the notification
+# dispatcher report through one scrape. Files are named by PID, so each
+# container needs a directory of its own; METRICS["MULTIPROC_ROOT"] is
+# the parent of those directories, read by the endpoint.
+REQUEST_LABELS = ("view", "method", "status")
+
+REQUEST_LATENCY = Histogram(
+    "library_request_duration_seconds",
+    "Time spent handling a request.",
+    REQUEST_LABELS,
+)
+REQUEST_QUERIES = Histogram(
+    "library_request_db_queries",
+    "SQL queries run by a request.",
+    REQUEST_LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_QUERY_TIME = Histogram(
+    "library_request_db_duration_seconds",
+    "Time a request spent in SQL queries.",
+    REQUEST_LABELS,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    "library_response_size_bytes",
+    "Size of response bodies; streamed responses are left out.",
+    REQUEST_LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+NOTIFICATION_LATENCY = Histogram(
+    "library_notification_latency_seconds",
+    "Time from queueing a notification to delivering it.",
+    buckets=(1, 2, 5, 10, 30, 60, 300, 900, 3600, 21600),
+)
+NOTIFICATION_DELIVERIES = Counter(
+    "library_notification_deliveries",
+    "Notification delivery attempts by outcome.",
+    ("outcome",),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "library_db_pool_connections",
+    "Connections held by the database pool, in use or idle.",
+    ("database", "state"),
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAITING = Gauge(
+    "library_db_pool_waiting",
+    "Requests waiting for a pooled database connection.",
+    ("database",),
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT_TIME = Counter(
+    "library_db_pool_wait_seconds",
+    "Time requests spent waiting for a pooled database connection.",
+    ("database",),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "library_db_pool_timeouts",
+    "Requests that gave up waiting for a pooled database connection.",
+    ("database",),
+)
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drops the live gauges of an exited process, this one by default."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+atexit.register(mark_process_dead)
+
+
+def record_pool_stats() -> None:
+    """
+    Publishes the usage of this process's database connection pools. Only
+    pools already opened are read, so databases this process hasn't used,
+    such as idle replicas, get no connection wrapper or pool.
+    """
+    pooled = (database.get("OPTIONS", {}).get("pool") for database in connections.settings.values())
+    if not any(pooled):
+        return
+    from library_service_api.postgresql.base import DatabaseWrapper
+
+    for alias, pool in DatabaseWrapper.get_open_pools().items():
+        stats = pool.pop_stats()
+        idle = stats.get("pool_available", 0)
+        DB_POOL_CONNECTIONS.labels(alias, "in_use").set(stats.get("pool_size", 0) - idle)
+        DB_POOL_CONNECTIONS.labels(alias, "idle").set(idle)
+        DB_POOL_WAITING.labels(alias).set(stats.get("requests_waiting", 0))
+        DB_POOL_WAIT_TIME.labels(alias).inc(stats.get("requests_wait_ms", 0) / 1000)
+        DB_POOL_TIMEOUTS.labels(alias).inc(stats.get("requests_errors", 0))
+
+
+class QueryTimer:
+    """Counts and times the queries run while active, async ORM included."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, sql: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL query count and time, and response size of every
+    request, labelled by view and action, e.g. ``BookViewSet.list`` or
+    ``TokenObtainPairView.post``, and the connection pools' usage after
+    it. Turned off with ``METRICS["ENABLED"]``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        if not getattr(settings, "METRICS", {}).get("ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(queries):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(queries):
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, queries)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed: float, queries: QueryTimer) -> None:
+        view_class, action = resolve_view(request)
+        labels = {
+            "view": f"{view_class.__name__}.{action}" if view_class else "other",
+            "method": request.method,
+            "status": str(response.status_code),
+        }
+        REQUEST_LATENCY.labels(**labels).observe(elapsed)
+        REQUEST_QUERIES.labels(**labels).observe(queries.count)
+        REQUEST_QUERY_TIME.labels(**labels).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(**labels).observe(len(response.content))
+        record_pool_stats()
+
+
+class MultiDirectoryCollector(multiprocess.MultiProcessCollector):
+    """Adds up the samples written to several multiprocess directories."""
+
+    def __init__(self, registry: CollectorRegistry, paths: list[str]) -> None:
+        self._paths = paths
+        registry.register(self)
+
+    def collect(self):
+        files = [file for path in self._paths for file in glob.glob(os.path.join(path, "*.db"))]
+        return self.merge(files, accumulate=True)
+
+
+def get_multiprocess_dirs() -> list[str]:
+    """Directories of every container under the root, or this process's own."""
+    root = getattr(settings, "METRICS", {}).get("MULTIPROC_ROOT")
+    if root and os.path.isdir(root):
+        return sorted(entry.path for entry in os.scandir(root) if entry.is_dir())
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    return [directory] if directory else []
+
+
+def render_metrics(multiprocess_dirs: list[str] | None = None) -> bytes:
+    """Current metrics in the Prometheus text format."""
+    record_pool_stats()
+    multiprocess_dirs = multiprocess_dirs or get_multiprocess_dirs()
+    if not multiprocess_dirs:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    MultiDirectoryCollector(registry, multiprocess_dirs)
+    return generate_latest(registry)
+
+
+class HasMetricsToken(BasePermission):
+    """Lets scrapers in with ``Authorization: Bearer <METRICS["TOKEN"]>``."""
+
+    def has_permission(self, request, view) -> bool:
+        token = getattr(settings, "METRICS", {}).get("TOKEN")
+        if not token:
+            return False
+        return hmac.compare_digest(
+            request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+        )
+
+
+class MetricsView(APIView):
+    """Prometheus scrape endpoint, for staff or holders of the metrics token."""
+
+    permission_classes = [HasMetricsToken | IsAdminUser]
+    query_budgets = {"get": 1}
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
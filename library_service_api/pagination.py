@@ -0,0 +1,303 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from library_service_api.replicas import is_recent_write, use_primary
+from library_service_api.versioning import get_last_modified, get_version, table_version_key
+
+
+class CountStrategyPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with a configurable way of counting rows.
+
+    Views choose a strategy with ``count_strategy``, falling back to
+    ``PAGINATION_COUNT_STRATEGY`` from settings:
+
+    - ``exact``: a ``COUNT(*)`` on every page, the DRF default.
+    - ``cached``: the exact count, cached for ``count_cache_timeout`` seconds
+      and invalidated when any table in the query is written.
+    - ``estimated``: the planner's row estimate, for unfiltered PostgreSQL
+      tables with at least ``estimate_threshold`` rows. Anything else is
+      counted exactly.
+    - ``none``: no count at all, only a ``has_next`` flag.
+
+    The response names the strategy that produced the count in
+    ``count_strategy``.
+    """
+
+    strategies = ("exact", "cached", "estimated", "none")
+    count_cache_timeout = 60
+    estimate_threshold = 10_000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request, view)
+        if page is None:
+            return None
+        return self.get_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` for async views. Counting runs in a worker
+        thread; the rows of the page are read with the async ORM.
+        """
+        page = await sync_to_async(self.get_page_queryset)(queryset, request, view)
+        if page is None:
+            return None
+        return self.get_page([row async for row in page])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Count the rows as the strategy says and return the page to fetch."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count_strategy = self.get_count_strategy(view)
+
+        if self.count_strategy == "exact":
+            self.count = self.get_count(queryset)
+            self.has_next = self.offset + self.limit < self.count
+            if self.count == 0 or self.offset > self.count:
+                return queryset.none()
+            return queryset[self.offset:self.offset + self.limit]
+        # Approximate or missing counts can't tell whether another page
+        # exists, so fetch one row more than requested instead.
+        self.count = self.get_approximate_count(queryset)
+        self.has_next = None
+        return queryset[self.offset:self.offset + self.limit + 1]
+
+    def get_page(self, rows: list) -> list:
+        if self.has_next is None:
+            self.has_next = len(rows) > self.limit
+            rows = rows[:self.limit]
+
+        if self.count is not None and self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return rows
+
+    def get_count_strategy(self, view) -> str:
+        strategy = getattr(view, "count_strategy", None) or getattr(
+            settings, "PAGINATION_COUNT_STRATEGY", "exact"
+        )
+        if strategy not in self.strategies:
+            raise ValueError(f"Unknown count strategy: {strategy!r}.")
+        return strategy
+
+    def get_approximate_count(self, queryset) -> int | None:
+        if self.count_strategy == "none":
+            return None
+        if self.count_strategy == "estimated":
+            estimate = self.get_planner_estimate(queryset)
+            if estimate is not None:
+                return estimate
+            self.count_strategy = "exact"
+            return self.get_count(queryset)
+        return self.get_cached_count(queryset)
+
+    def get_cached_count(self, queryset) -> int:
+        query = queryset.query.clone()
+        query.select_related = False
+        query.clear_ordering(force=True)
+        sql, params = query.get_compiler(queryset.db).as_sql()
+        # Models over database views name the tables behind them.
+        model_table = queryset.model._meta.db_table
+        tables = sorted({
+            alias.table_name for alias in query.alias_map.values()
+        } - {model_table} | set(getattr(queryset.model, "version_tables", [model_table])))
+        keys = [table_version_key(table) for table in tables]
+        versions = [get_version(key) for key in keys]
+        digest = hashlib.md5(
+            repr((queryset.db, sql, params, versions)).encode()
+        ).hexdigest()
+
+        def count() -> int:
+            # Replicas may not have the write behind a fresh version yet.
+            with use_primary(any(is_recent_write(get_last_modified(key)) for key in keys)):
+                return self.get_count(queryset)
+
+        return cache.get_or_set(
+            f"pagination:count:{digest}", count, self.count_cache_timeout
+        )
+
+    def get_planner_estimate(self, queryset) -> int | None:
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < self.estimate_threshold:
+            return None
+        return int(row[0])
+
+    def get_paginated_response(self, data):
+        payload = {
+            "count": self.count,
+            "count_strategy": self.count_strategy,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count_strategy == "none":
+            del payload["count"]
+            payload["has_next"] = self.has_next
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"].update({
+            "count_strategy": {"type": "string", "enum": list(self.strategies)},
+            "has_next": {"type": "boolean"},
+        })
+        return response_schema
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+class KeysetPagination(CountStrategyPagination):
+    """
+    Limit/offset pagination with an opt-in keyset (cursor) mode.
+
+    Views enable the keyset mode by declaring ``cursor_ordering``, a tuple
+    of fields sorted in one direction and ending with a unique one. Clients
+    opt in by sending ``?cursor=`` (empty for the first page) and then follow
+    the ``next``/``previous`` links, so every page is a row comparison on an
+    index instead of an OFFSET. Requests without ``cursor`` and explicitly ordered querysets,
+    such as ranked search results, keep using limit/offset.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_page_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, "cursor_ordering", None)
+        self.cursor_mode = (
+            bool(ordering)
+            and self.cursor_query_param in request.query_params
+            and not queryset.query.order_by
+        )
+        if not self.cursor_mode:
+            return super().get_page_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = ordering
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        self.fields = [field.lstrip("-") for field in ordering]
+        descending = ordering[0].startswith("-") != self.reverse
+        queryset = queryset.order_by(
+            *(f"-{field}" if descending else field for field in self.fields)
+        )
+        if self.position is not None:
+            queryset = queryset.filter(
+                self.row_comparison(queryset, self.fields, self.position, descending)
+            )
+        return queryset[:self.limit + 1]
+
+    def get_page(self, rows: list) -> list:
+        if not self.cursor_mode:
+            return super().get_page(rows)
+
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.first_position = self.get_position(rows[0], self.fields) if rows else None
+        self.last_position = self.get_position(rows[-1], self.fields) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.build_link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.build_link(self.first_position, reverse=True)
+
+    def build_link(self, position: list, reverse: bool) -> str:
+        payload = json.dumps({"p": position, "r": reverse}, default=str)
+        token = urlsafe_b64encode(payload.encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model) -> tuple[list | None, bool]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode()))
+            values = payload["p"]
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(payload.get("r"))
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def get_position(row, fields: list[str]) -> list:
+        if isinstance(row, dict):
+            return [row[field] for field in fields]
+        return [getattr(row, row._meta.get_field(field).attname) for field in fields]
+
+    @staticmethod
+    def row_comparison(queryset, fields: list[str], position: list, descending: bool):
+        """``(a, b, c) > (%s, %s, %s)``, which can walk a composite index."""
+        connection = connections[queryset.db]
+        quote = connection.ops.quote_name
+        table = quote(queryset.model._meta.db_table)
+        columns, params = [], []
+        for field_name, value in zip(fields, position):
+            field = queryset.model._meta.get_field(field_name)
+            columns.append(f"{table}.{quote(field.column)}")
+            params.append(field.get_db_prep_value(value, connection))
+        placeholders = ", ".join(["%s"] * len(params))
+        operator = "<" if descending else ">"
+        return RawSQL(
+            f"({', '.join(columns)}) {operator} ({placeholders})",
+            params,
+            output_field=BooleanField(),
+        )
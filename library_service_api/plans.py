@@ -0,0 +1,190 @@
+import datetime
+import decimal
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from library_service_api.fieldsets import SparseFieldset, SparseFieldsetSerializerMixin
+
+
+PASS_THROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+class RowPlan:
+    """
+    Serializer output for ``.values()`` rows, without model instances.
+
+    A plan is a list of ``(name, kind, key, convert)`` steps compiled once
+    per serializer class and fieldset. ``key`` is a ``.values()`` lookup,
+    a tuple of them for computed fields, or a nested plan.
+    """
+
+    def __init__(self, steps: list, pk_lookup: str) -> None:
+        self.steps = steps
+        self.pk_lookup = pk_lookup
+
+        lookups = [pk_lookup]
+        for _, kind, key, _ in steps:
+            if kind == "value":
+                lookups.append(key)
+            elif kind == "computed":
+                lookups.extend(key)
+            else:
+                lookups.extend(key.lookups)
+        self.lookups = list(dict.fromkeys(lookups))
+
+    def represent(self, row: dict) -> dict:
+        data = {}
+        for name, kind, key, convert in self.steps:
+            if kind == "value":
+                value = row[key]
+                data[name] = value if value is None or convert is None else convert(value)
+            elif kind == "computed":
+                data[name] = convert(*[row[lookup] for lookup in key])
+            else:
+                data[name] = None if row[key.pk_lookup] is None else key.represent(row)
+        return data
+
+    def represent_many(self, rows) -> list[dict]:
+        represent = self.represent
+        return [represent(row) for row in rows]
+
+
+def get_converter(field):
+    """Cheapest callable matching ``field.to_representation`` on database values."""
+    if isinstance(field, serializers.ChoiceField):
+        if all(isinstance(key, str) for key in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, PASS_THROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.DecimalField):
+        return get_decimal_converter(field)
+    if isinstance(field, serializers.DateField):
+        output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() == "iso-8601":
+            return datetime.date.isoformat
+    return field.to_representation
+
+
+def get_decimal_converter(field):
+    coerce_to_string = getattr(
+        field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+    )
+    if (
+        not coerce_to_string
+        or field.localize
+        or field.normalize_output
+        or field.decimal_places is None
+    ):
+        return field.to_representation
+
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return f"{value.quantize(quantum, rounding=rounding, context=context):f}"
+
+    return convert
+
+
+def compile_plan(serializer, model, prefix: str = "") -> RowPlan | None:
+    """
+    Compile ``serializer`` into a ``RowPlan`` reading from ``model``.
+
+    Returns ``None`` when a field needs a model instance, such as a method
+    source without a matching ``represent_<name>`` on the serializer, so
+    callers can fall back to regular serialization.
+    """
+    steps = []
+    field_columns = getattr(serializer, "field_columns", {})
+    for field in serializer._readable_fields:
+        name = field.field_name
+        if name in field_columns:
+            represent = getattr(serializer, f"represent_{name}", None)
+            if represent is None:
+                return None
+            lookups = tuple(prefix + path for path in field_columns[name])
+            steps.append((name, "computed", lookups, represent))
+            continue
+        if field.source == "*":
+            return None
+
+        attribute, *rest = field.source_attrs
+        try:
+            model_field = model._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            return None
+
+        path = prefix + attribute
+        if not model_field.is_relation:
+            if rest:
+                return None
+            steps.append((name, "value", path, get_converter(field)))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            if rest or field.pk_field is not None:
+                return None
+            steps.append((name, "value", path, None))
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = compile_plan(field, model_field.related_model, f"{path}__")
+            if nested is None:
+                return None
+            steps.append((name, "nested", nested, None))
+        elif isinstance(field, serializers.SlugRelatedField) and not rest:
+            steps.append((name, "value", f"{path}__{field.slug_field}", None))
+        else:
+            return None
+    return RowPlan(steps, f"{prefix}pk" if prefix else "pk")
+
+
+@lru_cache(maxsize=256)
+def get_row_plan(serializer_class, fieldset: SparseFieldset | None, model) -> RowPlan | None:
+    kwargs = {}
+    if issubclass(serializer_class, SparseFieldsetSerializerMixin):
+        kwargs["sparse_fieldset"] = fieldset
+    return compile_plan(serializer_class(**kwargs), model)
+
+
+class LeanListMixin:
+    """
+    Builds list payloads from ``.values()`` rows through a ``RowPlan``.
+
+    The output matches the serializer's, but no model instances or
+    serializer instances are created per row. Serializers the plan can't
+    express are serialized as usual. Plans are compiled without request
+    context, so serializers whose fields depend on the request shouldn't
+    be used with this mixin.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fieldset = None
+        if issubclass(serializer_class, SparseFieldsetSerializerMixin):
+            fieldset = SparseFieldset.from_query_params(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = get_row_plan(serializer_class, fieldset, queryset.model)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        ordering = [field.lstrip("-") for field in getattr(self, "cursor_ordering", ())]
+        rows = queryset.values(*dict.fromkeys(plan.lookups + ordering))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.represent_many(page))
+        return Response(plan.represent_many(rows))
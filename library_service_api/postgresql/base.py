@@ -0,0 +1,56 @@
+from django.db.backends import utils
+from django.db.backends.postgresql import base, operations
+
+from library_service_api.budgets import notify_observers
+
+
+class DatabaseOperations(operations.DatabaseOperations):
+    # With server-side binding the parameters travel in the protocol's Bind
+    # message, which holds at most 65535 of them.
+    max_query_params = 65535
+
+    def bulk_batch_size(self, fields, objs):
+        if not fields or not self.connection.settings_dict["OPTIONS"].get("server_side_binding"):
+            return super().bulk_batch_size(fields, objs)
+        return max(self.max_query_params // len(fields), 1)
+
+
+class ObservedCursorMixin:
+    """Reports each query to the observers of ``observe_queries``."""
+
+    def execute(self, sql, params=None):
+        with notify_observers(sql):
+            return super().execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        with notify_observers(sql):
+            return super().executemany(sql, param_list)
+
+
+class CursorWrapper(ObservedCursorMixin, utils.CursorWrapper):
+    pass
+
+
+class CursorDebugWrapper(ObservedCursorMixin, base.CursorDebugWrapper):
+    pass
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The PostgreSQL backend, with bulk inserts split to fit server-side
+    binding, which prepared statements need, and queries reported to
+    ``observe_queries``.
+    """
+
+    ops_class = DatabaseOperations
+
+    def make_cursor(self, cursor):
+        return CursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        return CursorDebugWrapper(cursor, self)
+
+    @classmethod
+    def get_open_pools(cls) -> dict:
+        """This process's open connection pools by alias. None are created."""
+        return {alias: pool for alias, pool in cls._connection_pools.items() if not pool.closed}
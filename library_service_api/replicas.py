@@ -0,0 +1,155 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject, empty
+
+
+DEFAULTS = {
+    "DATABASES": [],
+    "STICKY_SECONDS": 5,
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def get_setting(name: str):
+    return getattr(settings, "REPLICAS", {}).get(name, DEFAULTS[name])
+
+
+def pin_key(user_id: int) -> str:
+    return f"replicas:pin:{user_id}"
+
+
+def is_recent_write(timestamp: float | None) -> bool:
+    """Whether replicas may still be behind a write made at ``timestamp``."""
+    return timestamp is not None and time.time() - timestamp < get_setting("STICKY_SECONDS")
+
+
+_routing: ContextVar["RoutingState | None"] = ContextVar("replica_routing", default=None)
+_use_primary: ContextVar[bool] = ContextVar("replica_use_primary", default=False)
+
+
+@contextmanager
+def use_primary(enabled: bool = True):
+    """Read from the primary inside the block; also usable as a decorator."""
+    token = _use_primary.set(_use_primary.get() or enabled)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def get_resolved_user(request):
+    """``request.user`` if it has been loaded already, without loading it."""
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+class RoutingState:
+    """Where the reads of one request go."""
+
+    def __init__(self, request) -> None:
+        self.request = request
+        self.primary = request.method not in SAFE_METHODS
+        self.wrote = False
+        self.pinned = None
+        self.replica = None
+
+    def get_read_database(self, replicas: list[str]) -> str:
+        if self.primary or self.wrote or self.is_pinned():
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            self.replica = random.choice(replicas)
+        return self.replica
+
+    def is_pinned(self) -> bool:
+        if self.pinned is None:
+            user = get_resolved_user(self.request)
+            if user is None:
+                return False
+            self.pinned = user.is_authenticated and cache.get(pin_key(user.pk)) is not None
+        return self.pinned
+
+    def pin_writer(self) -> None:
+        """Keep a user who has written on the primary until replicas catch up."""
+        user = get_resolved_user(self.request)
+        if self.wrote and user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), 1, get_setting("STICKY_SECONDS"))
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of safe-method requests to ``REPLICAS["DATABASES"]``.
+
+    Everything else uses the primary: writes, unsafe requests, code outside
+    a request such as management commands, reads after the request has
+    written, ``use_primary`` blocks, and requests of a user who wrote within
+    the last ``REPLICAS["STICKY_SECONDS"]``, so they see their own changes.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        replicas = get_setting("DATABASES")
+        if state is None or not replicas or _use_primary.get():
+            return None
+        return state.get_read_database(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_setting("DATABASES")}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_setting("DATABASES"):
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Tracks each request for ``ReplicaRouter`` and pins users after writes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        state.pin_writer()
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState(request)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if state.wrote:
+            await sync_to_async(state.pin_writer)()
+        return response
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "debug_toolbar",
@@ -56,6 +57,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    "library_service_api.metrics.MetricsMiddleware",
+    "library_service_api.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -64,6 +67,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "library_service_api.budgets.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "library_service_api.urls"
@@ -92,12 +96,59 @@ WSGI_APPLICATION = "library_service_api.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "library_service_api.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        "OPTIONS": {},
+    }
+}
+
+# Each process keeps up to DB_POOL_MAX_SIZE connections open and shares
+# them between its threads; 0 opens one per request instead. Pooled
+# connections live long enough for psycopg to prepare a statement on the
+# server once it has run DB_PREPARE_THRESHOLD times, so hot queries skip
+# parsing and planning.
+if int(os.getenv("DB_POOL_MAX_SIZE", 10)):
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        },
+        "server_side_binding": True,
+        "prepare_threshold": int(os.getenv("DB_PREPARE_THRESHOLD", 5)),
+    }
+
+# Read replicas as "host[:port]" pairs, separated by commas. Tests run
+# against the primary's test database.
+for number, address in enumerate(
+    filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1
+):
+    host, _, port = address.strip().partition(":")
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["library_service_api.replicas.ReplicaRouter"]
+
+REPLICAS = {
+    "DATABASES": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_SECONDS": 5,
+}
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    } if os.getenv("REDIS_URL") else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
 }
 
@@ -144,7 +195,7 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_PAGINATION_CLASS": "library_service_api.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -152,6 +203,13 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+PAGINATION_COUNT_STRATEGY = "exact"
+
+BORROWING_LIST_CACHE = {
+    "BACKEND": "library_service_api.caching.DjangoCacheBackend",
+    "TIMEOUT": 300,
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=3),
@@ -172,6 +230,69 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+TELEGRAM = {
+    "BOT_TOKEN": os.getenv("BOT_TOKEN"),
+    "CHAT_ID": os.getenv("CHAT_ID"),
+    "API_URL": os.getenv("TELEGRAM_API_URL", "https://api.telegram.org"),
+    "TIMEOUT": 10,
+}
+
+NOTIFICATION_OUTBOX = {
+    "BATCH_SIZE": 50,
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF_BASE": 2,
+    "BACKOFF_MAX": 3600,
+    # Messages per second; Telegram allows about one per second per chat.
+    "RATE_LIMIT": 1,
+    # Seconds a claimed batch is held on top of sending it at RATE_LIMIT.
+    "LEASE": 60,
+    "POLL_INTERVAL": 2,
+}
+
+FEES = {
+    # Each day past the expected return date costs this many daily fees.
+    "FINE_MULTIPLIER": 2,
+    # Borrowing ids per accrual statement and transaction.
+    "CHUNK_SIZE": 50_000,
+}
+
+# Most borrowed books: seconds a leaderboard is cached, largest ?limit=.
+BOOK_POPULARITY = {
+    "CACHE_TIMEOUT": 60,
+    "MAX_LIMIT": 100,
+}
+
+DAILY_ROLLUPS = {
+    # Days before the watermark counted again, for borrowings entered late.
+    "LOOKBACK_DAYS": 7,
+    "CHUNK_DAYS": 31,
+    "MAX_RANGE_DAYS": 366,
+}
+
+BOOK_AUTOCOMPLETE = {
+    "MAX_ENTRIES": 1_000_000,
+    "MAX_RESULTS": 10,
+    "REBUILD_INTERVAL": 300,
+}
+
+# Served at /metrics/ to staff and to scrapers sending
+# "Authorization: Bearer <TOKEN>". Set PROMETHEUS_MULTIPROC_DIR to a
+# directory shared by all workers to aggregate their metrics, and
+# MULTIPROC_ROOT to the parent of each container's directory to
+# aggregate several containers.
+METRICS = {
+    "ENABLED": True,
+    "TOKEN": os.getenv("METRICS_TOKEN"),
+    "MULTIPROC_ROOT": os.getenv("METRICS_MULTIPROC_ROOT"),
+}
+
+# Checks each API request against its view's ``query_budgets``; only
+# loaded in development unless ENFORCE is set.
+QUERY_BUDGETS = {
+    "ENFORCE": DEBUG,
+    "RAISE": True,
+}
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
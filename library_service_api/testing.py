@@ -0,0 +1,41 @@
+from library_service_api.budgets import capture_queries, get_missing_budgets, get_query_budget
+
+
+class QueryBudgetTestMixin:
+    """Assertions that keep endpoints within their ``query_budgets``."""
+
+    budget_sizes = (1, 10, 100)
+
+    def assertWithinQueryBudget(self, view_class, action: str, request, create_rows) -> None:
+        """
+        Grow the data with ``create_rows(count)`` to 1, 10 and 100 rows and
+        call ``request()`` at each size. Fails if a call errors or runs more
+        queries than the budget, so queries that scale with rows are caught.
+        """
+        budget = get_query_budget(view_class, action)
+        self.assertIsNotNone(budget, f"{view_class.__name__}.{action} has no query budget.")
+
+        created = 0
+        for size in self.budget_sizes:
+            create_rows(size - created)
+            created = size
+            with capture_queries() as queries:
+                response = request()
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            self.assertLess(
+                response.status_code,
+                400,
+                f"{action} with {size} rows: {getattr(response, 'data', response)}",
+            )
+            self.assertLessEqual(
+                len(queries),
+                budget,
+                f"{view_class.__name__}.{action} ran {len(queries)} queries with {size} rows, "
+                f"its budget is {budget}:\n" + "\n".join(queries),
+            )
+
+    def assertQueryBudgetsCover(self, view_class) -> None:
+        self.assertEqual(
+            get_missing_budgets(view_class), [], f"{view_class.__name__} has actions without budgets."
+        )
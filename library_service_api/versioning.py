@@ -0,0 +1,55 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def table_version_key(table: str) -> str:
+    return f"version:{table}"
+
+
+def get_version(key: str) -> int:
+    """Current value of a shared counter, starting at 1."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_last_modified(key: str) -> float | None:
+    """Timestamp of the last bump of ``key``, if this cache has seen one."""
+    return cache.get(f"{key}:modified")
+
+
+def bump_version(key: str) -> None:
+    """
+    Invalidate everything cached under the previous value of ``key``.
+
+    The counter is bumped right away and again once the transaction
+    commits. The first bump keeps the writing transaction off stale
+    entries, the second drops anything concurrent readers cached from the
+    old rows in between.
+    """
+    _increment(key)
+    transaction.on_commit(lambda: _increment(key))
+
+
+def _increment(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+    cache.set(f"{key}:modified", time.time(), timeout=None)
+
+
+def get_model_version(model) -> int:
+    return get_version(table_version_key(model._meta.db_table))
+
+
+def get_model_last_modified(model) -> float | None:
+    return get_last_modified(table_version_key(model._meta.db_table))
+
+
+def bump_model_version(model) -> None:
+    bump_version(table_version_key(model._meta.db_table))
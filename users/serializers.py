@@ -24,10 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Update User with encrypted password."""
         password = validated_data.pop("password", None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
 
-        return user
+        return super().update(instance, validated_data)
@@ -1,3 +1,137 @@
-from django.test import TestCase
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from library_service_api.budgets import QueryBudgetExceeded, capture_queries
+from library_service_api.testing import QueryBudgetTestMixin
+from users.views import (
+    CreateUserView,
+    ManageUserView,
+    TokenObtainPairView,
+    TokenRefreshView,
+    TokenVerifyView,
+)
+
+
+PROFILE_URL = reverse("users:profile")
+
+
+class UserQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@user.com", password="test123user"
+        )
+        self.created = 0
+
+    def create_users(self, count: int) -> None:
+        get_user_model().objects.bulk_create(
+            get_user_model()(email=f"user{number}@user.com", password="!")
+            for number in range(self.created, self.created + count)
+        )
+        self.created += count
+
+    def test_every_view_has_budgets(self) -> None:
+        for view_class in (
+            CreateUserView, ManageUserView, TokenObtainPairView, TokenRefreshView, TokenVerifyView
+        ):
+            with self.subTest(view=view_class.__name__):
+                self.assertQueryBudgetsCover(view_class)
+
+    def test_profile(self) -> None:
+        self.client.force_authenticate(self.user)
+        for method, request in (
+            ("get", lambda: self.client.get(PROFILE_URL)),
+            ("patch", lambda: self.client.patch(PROFILE_URL, {"first_name": "Test"})),
+            ("put", lambda: self.client.put(
+                PROFILE_URL, {"email": "test@user.com", "password": "test123user"}
+            )),
+        ):
+            with self.subTest(method=method):
+                self.assertWithinQueryBudget(ManageUserView, method, request, self.create_users)
+
+    def test_register_and_tokens(self) -> None:
+        emails = iter(f"new{number}@user.com" for number in range(3))
+        self.assertWithinQueryBudget(
+            CreateUserView,
+            "post",
+            lambda: self.client.post(
+                reverse("users:register"), {"email": next(emails), "password": "test123user"}
+            ),
+            self.create_users,
+        )
+
+        credentials = {"email": "test@user.com", "password": "test123user"}
+        tokens = self.client.post(reverse("users:token_obtain_pair"), credentials).data
+        for view_class, url, payload in (
+            (TokenObtainPairView, "users:token_obtain_pair", credentials),
+            (TokenRefreshView, "users:token_refresh", {"refresh": tokens["refresh"]}),
+            (TokenVerifyView, "users:token_verify", {"token": tokens["access"]}),
+        ):
+            with self.subTest(view=view_class.__name__):
+                self.assertWithinQueryBudget(
+                    view_class,
+                    "post",
+                    lambda: self.client.post(reverse(url), payload),
+                    self.create_users,
+                )
+
+
+@override_settings(QUERY_BUDGETS={"ENFORCE": True})
+@skipUnless(connection.vendor == "postgresql", "Needs the PostgreSQL backend.")
+class QueryBudgetMiddlewareTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        get_user_model().objects.create_user(email="test@user.com", password="test123user")
+        token = self.client.post(
+            reverse("users:token_obtain_pair"),
+            {"email": "test@user.com", "password": "test123user"},
+        ).data["access"]
+        self.client.credentials(HTTP_AUTHORIZE=f"Bearer {token}")
+
+    def test_reports_queries_within_budget(self) -> None:
+        response = self.client.get(PROFILE_URL)
+
+        self.assertEqual(response["X-Query-Count"], "1")
+        self.assertEqual(response["X-Query-Budget"], str(ManageUserView.query_budgets["get"]))
+
+    def test_over_budget_raises(self) -> None:
+        with mock.patch.object(ManageUserView, "query_budgets", {"get": 0}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, "ManageUserView.get ran 1 queries"):
+                self.client.get(PROFILE_URL)
+
+    def test_over_budget_is_logged_when_not_raising(self) -> None:
+        with (
+            override_settings(QUERY_BUDGETS={"ENFORCE": True, "RAISE": False}),
+            mock.patch.object(ManageUserView, "query_budgets", {"get": 0}),
+            self.assertLogs("library_service_api.budgets", "WARNING"),
+        ):
+            client = APIClient()
+            client.credentials(**self.client._credentials)
+            response = client.get(PROFILE_URL)
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={"ENFORCE": False})
+    def test_disabled_by_default(self) -> None:
+        response = APIClient().post(reverse("users:register"), {"email": "a@b.com", "password": "secret"})
+
+        self.assertNotIn("X-Query-Count", response)
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs the PostgreSQL backend.")
+class CaptureQueriesTest(TestCase):
+    def test_execute_wrappers_of_new_connections_are_left_alone(self) -> None:
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(other.close)
+
+        with other.execute_wrapper(lambda execute, *args: execute(*args)):
+            with capture_queries() as queries, other.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        self.assertEqual(other.execute_wrappers, [])
+        self.assertEqual(queries, ["SELECT 1"])
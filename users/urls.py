@@ -1,12 +1,12 @@
 from django.urls import path
-from rest_framework_simplejwt.views import (
+from users.views import (
+    CreateUserView,
+    ManageUserView,
     TokenObtainPairView,
     TokenRefreshView,
-    TokenVerifyView
+    TokenVerifyView,
 )
 
-from users.views import CreateUserView, ManageUserView
-
 urlpatterns = [
     path("register/", CreateUserView.as_view(), name="register"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
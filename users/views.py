@@ -1,5 +1,6 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt import views as jwt_views
 
 from users.serializers import UserSerializer
 
@@ -7,11 +8,25 @@ from users.serializers import UserSerializer
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = ()
+    query_budgets = {"post": 3}
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
+    query_budgets = {"get": 1, "put": 3, "patch": 3}
 
     def get_object(self):
         return self.request.user
+
+
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    query_budgets = {"post": 2}
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    query_budgets = {"post": 1}
+
+
+class TokenVerifyView(jwt_views.TokenVerifyView):
+    query_budgets = {"post": 0}